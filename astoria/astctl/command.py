@@ -1,14 +1,13 @@
 """Command base for astctl."""
 import asyncio
 from abc import abstractmethod
-from json import JSONDecodeError, loads
+from json import JSONDecodeError
 from typing import Generic, Match, Type, TypeVar
 from uuid import uuid4
 
-from pydantic import parse_obj_as
-
 from astoria.common.components import StateConsumer
-from astoria.common.ipc import ManagerMessage
+from astoria.common.ipc import ManagerMessage, ReceivedPayload, decode_message
+from astoria.common.mqtt import OverflowPolicy
 
 T = TypeVar("T", bound=ManagerMessage)
 
@@ -70,7 +69,11 @@ class SingleManagerMessageCommand(Command, Generic[T]):
     def _init(self) -> None:
         """Initialise consumer."""
         self._received = False
-        self._mqtt.subscribe(self.manager, self._handle_raw_message)
+        self._mqtt.subscribe(
+            self.manager,
+            self._handle_raw_message,
+            overflow=OverflowPolicy.LATEST_WINS,
+        )
 
     async def main(self) -> None:
         """Main method of the command."""
@@ -79,14 +82,13 @@ class SingleManagerMessageCommand(Command, Generic[T]):
     async def _handle_raw_message(
         self,
         match: Match[str],
-        payload: str,
+        payload: ReceivedPayload,
     ) -> None:
         """Handle astdiskd status messages."""
         if not self._received:
             self._received = True
             try:
-                data = loads(payload)
-                message = parse_obj_as(self.message_schema, data)
+                message = decode_message(self.message_schema, payload)
                 if message.status == self.message_schema.Status.RUNNING:
                     self.handle_message(message)
                 else:
@@ -1,7 +1,7 @@
-"""Command to add a filesystem path as a static disk."""
+"""Command to add filesystem paths as static disks."""
 import asyncio
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 
 import click
 
@@ -12,45 +12,49 @@ loop = asyncio.get_event_loop()
 
 
 @click.command("add")
-@click.argument("path")
+@click.argument("paths", nargs=-1, required=True)
 @click.option("-v", "--verbose", is_flag=True)
 @click.option("-c", "--config-file", type=click.Path(exists=True))
-def add(path: str, *, verbose: bool, config_file: Optional[str]) -> None:
-    """Mount a filesystem path as a disk."""
-    command = AddStaticDiskCommand(path, verbose, config_file)
+def add(paths: Tuple[str, ...], *, verbose: bool, config_file: Optional[str]) -> None:
+    """Mount filesystem paths as disks."""
+    command = AddStaticDiskCommand(paths, verbose, config_file)
     loop.run_until_complete(command.run())
 
 
 class AddStaticDiskCommand(Command):
-    """Command to add a filesystem path as a static disk."""
+    """Command to add filesystem paths as static disks."""
 
-    _path: Path
+    _paths: List[Path]
 
     dependencies = ["astdiskd"]
 
     def __init__(
         self,
-        path: str,
+        paths: Tuple[str, ...],
         verbose: bool,  # noqa: FBT001
         config_file: Optional[str],
     ) -> None:
         super().__init__(verbose, config_file)
-        self._path = Path(path).resolve()
+        self._paths = [Path(path).resolve() for path in paths]
 
     async def main(self) -> None:
         """Main method of the command."""
-        res = await self._mqtt.manager_request(
+        responses = await self._mqtt.manager_request_many(
             "astdiskd",
             "add_static_disk",
-            AddStaticDiskRequest(sender_name=self.name, path=self._path),
+            [
+                AddStaticDiskRequest(sender_name=self.name, path=path)
+                for path in self._paths
+            ],
         )
-        if res.success:
-            print("Successfully added disk.")
-            if len(res.reason) > 0:
-                print(res.reason)
-        else:
-            print("Unable to add disk.")
-            if len(res.reason) > 0:
-                print(res.reason)
+        for path, res in zip(self._paths, responses):
+            if res.success:
+                print(f"Successfully added disk: {path}")
+                if len(res.reason) > 0:
+                    print(res.reason)
+            else:
+                print(f"Unable to add disk: {path}")
+                if len(res.reason) > 0:
+                    print(res.reason)
         # Add timeout
         self.halt(silent=True)
@@ -1,11 +1,18 @@
 """Command to view usercode logs in real-time."""
 import asyncio
-from typing import Optional
+from time import monotonic
+from typing import Optional, Sequence
 
 import click
 
 from astoria.astctl.command import Command
-from astoria.common.ipc import UsercodeLogBroadcastEvent
+from astoria.common.ipc import (
+    LogReorderBuffer,
+    UsercodeLogBatchBroadcastEvent,
+    UsercodeLogLine,
+    UsercodeLogReplayManagerRequest,
+    UsercodeLogReplayResponse,
+)
 from astoria.common.mqtt import BroadcastHelper
 
 loop = asyncio.get_event_loop()
@@ -14,9 +21,13 @@ loop = asyncio.get_event_loop()
 @click.command("log")
 @click.option("-v", "--verbose", is_flag=True)
 @click.option("-c", "--config-file", type=click.Path(exists=True))
-def log(*, verbose: bool, config_file: Optional[str]) -> None:
+@click.option("-r", "--replay", is_flag=True, help="Show recent lines first.")
+def log(*, verbose: bool, config_file: Optional[str], replay: bool) -> None:
     """View usercode logs in real-time."""
-    command = ViewUsercodeLogCommand(verbose, config_file)
+    if replay:
+        command: ViewUsercodeLogCommand = ReplayUsercodeLogCommand(verbose, config_file)
+    else:
+        command = ViewUsercodeLogCommand(verbose, config_file)
     loop.run_until_complete(command.run())
 
 
@@ -31,19 +42,66 @@ class ViewUsercodeLogCommand(Command):
         """
         self._log_event = BroadcastHelper.get_helper(
             self._mqtt,
-            UsercodeLogBroadcastEvent,
+            UsercodeLogBatchBroadcastEvent,
         )
+        # Lines from different events can arrive out of order.
+        self._reorder = LogReorderBuffer()
+        self._reported_missed = 0
 
     async def main(self) -> None:
-        """Send a trigger event."""
-        while not self._stop_event.is_set():
-            # wait_broadcast waits forever until a broadcoast, so we will use a short
-            # timeout to ensure that the loop condition is checked.
+        """Print log lines until the command is halted."""
+        asyncio.ensure_future(self._close_when_halted())
+        while True:
+            deadline = self._reorder.deadline
+            timeout = None if deadline is None else max(deadline - monotonic(), 0)
             try:
-                ev = await asyncio.wait_for(
-                    self._log_event.wait_broadcast(),
-                    timeout=0.1,
-                )
-                print(ev.content.rstrip())
+                events = await asyncio.wait_for(self._log_event.drain(), timeout)
             except asyncio.TimeoutError:
-                pass
+                self._print_lines(self._reorder.expire())
+                continue
+            if not events:
+                break
+            for ev in events:
+                self._print_lines(self._reorder.add(ev.pid, ev.lines))
+        self._print_lines(self._reorder.flush())
+
+    def _print_lines(self, lines: Sequence[UsercodeLogLine]) -> None:
+        if lines:
+            print("\n".join(line.content.rstrip() for line in lines))
+        if self._reorder.missed > self._reported_missed:
+            missed = self._reorder.missed - self._reported_missed
+            print(f"[{missed} lines were not received]")
+            self._reported_missed = self._reorder.missed
+
+    async def _close_when_halted(self) -> None:
+        """Stop waiting for log lines when the command is halted."""
+        await self.wait_loop()
+        self._log_event.close()
+
+
+class ReplayUsercodeLogCommand(ViewUsercodeLogCommand):
+    """Command to view recent usercode logs, and then logs in real-time."""
+
+    dependencies = ["astprocd"]
+
+    async def main(self) -> None:
+        """Print the recent log lines, then log lines until the command is halted."""
+        cursor = 0
+        more = True
+        while more:
+            res = await self._mqtt.manager_request(
+                "astprocd",
+                "log_replay",
+                UsercodeLogReplayManagerRequest(sender_name=self.name, cursor=cursor),
+                response_schema=UsercodeLogReplayResponse,
+            )
+            if not res.success:
+                print(f"Unable to replay logs: {res.reason}")
+                break
+            self._print_lines(res.lines)
+            # Live lines that have already been replayed are not printed again.
+            for line in res.lines:
+                self._reorder.skip_to(line.pid, line.sequence + 1)
+            cursor, more = res.next_cursor, res.more
+
+        await super().main()
@@ -1,14 +1,26 @@
 """Command to show usercode info."""
 import asyncio
-from typing import Optional
+from json import JSONDecodeError
+from typing import Callable, Match, Optional
 
 import click
+from pydantic import ValidationError
 
 from astoria.astctl.command import SingleManagerMessageCommand
-from astoria.common.ipc import ProcessManagerMessage
+from astoria.common.ipc import (
+    ProcessManagerMessage,
+    ReceivedPayload,
+    ResourceRollup,
+    UsercodeResourceMetrics,
+    decode_message,
+)
+from astoria.common.mqtt import OverflowPolicy
 
 loop = asyncio.get_event_loop()
 
+# The time to wait for the resource usage of running code to be received.
+METRICS_TIMEOUT = 1.0
+
 
 @click.command("show")
 @click.option("-v", "--verbose", is_flag=True)
@@ -19,12 +31,50 @@ def show(*, verbose: bool, config_file: Optional[str]) -> None:
     loop.run_until_complete(command.run())
 
 
+def _format_bytes(value: float) -> str:
+    for unit in ["B", "KiB", "MiB"]:
+        if value < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GiB"
+
+
+def _format_rollup(rollup: ResourceRollup, fmt: Callable[[float], str]) -> str:
+    return (
+        f"{fmt(rollup.last)} (min {fmt(rollup.min)}, "
+        f"avg {fmt(rollup.avg)}, max {fmt(rollup.max)})"
+    )
+
+
 class ShowUsercodeCommand(SingleManagerMessageCommand[ProcessManagerMessage]):
     """Show current usercode."""
 
     manager = "astprocd"
     message_schema = ProcessManagerMessage
 
+    def _init(self) -> None:
+        super()._init()
+        self._pid: Optional[int] = None
+        self._metrics: Optional[UsercodeResourceMetrics] = None
+        self._metrics_event = asyncio.Event()
+        self._mqtt.subscribe(
+            "astprocd/metrics",
+            self._handle_metrics_message,
+            overflow=OverflowPolicy.LATEST_WINS,
+        )
+
+    async def main(self) -> None:
+        """Show the status, and the resource usage of running code."""
+        await self.wait_loop()
+        pid = self._pid
+        if pid is not None:
+            try:
+                await asyncio.wait_for(self._wait_for_metrics(pid), METRICS_TIMEOUT)
+            except asyncio.TimeoutError:
+                print("Resource usage: not sampled yet")
+            else:
+                self.print_metrics()
+
     def handle_message(
         self,
         message: ProcessManagerMessage,
@@ -33,5 +83,38 @@ class ShowUsercodeCommand(SingleManagerMessageCommand[ProcessManagerMessage]):
         if message.code_status is not None and message.disk_info is not None:
             print(f"Code status: {message.code_status.value}")
             print(f"Disk Mountpoint: {message.disk_info.mount_path}")
+            self._pid = message.pid
         else:
             print("No usercode disk is inserted.")
+
+    def print_metrics(self) -> None:
+        """Print the resource usage of the code."""
+        if self._metrics is None:
+            return
+        metrics = self._metrics
+        print(f"Processes: {metrics.processes}")
+        print(f"CPU time: {metrics.cpu_time:.2f}s")
+        print(f"CPU: {_format_rollup(metrics.cpu_percent, '{:.1f}%'.format)}")
+        print(f"Memory: {_format_rollup(metrics.rss, _format_bytes)}")
+        print(f"Threads: {_format_rollup(metrics.threads, '{:.1f}'.format)}")
+        print(
+            f"Storage: {_format_bytes(metrics.read_bytes)} read, "
+            f"{_format_bytes(metrics.write_bytes)} written",
+        )
+
+    async def _wait_for_metrics(self, pid: int) -> None:
+        while self._metrics is None or self._metrics.pid != pid:
+            self._metrics_event.clear()
+            await self._metrics_event.wait()
+
+    async def _handle_metrics_message(
+        self,
+        match: Match[str],
+        payload: ReceivedPayload,
+    ) -> None:
+        """Keep the latest resource usage of the code."""
+        try:
+            self._metrics = decode_message(UsercodeResourceMetrics, payload)
+        except (JSONDecodeError, ValidationError):
+            return
+        self._metrics_event.set()
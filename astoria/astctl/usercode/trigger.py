@@ -32,6 +32,7 @@ class TriggerUsercodeCommand(Command):
         self._trigger_event = BroadcastHelper.get_helper(
             self._mqtt,
             StartButtonBroadcastEvent,
+            receive=False,
         )
 
     async def main(self) -> None:
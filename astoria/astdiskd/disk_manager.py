@@ -43,6 +43,11 @@ class DiskManager(StateManager[DiskManagerMessage]):
             disks={},
         )
 
+    @property
+    def publish_status_patches(self) -> bool:
+        """Publish a merge patch to the patch topic with each status change."""
+        return True
+
     async def main(self) -> None:
         """Main routine for astdiskd."""
         for provider in self._providers:
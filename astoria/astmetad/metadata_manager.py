@@ -15,6 +15,7 @@ from astoria.common.ipc import (
 )
 from astoria.common.metadata import Metadata
 from astoria.common.mixins.disk_handler import DiskHandlerMixin
+from astoria.common.mqtt import OverflowPolicy
 
 from .metadata_cache import MetadataCache
 from .metadata_disk_lifecycle import (
@@ -68,7 +69,12 @@ class MetadataManager(DiskHandlerMixin, StateManager[MetadataManagerMessage]):
         )
 
         self._cur_disks: Dict[DiskUUID, DiskInfo] = {}
-        self._mqtt.subscribe("astdiskd", self.handle_astdiskd_disk_info_message)
+        self._mqtt.subscribe(
+            "astdiskd",
+            self.handle_astdiskd_disk_info_message,
+            overflow=OverflowPolicy.LATEST_WINS,
+        )
+        self._mqtt.subscribe("astdiskd/patch", self.handle_astdiskd_patch_message)
 
         self._requested_data: Dict[str, str] = {}
         self._register_request(
@@ -90,6 +96,16 @@ class MetadataManager(DiskHandlerMixin, StateManager[MetadataManagerMessage]):
             metadata=Metadata.init(self.config),
         )
 
+    @property
+    def status_publish_interval(self) -> float:
+        """Minimum time between status publications, in seconds."""
+        return self.config.system.status_publish_interval
+
+    @property
+    def publish_status_patches(self) -> bool:
+        """Publish a merge patch to the patch topic with each status change."""
+        return True
+
     async def main(self) -> None:
         """Main routine for astmetad."""
         self.update_status()
@@ -0,0 +1,105 @@
+"""
+Astoria Daemon - Runs several state managers in a single process.
+
+The managers share one event loop, and messages between them are delivered
+in-process rather than through the broker.
+"""
+import asyncio
+import logging
+from signal import SIGHUP, SIGINT, SIGTERM
+from typing import Dict, List, Optional, Sequence, Tuple, Type
+
+import click
+
+from astoria.astdiskd.disk_manager import DiskManager
+from astoria.astmetad.metadata_manager import MetadataManager
+from astoria.astprocd.process_manager import ProcessManager
+from astoria.astwifid.wifi_manager import WiFiManager
+from astoria.common.components import StateManager
+from astoria.common.mqtt.loopback import LoopbackHub
+
+LOGGER = logging.getLogger(__name__)
+
+loop = asyncio.get_event_loop()
+
+MANAGERS: Dict[str, Type[StateManager]] = {  # type: ignore[type-arg]
+    "astdiskd": DiskManager,
+    "astmetad": MetadataManager,
+    "astprocd": ProcessManager,
+    "astwifid": WiFiManager,
+}
+
+DEFAULT_MANAGERS = ("astdiskd", "astmetad", "astprocd")
+
+
+async def run_components(
+    components: Sequence[StateManager],  # type: ignore[type-arg]
+) -> None:
+    """
+    Run the components until one of them stops, then halt the others.
+
+    A manager stops if it is halted, or loses one of its dependencies. The
+    others depend on each other, so they are not left running without it.
+
+    :param components: The components to run.
+    """
+    tasks = {asyncio.ensure_future(c.run()): c for c in components}
+    done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+
+    for task in done:
+        LOGGER.info(f"{tasks[task].name} has stopped, halting the other managers")
+    for component in components:
+        component.halt(silent=True)
+
+    # Raise the first error from any of the components, once they have all stopped.
+    await asyncio.gather(*tasks)
+
+
+@click.command("astoriad")
+@click.option(
+    "-m",
+    "--manager",
+    "managers",
+    multiple=True,
+    type=click.Choice(sorted(MANAGERS)),
+    help=f"Manager to run, may be repeated. Defaults to {', '.join(DEFAULT_MANAGERS)}.",
+)
+@click.option("-v", "--verbose", is_flag=True)
+@click.option("-c", "--config-file", type=click.Path(exists=True))
+def main(
+    *,
+    managers: Tuple[str, ...],
+    verbose: bool,
+    config_file: Optional[str],
+) -> None:
+    """Astoria Daemon Application Entrypoint."""
+    # Configure logging before the managers, as they would label every log
+    # message with the name of the first manager.
+    logging.basicConfig(
+        level=logging.DEBUG if verbose else logging.INFO,
+        format="%(asctime)s %(name)s %(levelname)s %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+    hub = LoopbackHub()
+    components: List[StateManager] = [  # type: ignore[type-arg]
+        MANAGERS[name](verbose, config_file, hub=hub)
+        for name in dict.fromkeys(managers or DEFAULT_MANAGERS)
+    ]
+
+    # Each manager adds signal handlers that only halt itself, and each one
+    # replaces the handlers of the manager before it, so they are replaced
+    # again with handlers that halt every manager.
+    def halt() -> None:
+        LOGGER.info("Halting")
+        for component in components:
+            component.halt(silent=True)
+
+    for signal in (SIGHUP, SIGINT, SIGTERM):
+        loop.add_signal_handler(signal, halt)
+
+    loop.run_until_complete(run_components(components))
+
+
+if __name__ == "__main__":
+    main()
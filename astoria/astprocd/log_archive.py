@@ -0,0 +1,65 @@
+"""Keep compressed copies of the logs of previous code runs."""
+
+import gzip
+import logging
+import re
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+LOGGER = logging.getLogger(__name__)
+
+ARCHIVE_NAME_REGEX = re.compile(r"^log-(\d+)-(\d{8}T\d{6}Z)\.txt\.gz$")
+
+
+def get_archive_path(log_path: Path, pid: int, start_time: datetime) -> Path:
+    """
+    Get the path to archive a log file to.
+
+    :param log_path: The path of the log file.
+    :param pid: The pid of the code run that the log is from.
+    :param start_time: The time that the code run started, in UTC.
+    :returns: The path of the archive, next to the log file.
+    """
+    return log_path.with_name(f"log-{pid}-{start_time:%Y%m%dT%H%M%SZ}.txt.gz")
+
+
+def list_archives(directory: Path) -> List[Path]:
+    """
+    List the log archives in a directory, from oldest to newest.
+
+    :param directory: The directory to search.
+    :returns: The paths of the archives.
+    """
+    archives = []
+    for path in directory.iterdir():
+        match = ARCHIVE_NAME_REGEX.match(path.name)
+        if match:
+            archives.append((match.group(2), int(match.group(1)), path))
+    return [path for _, _, path in sorted(archives)]
+
+
+def archive_log(log_path: Path, pid: int, start_time: datetime, *, keep: int) -> None:
+    """
+    Compress a copy of a log file, and remove the oldest archives.
+
+    This function blocks, so should be run in an executor.
+
+    :param log_path: The path of the log file.
+    :param pid: The pid of the code run that the log is from.
+    :param start_time: The time that the code run started, in UTC.
+    :param keep: The number of archives to keep.
+    """
+    archive_path = get_archive_path(log_path, pid, start_time)
+    try:
+        with log_path.open("rb") as src, gzip.open(archive_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+
+        archives = list_archives(log_path.parent)
+        for path in archives[: max(len(archives) - keep, 0)]:
+            LOGGER.debug(f"Removing old log archive {path}")
+            path.unlink()
+    except OSError:
+        # The disk may have been removed.
+        LOGGER.warning(f"Unable to archive log file {log_path}")
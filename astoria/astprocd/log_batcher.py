@@ -0,0 +1,85 @@
+"""Batch usercode log lines into broadcast events."""
+
+import asyncio
+import logging
+from time import monotonic
+from typing import List, Optional
+
+from astoria.common.ipc import (
+    LogEventSource,
+    UsercodeLogBatchBroadcastEvent,
+    UsercodeLogLine,
+)
+from astoria.common.mqtt import BroadcastHelper
+
+LOGGER = logging.getLogger(__name__)
+
+
+class LogBatcher:
+    """
+    Collects the log lines of a code run, and sends them in batches.
+
+    A batch is sent when it reaches the maximum size, or when its oldest line
+    has waited for the maximum latency, whichever is first.
+    """
+
+    def __init__(
+        self,
+        log_helper: BroadcastHelper[UsercodeLogBatchBroadcastEvent],
+        pid: int,
+        *,
+        max_lines: int = 64,
+        max_latency: float = 0.02,
+    ) -> None:
+        if max_lines < 1:
+            raise ValueError("A batch must contain at least one line")
+        self._log_helper = log_helper
+        self._pid = pid
+        self._max_lines = max_lines
+        self._max_latency = max_latency
+
+        self._start = monotonic()
+        self._lines: List[UsercodeLogLine] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def add(self, content: str, source: LogEventSource, sequence: int) -> UsercodeLogLine:
+        """
+        Add a line to the current batch.
+
+        :param content: The line of log output, including the new line.
+        :param source: The source of the line.
+        :param sequence: The position of the line in the log of the code run.
+        :returns: The line that was added.
+        """
+        # The values are already known to be valid, so validation is skipped.
+        line = UsercodeLogLine.construct(
+            sequence=sequence,
+            source=source,
+            timestamp=monotonic() - self._start,
+            content=content,
+        )
+        self._lines.append(line)
+
+        if len(self._lines) >= self._max_lines:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_event_loop().call_later(
+                self._max_latency,
+                self.flush,
+            )
+        return line
+
+    def flush(self) -> None:
+        """Send the current batch, if it contains any lines."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._lines:
+            return
+
+        lines, self._lines = self._lines, []
+        self._log_helper.send(
+            pid=self._pid,
+            priority=lines[0].sequence,
+            lines=lines,
+        )
@@ -0,0 +1,98 @@
+"""Format the lines of usercode log files."""
+
+from datetime import timedelta
+from string import Template
+from time import monotonic_ns
+from typing import Dict, List, Optional, Sequence
+
+from astoria.common.metadata import Metadata
+
+MICROSECONDS_PER_SECOND = 1_000_000
+
+# Rendering the microseconds from three digit strings is faster than formatting them.
+_DIGITS = [f"{i:03d}" for i in range(1000)]
+
+
+class LogLineFormatter:
+    """
+    Prefix log lines with the time since the log was started.
+
+    The elapsed time is rendered in the same way as a ``timedelta``, e.g.
+    ``0:01:02.345678``, or ``0:01:02`` on a whole second. Lines are usually
+    logged in bursts, so the part before the microseconds is only rendered
+    again when the second changes.
+    """
+
+    def __init__(self, start_ns: Optional[int] = None) -> None:
+        self._start_ns = monotonic_ns() if start_ns is None else start_ns
+        self._cached_second = -1
+        self._cached_prefix = ""
+
+    @property
+    def start_ns(self) -> int:
+        """The monotonic time that the log was started, in nanoseconds."""
+        return self._start_ns
+
+    def timestamp(self, now_ns: Optional[int] = None) -> str:
+        """
+        Render the time since the log was started.
+
+        :param now_ns: The monotonic time to render, in nanoseconds.
+        :returns: The elapsed time in brackets, e.g. ``[0:01:02.345678]``.
+        """
+        # Remove the space that separates the timestamp from the content.
+        return self.format("", now_ns)[:-1]
+
+    def format(self, content: str, now_ns: Optional[int] = None) -> str:
+        """
+        Prefix a line with the time since the log was started.
+
+        This is called for every line of output, so is kept as cheap as possible.
+
+        :param content: The line, including the new line.
+        :param now_ns: The monotonic time of the line, in nanoseconds.
+        :returns: The line to write to the log.
+        """
+        elapsed_us = max(
+            ((monotonic_ns() if now_ns is None else now_ns) - self._start_ns) // 1000,
+            0,
+        )
+        second = elapsed_us // MICROSECONDS_PER_SECOND
+        if second != self._cached_second:
+            self._cached_prefix = f"[{timedelta(seconds=second)}"
+            self._cached_second = second
+        elapsed_us -= second * MICROSECONDS_PER_SECOND
+        if elapsed_us == 0:
+            return f"{self._cached_prefix}] {content}"
+        return (
+            f"{self._cached_prefix}.{_DIGITS[elapsed_us // 1000]}"
+            f"{_DIGITS[elapsed_us % 1000]}] {content}"
+        )
+
+
+def compile_initial_log_lines(lines: Sequence[str]) -> List[Template]:
+    """
+    Compile the initial log lines from the config into templates.
+
+    The config does not change once it is loaded, so this is done once, rather
+    than for every run of the code.
+
+    :param lines: The initial log lines, which can contain ``$name`` variables.
+    :returns: A template for each line.
+    """
+    return [Template(line) for line in lines]
+
+
+def render_initial_log_lines(
+    templates: Sequence[Template],
+    metadata: Metadata,
+) -> List[str]:
+    """
+    Substitute the metadata into the initial log lines.
+
+    :param templates: The compiled initial log lines.
+    :param metadata: The metadata to substitute.
+    :returns: The lines, without new lines.
+    """
+    values: Dict[str, object] = metadata.dict()
+    return [template.safe_substitute(values) for template in templates]
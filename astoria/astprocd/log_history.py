@@ -0,0 +1,74 @@
+"""Keep the recent usercode log lines, so that they can be replayed."""
+
+import logging
+from collections import deque
+from itertools import islice
+from typing import Deque, List, Tuple
+
+from astoria.common.ipc import UsercodeLogLine, UsercodeLogReplayLine
+
+LOGGER = logging.getLogger(__name__)
+
+# The maximum number of lines in a page of replayed lines.
+MAX_REPLAY_PAGE_SIZE = 1024
+
+
+class LogHistory:
+    """
+    A ring buffer of the most recent log lines, across code runs.
+
+    Each line is given a cursor, which increases across code runs, so that
+    the lines can be read in pages by a viewer that joins part way through a
+    run. The oldest lines are discarded once the buffer is full.
+    """
+
+    def __init__(self, max_lines: int = 10000) -> None:
+        self._lines: Deque[UsercodeLogReplayLine] = deque(maxlen=max_lines)
+        self._next_cursor = 0
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    @property
+    def next_cursor(self) -> int:
+        """The cursor that the next line will be given."""
+        return self._next_cursor
+
+    def add(self, pid: int, line: UsercodeLogLine) -> None:
+        """
+        Add a line to the history.
+
+        :param pid: The pid of the code run that the line is from.
+        :param line: The line of log output.
+        """
+        # The values are already known to be valid, so validation is skipped.
+        self._lines.append(
+            UsercodeLogReplayLine.construct(
+                sequence=line.sequence,
+                source=line.source,
+                timestamp=line.timestamp,
+                content=line.content,
+                pid=pid,
+                cursor=self._next_cursor,
+            ),
+        )
+        self._next_cursor += 1
+
+    def read(self, cursor: int, limit: int) -> Tuple[List[UsercodeLogReplayLine], int]:
+        """
+        Read a page of lines from the history.
+
+        If the line at the cursor has already been discarded, the page starts
+        at the oldest line that is still available.
+
+        :param cursor: The cursor of the first line to read.
+        :param limit: The maximum number of lines to read.
+        :returns: The lines, and the cursor of the line after the last one.
+        """
+        limit = min(max(limit, 1), MAX_REPLAY_PAGE_SIZE)
+        first_cursor = self._next_cursor - len(self._lines)
+        start = max(cursor - first_cursor, 0)
+        lines = list(islice(self._lines, start, start + limit))
+        if lines:
+            return lines, lines[-1].cursor + 1
+        return lines, max(cursor, first_cursor)
@@ -0,0 +1,98 @@
+"""Limit the rate of usercode log lines that are broadcast."""
+
+import asyncio
+import logging
+from time import monotonic
+from typing import Callable, Dict, Optional
+
+from astoria.common.ipc import LogEventSource
+
+LOGGER = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    A token bucket rate limiter.
+
+    Tokens are added at a constant rate, up to the capacity of the bucket,
+    which allows short bursts above the rate.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._last = monotonic()
+
+    def take(self) -> bool:
+        """
+        Take a token from the bucket.
+
+        :returns: True if there was a token to take.
+        """
+        now = monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._last) * self._rate)
+        self._last = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+
+class LogRateLimiter:
+    """
+    Limit the rate of log lines that are broadcast from each source.
+
+    Lines over the limit are counted, and the summary callback is called with
+    the number of lines that were suppressed from each source, at most once
+    per summary interval.
+    """
+
+    def __init__(
+        self,
+        summary_callback: Callable[[LogEventSource, int], None],
+        *,
+        rate: float,
+        burst: int,
+        summary_interval: float = 1,
+    ) -> None:
+        self._summary_callback = summary_callback
+        self._rate = rate
+        self._burst = burst
+        self._summary_interval = summary_interval
+
+        self._buckets: Dict[LogEventSource, TokenBucket] = {}
+        self._suppressed: Dict[LogEventSource, int] = {}
+        self._summary_handle: Optional[asyncio.TimerHandle] = None
+
+    def allow(self, source: LogEventSource) -> bool:
+        """
+        Check whether a line from a source can be broadcast.
+
+        :param source: The source of the line.
+        :returns: True if the line is within the limit for the source.
+        """
+        bucket = self._buckets.get(source)
+        if bucket is None:
+            bucket = self._buckets[source] = TokenBucket(self._rate, self._burst)
+        if bucket.take():
+            return True
+
+        self._suppressed[source] = self._suppressed.get(source, 0) + 1
+        if self._summary_handle is None:
+            self._summary_handle = asyncio.get_event_loop().call_later(
+                self._summary_interval,
+                self.flush,
+            )
+        return False
+
+    def flush(self) -> None:
+        """Report the lines that have been suppressed since the last summary."""
+        if self._summary_handle is not None:
+            self._summary_handle.cancel()
+            self._summary_handle = None
+
+        suppressed, self._suppressed = self._suppressed, {}
+        for source, count in suppressed.items():
+            LOGGER.debug(f"Suppressed {count} lines of usercode {source.value}")
+            self._summary_callback(source, count)
@@ -0,0 +1,150 @@
+"""Write usercode log files without blocking the event loop."""
+
+import asyncio
+import atexit
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import List, Set
+
+LOGGER = logging.getLogger(__name__)
+
+# Writers that have not been closed, which are closed when the process exits.
+_OPEN_WRITERS: Set["LogFileWriter"] = set()
+
+
+class LogFileWriter:
+    """
+    Write a log file from a dedicated thread.
+
+    Writes to the disk can be slow, particularly to USB drives, so lines are
+    buffered in memory and written by a thread instead of the event loop. The
+    buffer is written when it reaches the flush size, when the flush interval
+    has passed, and when the writer is closed.
+
+    If the disk cannot keep up and the buffer reaches its maximum size, lines
+    are dropped, and a note of how many were dropped is written to the log.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        flush_size: int = 16 * 1024,
+        flush_interval: float = 0.5,
+        max_buffer: int = 4 * 1024 * 1024,
+    ) -> None:
+        self._path = path
+        self._flush_size = flush_size
+        self._flush_interval = flush_interval
+        self._max_buffer = max_buffer
+
+        self._fh = path.open("w")
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending: List[str] = []
+        self._pending_size = 0
+        self._closing = False
+        self._unreported_drops = 0
+
+        self.dropped = 0
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"log-writer-{path}",
+            daemon=True,
+        )
+        self._thread.start()
+        _OPEN_WRITERS.add(self)
+
+    @property
+    def path(self) -> Path:
+        """The path of the log file."""
+        return self._path
+
+    def write(self, data: str) -> None:
+        """
+        Add data to the buffer, to be written by the writer thread.
+
+        :param data: The data to write.
+        :raises ValueError: The writer has been closed.
+        """
+        with self._lock:
+            if self._closing:
+                raise ValueError(f"Log writer for {self._path} is closed")
+            if self._pending_size + len(data) > self._max_buffer:
+                self.dropped += 1
+                self._unreported_drops += 1
+                return
+            self._pending.append(data)
+            self._pending_size += len(data)
+            full = self._pending_size >= self._flush_size
+        if full:
+            self._wake.set()
+
+    def flush(self) -> None:
+        """Write the buffer as soon as possible, without waiting for it."""
+        self._wake.set()
+
+    def close(self) -> None:
+        """
+        Write the buffer and close the file.
+
+        Blocks until the file is closed.
+        """
+        with self._lock:
+            self._closing = True
+        self._wake.set()
+        self._thread.join()
+        _OPEN_WRITERS.discard(self)
+
+    async def aclose(self) -> None:
+        """Write the buffer and close the file, without blocking the event loop."""
+        await asyncio.get_event_loop().run_in_executor(None, self.close)
+
+    def _run(self) -> None:
+        """Write the buffer whenever it is full, or the flush interval has passed."""
+        try:
+            closing = False
+            while not closing:
+                self._wake.wait(self._flush_interval)
+                self._wake.clear()
+                with self._lock:
+                    closing = self._closing
+                self._write_pending()
+
+            # The log must survive a crash or power loss once it is closed.
+            os.fsync(self._fh.fileno())
+        except OSError:
+            LOGGER.exception(f"Unable to write log file {self._path}")
+        finally:
+            self._fh.close()
+
+    def _write_pending(self) -> None:
+        """Write the data in the buffer to the file."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._pending_size = 0
+            drops, self._unreported_drops = self._unreported_drops, 0
+        if not pending and not drops:
+            return
+
+        self._fh.write("".join(pending))
+        if drops:
+            self._fh.write(f"[{drops} lines were not logged as the disk is too slow]\n")
+        self._fh.flush()
+
+
+def flush_all() -> None:
+    """Write the buffers of all open log writers as soon as possible."""
+    for writer in list(_OPEN_WRITERS):
+        writer.flush()
+
+
+@atexit.register
+def _close_all() -> None:
+    """Close all open log writers, so that no lines are lost when exiting."""
+    for writer in list(_OPEN_WRITERS):
+        writer.close()
@@ -11,13 +11,20 @@ from astoria.common.ipc import (
     ProcessManagerMessage,
     RequestResponse,
     UsercodeKillManagerRequest,
+    UsercodeLogBatchBroadcastEvent,
     UsercodeLogBroadcastEvent,
+    UsercodeLogReplayManagerRequest,
+    UsercodeLogReplayResponse,
+    UsercodeResourceMetrics,
     UsercodeRestartManagerRequest,
 )
 from astoria.common.metadata import Metadata
 from astoria.common.mixins import DiskHandlerMixin, MetadataHandlerMixin
-from astoria.common.mqtt import BroadcastHelper
+from astoria.common.mqtt import BroadcastHelper, OverflowPolicy, PublishPriority
 
+from .log_format import compile_initial_log_lines
+from .log_history import LogHistory
+from .log_writer import flush_all
 from .usercode_lifecycle import UsercodeLifecycle
 
 LOGGER = logging.getLogger(__name__)
@@ -40,9 +47,23 @@ class ProcessManager(
     def _init(self) -> None:
         self._lifecycle: Optional[UsercodeLifecycle] = None
         self._cur_disks: Dict[DiskUUID, DiskInfo] = {}
+        self._log_history = LogHistory(self.config.astprocd.log_replay_lines)
+        self._initial_log_lines = compile_initial_log_lines(
+            self.config.system.initial_log_lines,
+        )
 
-        self._mqtt.subscribe("astdiskd", self.handle_astdiskd_disk_info_message)
-        self._mqtt.subscribe("astmetad", self.handle_astmetad_message)
+        self._mqtt.subscribe(
+            "astdiskd",
+            self.handle_astdiskd_disk_info_message,
+            overflow=OverflowPolicy.LATEST_WINS,
+        )
+        self._mqtt.subscribe("astdiskd/patch", self.handle_astdiskd_patch_message)
+        self._mqtt.subscribe(
+            "astmetad",
+            self.handle_astmetad_message,
+            overflow=OverflowPolicy.LATEST_WINS,
+        )
+        self._mqtt.subscribe("astmetad/patch", self.handle_astmetad_patch_message)
 
         self._register_request(
             "restart",
@@ -54,9 +75,23 @@ class ProcessManager(
             UsercodeKillManagerRequest,
             self.handle_kill_request,
         )
+        self._register_request(
+            "log_replay",
+            UsercodeLogReplayManagerRequest,
+            self.handle_log_replay_request,
+        )
+        # Log lines are also written to disk, so can be shed if the broker is slow.
         self._log_helper = BroadcastHelper.get_helper(
             self._mqtt,
             UsercodeLogBroadcastEvent,
+            priority=PublishPriority.LOW,
+            receive=False,
+        )
+        self._log_batch_helper = BroadcastHelper.get_helper(
+            self._mqtt,
+            UsercodeLogBatchBroadcastEvent,
+            priority=PublishPriority.LOW,
+            receive=False,
         )
 
     @property
@@ -71,12 +106,21 @@ class ProcessManager(
             status=ProcessManagerMessage.Status.STOPPED,
         )
 
+    @property
+    def status_publish_interval(self) -> float:
+        """Minimum time between status publications, in seconds."""
+        return self.config.system.status_publish_interval
+
     async def main(self) -> None:
         """Main routine for astprocd."""
         # Wait whilst the program is running.
         self.update_status()
         await self.wait_loop()
 
+        # Start writing buffered logs now, in case usercode is still running.
+        # Anything left is written when astprocd exits.
+        flush_all()
+
         for uuid, info in self._cur_disks.items():
             asyncio.ensure_future(self.handle_disk_removal(uuid, info))
 
@@ -98,6 +142,10 @@ class ProcessManager(
                     self._log_helper,
                     self.config,
                     self._recent_metadata,
+                    log_batch_helper=self._log_batch_helper,
+                    log_history=self._log_history,
+                    metrics_callback=self.publish_metrics,
+                    initial_log_lines=self._initial_log_lines,
                 )
                 asyncio.ensure_future(self._lifecycle.run_process())
             else:
@@ -141,6 +189,20 @@ class ProcessManager(
                 success=True,
             )
 
+    async def handle_log_replay_request(
+        self,
+        request: UsercodeLogReplayManagerRequest,
+    ) -> UsercodeLogReplayResponse:
+        """Handle a request for a page of recent log lines."""
+        lines, next_cursor = self._log_history.read(request.cursor, request.limit)
+        return UsercodeLogReplayResponse(
+            uuid=request.uuid,
+            success=True,
+            lines=lines,
+            next_cursor=next_cursor,
+            more=next_cursor < self._log_history.next_cursor,
+        )
+
     async def handle_restart_request(
         self,
         request: UsercodeRestartManagerRequest,
@@ -167,6 +229,20 @@ class ProcessManager(
                     success=True,
                 )
 
+    def publish_metrics(self, metrics: UsercodeResourceMetrics) -> None:
+        """
+        Publish the resource usage of the usercode.
+
+        The metrics are retained, so that they can be shown when the code is not
+        running. They are dropped first if the broker connection is congested.
+        """
+        self._mqtt.publish(
+            "metrics",
+            metrics,
+            retain=True,
+            priority=PublishPriority.LOW,
+        )
+
     def update_status(self, code_status: Optional[CodeStatus] = None) -> None:
         """
         Calculate and update the status of this manager.
@@ -0,0 +1,199 @@
+"""Sample the resource usage of usercode from /proc."""
+
+import asyncio
+import logging
+import os
+from pathlib import Path
+from time import monotonic
+from typing import Callable, NamedTuple, Optional, Tuple
+
+from astoria.common.ipc import ResourceRollup, UsercodeResourceMetrics
+
+LOGGER = logging.getLogger(__name__)
+
+PROC_PATH = Path("/proc")
+
+CLOCK_TICKS_PER_SECOND = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+class ResourceSample(NamedTuple):
+    """The resource usage of a process group at a point in time."""
+
+    processes: int
+    cpu_time: float  # seconds
+    rss: int  # bytes
+    threads: int
+    read_bytes: int
+    write_bytes: int
+
+
+def _read_io_counters(proc_dir: Path) -> Tuple[int, int]:
+    """Read the storage I/O counters of a process, which may not be readable."""
+    read_bytes = write_bytes = 0
+    try:
+        with (proc_dir / "io").open() as fh:
+            for line in fh:
+                name, _, value = line.partition(":")
+                if name == "read_bytes":
+                    read_bytes = int(value)
+                elif name == "write_bytes":
+                    write_bytes = int(value)
+    except (OSError, ValueError):
+        pass
+    return read_bytes, write_bytes
+
+
+def sample_process_group(
+    pgid: int,
+    proc_path: Path = PROC_PATH,
+) -> Optional[ResourceSample]:
+    """
+    Sum the resource usage of the processes in a process group.
+
+    This function reads every process in /proc, so should be run in an executor.
+
+    :param pgid: The process group to sample.
+    :param proc_path: The mount point of procfs.
+    :returns: The sample, or None if there are no processes in the group.
+    """
+    processes = cpu_ticks = rss_pages = threads = read_bytes = write_bytes = 0
+    for proc_dir in proc_path.iterdir():
+        if not proc_dir.name.isdigit():
+            continue
+        try:
+            stat = (proc_dir / "stat").read_text()
+        except OSError:
+            # The process has exited.
+            continue
+
+        # The command name is in brackets, and can contain spaces.
+        fields = stat[stat.rfind(")") + 2 :].split()
+        try:
+            if int(fields[2]) != pgid:
+                continue
+            process_ticks = int(fields[11]) + int(fields[12])
+            process_threads = int(fields[17])
+            process_rss_pages = int(fields[21])
+        except (IndexError, ValueError):
+            LOGGER.debug(f"Unable to parse {proc_dir / 'stat'}")
+            continue
+
+        process_read_bytes, process_write_bytes = _read_io_counters(proc_dir)
+        processes += 1
+        cpu_ticks += process_ticks
+        threads += process_threads
+        rss_pages += process_rss_pages
+        read_bytes += process_read_bytes
+        write_bytes += process_write_bytes
+
+    if processes == 0:
+        return None
+    return ResourceSample(
+        processes=processes,
+        cpu_time=cpu_ticks / CLOCK_TICKS_PER_SECOND,
+        rss=rss_pages * PAGE_SIZE,
+        threads=threads,
+        read_bytes=read_bytes,
+        write_bytes=write_bytes,
+    )
+
+
+class _Rollup:
+    """Accumulate the minimum, maximum, average and latest values of a metric."""
+
+    __slots__ = ("_min", "_max", "_total", "_count", "_last")
+
+    def __init__(self) -> None:
+        self._min = float("inf")
+        self._max = float("-inf")
+        self._total = 0.0
+        self._count = 0
+        self._last = 0.0
+
+    def add(self, value: float) -> ResourceRollup:
+        self._min = min(self._min, value)
+        self._max = max(self._max, value)
+        self._total += value
+        self._count += 1
+        self._last = value
+        return ResourceRollup(
+            min=self._min,
+            max=self._max,
+            avg=self._total / self._count,
+            last=self._last,
+        )
+
+
+class ResourceSampler:
+    """
+    Periodically sample the resource usage of the usercode process group.
+
+    The usercode is started in a new session, so its pid is also the id of the
+    process group, which includes any processes that it starts.
+    """
+
+    def __init__(
+        self,
+        pid: int,
+        callback: Callable[[UsercodeResourceMetrics], None],
+        *,
+        interval: float = 1,
+        proc_path: Path = PROC_PATH,
+    ) -> None:
+        self._pid = pid
+        self._callback = callback
+        self._interval = interval
+        self._proc_path = proc_path
+
+        self._samples = 0
+        self._last_cpu: Optional[Tuple[float, float]] = None
+        self._cpu_percent = _Rollup()
+        self._rss = _Rollup()
+        self._threads = _Rollup()
+
+    async def run(self) -> None:
+        """Sample the process group until it has no processes."""
+        loop = asyncio.get_event_loop()
+        while True:
+            sample = await loop.run_in_executor(
+                None,
+                sample_process_group,
+                self._pid,
+                self._proc_path,
+            )
+            if sample is None:
+                return
+            self._callback(self.update(sample, monotonic()))
+            await asyncio.sleep(self._interval)
+
+    def update(self, sample: ResourceSample, now: float) -> UsercodeResourceMetrics:
+        """
+        Add a sample to the rollups.
+
+        :param sample: The sample.
+        :param now: The monotonic time that the sample was taken.
+        :returns: The metrics, including the sample.
+        """
+        # CPU usage is measured between samples, so the first sample has none.
+        cpu_percent = 0.0
+        if self._last_cpu is not None:
+            last_time, last_cpu_time = self._last_cpu
+            if now > last_time:
+                # CPU time goes down when a process in the group exits.
+                used = max(sample.cpu_time - last_cpu_time, 0)
+                cpu_percent = 100 * used / (now - last_time)
+        self._last_cpu = (now, sample.cpu_time)
+        self._samples += 1
+
+        return UsercodeResourceMetrics(
+            pid=self._pid,
+            samples=self._samples,
+            processes=sample.processes,
+            cpu_time=sample.cpu_time,
+            cpu_percent=self._cpu_percent.add(cpu_percent),
+            rss=self._rss.add(sample.rss),
+            threads=self._threads.add(sample.threads),
+            read_bytes=sample.read_bytes,
+            write_bytes=sample.write_bytes,
+        )
@@ -0,0 +1,65 @@
+"""Read lines of usercode output from a stream."""
+
+import asyncio
+import codecs
+import logging
+from typing import AsyncIterator
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_MAX_LINE_LENGTH = 16 * 1024
+
+# Appended to the parts of a line that has been split for being too long.
+LINE_CONTINUATION_MARKER = " [...]\n"
+
+
+async def read_lines(
+    stream: asyncio.StreamReader,
+    *,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_line_length: int = DEFAULT_MAX_LINE_LENGTH,
+) -> AsyncIterator[str]:
+    """
+    Read the lines of text from a stream.
+
+    The stream is read in large chunks, rather than a line at a time, and is
+    decoded incrementally so that characters split between chunks are kept.
+
+    Lines longer than the maximum length are split, with the continuation
+    marker at the end of each part except the last. The last line in the
+    stream is given a new line if it does not end with one.
+
+    :param stream: The stream to read from.
+    :param chunk_size: The maximum number of bytes to read at once.
+    :param max_line_length: The maximum length of a line, excluding the new line.
+    :returns: An iterator of lines, each ending with a new line.
+    """
+    if max_line_length < 1:
+        raise ValueError("The maximum line length must be at least 1")
+
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    buffer = ""
+    eof = False
+    while not eof:
+        chunk = await stream.read(chunk_size)
+        eof = chunk == b""
+        buffer += decoder.decode(chunk, final=eof)
+
+        start = 0
+        while True:
+            end = buffer.find("\n", start, start + max_line_length + 1)
+            if end >= 0:
+                yield buffer[start : end + 1]
+                start = end + 1
+            elif len(buffer) - start > max_line_length:
+                yield buffer[start : start + max_line_length] + LINE_CONTINUATION_MARKER
+                start += max_line_length
+            else:
+                break
+
+        # Only the incomplete line, which is shorter than the maximum, is kept.
+        buffer = buffer[start:]
+
+    if buffer:
+        yield buffer + "\n"
@@ -2,11 +2,13 @@
 
 import asyncio
 import logging
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
+from functools import partial
+from itertools import count
 from os import environ
 from signal import SIGKILL, SIGTERM
 from string import Template
-from typing import IO, Callable, Dict, Optional
+from typing import Callable, Dict, Optional, Sequence
 
 from astoria.common.code_status import CodeStatus
 from astoria.common.config import (
@@ -15,12 +17,32 @@ from astoria.common.config import (
     RobotSettingsException,
 )
 from astoria.common.disks import DiskInfo, DiskUUID
-from astoria.common.ipc import LogEventSource, UsercodeLogBroadcastEvent
+from astoria.common.ipc import (
+    LogEventSource,
+    UsercodeLogBatchBroadcastEvent,
+    UsercodeLogBroadcastEvent,
+    UsercodeResourceMetrics,
+)
 from astoria.common.metadata import Metadata
 from astoria.common.mqtt import BroadcastHelper
 
+from .log_archive import archive_log
+from .log_batcher import LogBatcher
+from .log_format import LogLineFormatter, render_initial_log_lines
+from .log_history import LogHistory
+from .log_limiter import LogRateLimiter
+from .log_writer import LogFileWriter
+from .resource_sampler import ResourceSampler
+from .stream_reader import read_lines
+
 LOGGER = logging.getLogger(__name__)
 
+# The maximum time to wait for the log file to be written after usercode exits.
+LOG_CLOSE_TIMEOUT = 1.0
+
+# The maximum time before lines that were not broadcast or repeated are reported.
+LOG_SUMMARY_INTERVAL = 1.0
+
 loop = asyncio.get_event_loop()
 
 
@@ -39,15 +61,28 @@ class UsercodeLifecycle:
         log_helper: BroadcastHelper[UsercodeLogBroadcastEvent],
         config: AstoriaConfig,
         metadata: Metadata,
+        *,
+        log_batch_helper: Optional[
+            BroadcastHelper[UsercodeLogBatchBroadcastEvent]
+        ] = None,
+        log_history: Optional[LogHistory] = None,
+        metrics_callback: Optional[Callable[[UsercodeResourceMetrics], None]] = None,
+        initial_log_lines: Sequence[Template] = (),
     ) -> None:
         self._uuid = uuid
         self._disk_info = disk_info
         self._status_inform_callback = status_inform_callback
         self._log_helper = log_helper
+        self._log_batch_helper = log_batch_helper
+        # Lines are added to the history as they are batched, so it needs a batch helper.
+        self._log_history = log_history
+        self._metrics_callback = metrics_callback
+        self._initial_log_lines = initial_log_lines
         self._config = config
         self._metadata = metadata
 
         self._process: Optional[asyncio.subprocess.Process] = None
+        self._logger_task: Optional[asyncio.Future[None]] = None
         self._process_end_event = asyncio.Event()
         self._process_lock = asyncio.Lock()
 
@@ -115,6 +150,10 @@ class UsercodeLifecycle:
                     "Starting usercode execution with " f"entrypoint {self._entrypoint}",
                 )
                 self._process_end_event.clear()
+                # The logger of the previous run may still be writing or archiving
+                # log.txt, which must finish before it is truncated for this run.
+                if self._logger_task is not None:
+                    await asyncio.wait([self._logger_task])
                 self._process = await asyncio.create_subprocess_exec(
                     "python3",
                     "-u",
@@ -127,11 +166,12 @@ class UsercodeLifecycle:
                     env={**environ.copy(), **self._config.env},
                 )
                 if self._process is not None:
+                    self._logger_task = None
                     if (
                         self._process.stdout is not None
                         and self._process.stderr is not None
                     ):
-                        asyncio.ensure_future(
+                        self._logger_task = asyncio.ensure_future(
                             self.logger(
                                 {
                                     LogEventSource.STDOUT: self._process.stdout,
@@ -141,6 +181,18 @@ class UsercodeLifecycle:
                         )
                     else:
                         LOGGER.warning("Unable to start logger task.")
+
+                    # The usercode is the leader of a new process group.
+                    sampler_task: Optional[asyncio.Future[None]] = None
+                    interval = self._config.astprocd.resource_sample_interval
+                    if self._metrics_callback is not None and interval > 0:
+                        sampler = ResourceSampler(
+                            self._process.pid,
+                            self._metrics_callback,
+                            interval=interval,
+                        )
+                        sampler_task = asyncio.ensure_future(sampler.run())
+
                     self.status = CodeStatus.RUNNING
                     LOGGER.info(
                         f"Usercode pid {self._process.pid} "
@@ -150,6 +202,13 @@ class UsercodeLifecycle:
                     # Wait for the subprocess to exit.
                     # This may include if it is killed.
                     rc = await self._process.wait()
+                    if sampler_task is not None:
+                        sampler_task.cancel()
+
+                    # Give the logger a chance to write the end of the log file
+                    # before the exit is reported.
+                    if self._logger_task is not None:
+                        await asyncio.wait([self._logger_task], timeout=LOG_CLOSE_TIMEOUT)
 
                     if rc == 0:
                         self.status = CodeStatus.FINISHED
@@ -209,60 +268,155 @@ class UsercodeLifecycle:
         else:
             pid = -1  # Use -1 if unknown
 
+        batcher: Optional[LogBatcher] = None
+        if self._log_batch_helper is not None:
+            batcher = LogBatcher(
+                self._log_batch_helper,
+                pid,
+                max_lines=self._config.astprocd.log_batch_size,
+                max_latency=self._config.astprocd.log_batch_latency,
+            )
+
+        # Lines from both streams share a sequence, so that they can be ordered.
+        sequence = count()
+        formatter = LogLineFormatter()
+
         def log(
-            fh: IO[str],
+            fh: LogFileWriter,
             data: str,
-            log_line_idx: int,
             source: LogEventSource = LogEventSource.ASTORIA,
         ) -> None:
             fh.write(data)
-            fh.flush()
-            self._log_helper.send(
-                pid=pid,
-                priority=log_line_idx,
-                content=data,
-                source=source,
+            # Every line is written to the log file, so broadcasts can be limited.
+            if (
+                limiter is None
+                or source is LogEventSource.ASTORIA
+                or limiter.allow(source)
+            ):
+                broadcast(data, source)
+
+        def broadcast(data: str, source: LogEventSource) -> None:
+            line_sequence = next(sequence)
+            if self._config.astprocd.legacy_log_events:
+                self._log_helper.send(
+                    pid=pid,
+                    priority=line_sequence,
+                    content=data,
+                    source=source,
+                )
+            if batcher is not None:
+                line = batcher.add(data, source, line_sequence)
+                if self._log_history is not None:
+                    self._log_history.add(pid, line)
+
+        def log_suppressed(source: LogEventSource, suppressed: int) -> None:
+            # Written to the log file as well, to show where lines are missing.
+            log(
+                fh,
+                formatter.format(
+                    f"[{suppressed} lines of {source.value} were not "
+                    "broadcast, see log.txt]\n",
+                ),
+            )
+
+        limiter: Optional[LogRateLimiter] = None
+        if self._config.astprocd.log_rate_limit > 0:
+            limiter = LogRateLimiter(
+                log_suppressed,
+                rate=self._config.astprocd.log_rate_limit,
+                burst=self._config.astprocd.log_rate_burst,
+                summary_interval=LOG_SUMMARY_INTERVAL,
             )
 
         async def read_from_stream(
             outputs: Dict[LogEventSource, asyncio.StreamReader],
             source: LogEventSource,
-            log_line_idx: int,
         ) -> None:
-            output = outputs[source]
-
-            data = await output.readline()
-            while data != b"":
-                data_str = data.decode("utf-8", errors="ignore")
-                time_passed = datetime.now(tz=timezone.utc) - start_time
-                log(fh, f"[{time_passed}] {data_str}", log_line_idx, source)
-                data = await output.readline()
-                log_line_idx += 1
-
-        with log_path.open("w") as fh:
-            log_line = 0
+            lines = read_lines(
+                outputs[source],
+                max_line_length=self._config.astprocd.log_max_line_length,
+            )
+            # Consecutive identical lines are collapsed into a count of repeats,
+            # which is written when a different line arrives, or after an
+            # interval if the line keeps repeating.
+            last_line: Optional[str] = None
+            repeats = 0
+            flush_handle: Optional[asyncio.TimerHandle] = None
+
+            def flush_repeats() -> None:
+                nonlocal repeats, flush_handle
+                if flush_handle is not None:
+                    flush_handle.cancel()
+                    flush_handle = None
+                if repeats:
+                    log(fh, repeated_message(repeats), source)
+                    repeats = 0
 
-            start_time = datetime.now(tz=timezone.utc)
-            time_passed = timedelta(0)
+            try:
+                async for data_str in lines:
+                    if data_str == last_line:
+                        repeats += 1
+                        if flush_handle is None:
+                            flush_handle = asyncio.get_event_loop().call_later(
+                                LOG_SUMMARY_INTERVAL,
+                                flush_repeats,
+                            )
+                        continue
+
+                    flush_repeats()
+                    log(fh, formatter.format(data_str), source)
+                    last_line = data_str
+            finally:
+                flush_repeats()
+
+        def repeated_message(repeats: int) -> str:
+            return formatter.format(f"[last line repeated {repeats} times]\n")
+
+        start_time = datetime.now(tz=timezone.utc)
+
+        # The file is written by a thread, so slow disks do not block the event loop.
+        fh = LogFileWriter(log_path)
+        try:
+            start_ns = formatter.start_ns
 
             # Print initial lines to the log, if any.
             # This is useful to show a message to the user in every log file.
-            if self._config.system.initial_log_lines:
-                log(fh, f"[{time_passed}] ---\n", log_line)
+            if self._initial_log_lines:
+                log(fh, formatter.format("---\n", start_ns))
 
-                for line in self._config.system.initial_log_lines:
-                    template = Template(line)
-                    line_substituted = template.safe_substitute(self._metadata.dict())
-                    log(fh, f"[{time_passed}] {line_substituted}\n", log_line)
+                for line in render_initial_log_lines(
+                    self._initial_log_lines,
+                    self._metadata,
+                ):
+                    log(fh, formatter.format(f"{line}\n", start_ns))
 
-                log(fh, f"[{time_passed}] ---\n", log_line)
+                log(fh, formatter.format("---\n", start_ns))
 
-            log(fh, f"[{time_passed}] === LOG STARTED ===\n", log_line)
-            log_line += 1
+            log(fh, formatter.format("=== LOG STARTED ===\n", start_ns))
 
             await asyncio.gather(
-                read_from_stream(proc_outputs, LogEventSource.STDOUT, log_line),
-                read_from_stream(proc_outputs, LogEventSource.STDERR, log_line),
+                read_from_stream(proc_outputs, LogEventSource.STDOUT),
+                read_from_stream(proc_outputs, LogEventSource.STDERR),
+            )
+            if limiter is not None:
+                limiter.flush()
+            log(fh, formatter.format("=== LOG FINISHED ===\n"))
+            if batcher is not None:
+                batcher.flush()
+        finally:
+            if limiter is not None:
+                # The summary must not be written after the file is closed.
+                limiter.flush()
+            await fh.aclose()
+
+        if self._config.astprocd.log_archive_count > 0:
+            await asyncio.get_event_loop().run_in_executor(
+                None,
+                partial(
+                    archive_log,
+                    log_path,
+                    pid,
+                    start_time,
+                    keep=self._config.astprocd.log_archive_count,
+                ),
             )
-            time_passed = datetime.now(tz=timezone.utc) - start_time
-            log(fh, f"[{time_passed}] === LOG FINISHED ===\n", log_line)
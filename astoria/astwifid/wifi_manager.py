@@ -12,6 +12,7 @@ from astoria.common.components import StateManager
 from astoria.common.ipc import WiFiManagerMessage
 from astoria.common.metadata import Metadata
 from astoria.common.mixins import MetadataHandlerMixin
+from astoria.common.mqtt import OverflowPolicy
 
 from .hotspot_lifecycle import WiFiHotspotLifeCycle
 from .lifecycle import AccessPointInfo, WiFiLifecycle
@@ -34,7 +35,12 @@ class WiFiManager(MetadataHandlerMixin, StateManager[WiFiManagerMessage]):
         self._lifecycle_lock = asyncio.Lock()
         self._lifecycle: Optional[WiFiLifecycle] = None
 
-        self._mqtt.subscribe("astmetad", self.handle_astmetad_message)
+        self._mqtt.subscribe(
+            "astmetad",
+            self.handle_astmetad_message,
+            overflow=OverflowPolicy.LATEST_WINS,
+        )
+        self._mqtt.subscribe("astmetad/patch", self.handle_astmetad_patch_message)
 
     async def main(self) -> None:
         """Main routine for astwifid."""
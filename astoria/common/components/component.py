@@ -18,6 +18,7 @@ from pydantic import BaseModel
 
 from astoria import __version__
 from astoria.common.config import AstoriaConfig
+from astoria.common.mqtt.loopback import LoopbackHub
 from astoria.common.mqtt.wrapper import MQTTWrapper
 
 LOGGER = logging.getLogger(__name__)
@@ -40,8 +41,11 @@ class DataComponent(metaclass=ABCMeta):
         self,
         verbose: bool,  # noqa: FBT001
         config_file: Optional[str],
+        *,
+        hub: Optional[LoopbackHub] = None,
     ) -> None:
         self.config = AstoriaConfig.load(config_file)
+        self._hub = hub
 
         self._setup_logging(verbose)
         self._setup_event_loop()
@@ -88,6 +92,7 @@ class DataComponent(metaclass=ABCMeta):
             last_will=self.last_will,
             dependencies=self.dependencies,
             no_dependency_event=self._stop_event,
+            hub=self._hub,
         )
 
     def _init(self) -> None:
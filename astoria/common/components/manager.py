@@ -3,13 +3,35 @@ import asyncio
 import logging
 from abc import ABCMeta, abstractmethod
 from json import JSONDecodeError, loads
-from typing import Callable, Coroutine, Generic, Match, Type, TypeVar
-
-from pydantic import ValidationError, parse_obj_as
-
-from astoria.common.ipc import ManagerMessage, ManagerRequest, RequestResponse
+from time import monotonic
+from typing import (
+    Any,
+    Callable,
+    Coroutine,
+    Dict,
+    Generic,
+    Match,
+    Optional,
+    Type,
+    TypeVar,
+)
+
+from pydantic import ValidationError
+
+from astoria.common.ipc import (
+    SCHEMA_REGISTRY,
+    ManagerMessage,
+    ManagerRequest,
+    ReceivedPayload,
+    RequestResponse,
+    StatusPatch,
+    create_merge_patch,
+)
+from astoria.common.mqtt.loopback import LoopbackHub
+from astoria.common.mqtt.wrapper import ReplyTo
 
 from .component import DataComponent
+from .response_cache import ResponseCache
 
 LOGGER = logging.getLogger(__name__)
 
@@ -28,6 +50,23 @@ class StateManager(DataComponent, Generic[T], metaclass=ABCMeta):
 
     _status: T
 
+    def __init__(
+        self,
+        verbose: bool,  # noqa: FBT001
+        config_file: Optional[str],
+        *,
+        hub: Optional[LoopbackHub] = None,
+    ) -> None:
+        # Responses are cached so that duplicate requests, such as QoS 1
+        # redeliveries or client retries, are only handled once.
+        self._response_cache = ResponseCache()
+        self._published_status: Optional[T] = None
+        self._last_status_publish = float("-inf")
+        self._status_publish_handle: Optional[asyncio.TimerHandle] = None
+        self._status_sequence = 0
+        self._published_snapshot: Optional[Dict[str, Any]] = None  # type: ignore
+        super().__init__(verbose, config_file, hub=hub)
+
     @property
     def status(self) -> T:
         """Get the status of the state manager."""
@@ -35,9 +74,68 @@ class StateManager(DataComponent, Generic[T], metaclass=ABCMeta):
 
     @status.setter
     def status(self, status: T) -> None:
-        """Set the status of the state manager."""
+        """
+        Set the status of the state manager.
+
+        The status is only published if it differs from the last published
+        status. If the status changes again within the minimum publish
+        interval, only the latest status is published at the end of it.
+        """
         self._status = status
-        self._mqtt.publish("", status, retain=True)
+        if self._status_publish_handle is not None:
+            # The pending publish will send the latest status.
+            return
+        if self._is_published(status):
+            return
+
+        delay = self._last_status_publish + self.status_publish_interval - monotonic()
+        if delay > 0:
+            self._status_publish_handle = asyncio.get_event_loop().call_later(
+                delay,
+                self._publish_status,
+            )
+        else:
+            self._publish_status()
+
+    @property
+    def status_publish_interval(self) -> float:
+        """Minimum time between status publications, in seconds."""
+        return 0
+
+    @property
+    def publish_status_patches(self) -> bool:
+        """Publish a merge patch to the patch topic with each status change."""
+        return False
+
+    def _is_published(self, status: T) -> bool:
+        """Is the status the same as the last published status?."""
+        # The published status is kept as it was set, without the sequence number.
+        return status == self._published_status
+
+    def _publish_status(self) -> None:
+        """Publish the current status, unless it has already been published."""
+        self._status_publish_handle = None
+        if self._is_published(self._status):
+            return
+
+        self._published_status = self._status
+        self._status_sequence += 1
+        self._status = self._status.copy(update={"sequence": self._status_sequence})
+        self._last_status_publish = monotonic()
+
+        # The patch is sent first, so that consumers applying patches can
+        # skip decoding the full status when it arrives.
+        if self.publish_status_patches:
+            snapshot = loads(self._status.json())
+            if self._published_snapshot is not None:
+                patch = StatusPatch(
+                    sequence=self._status_sequence,
+                    patch=create_merge_patch(self._published_snapshot, snapshot),
+                )
+                self._mqtt.publish("patch", patch)
+            self._published_snapshot = snapshot
+
+        self._mqtt.publish("", self._status, retain=True)
 
     @property
     @abstractmethod
@@ -62,7 +160,12 @@ class StateManager(DataComponent, Generic[T], metaclass=ABCMeta):
 
     async def _pre_disconnect(self) -> None:
         """Change status to offline before disconnecting from the broker."""
-        self.status = self.offline_status
+        # The offline status must be sent before disconnecting, so it cannot wait.
+        if self._status_publish_handle is not None:
+            self._status_publish_handle.cancel()
+            self._status_publish_handle = None
+        self._status = self.offline_status
+        self._publish_status()
 
     def _register_request(
         self,
@@ -71,15 +174,20 @@ class StateManager(DataComponent, Generic[T], metaclass=ABCMeta):
         handler: Callable[[RequestT], Coroutine[None, None, RequestResponse]],
     ) -> None:
         LOGGER.debug(f"Registering {name} request for {self.name} component")
+        decoder = SCHEMA_REGISTRY.decoder(typ)
 
-        async def _handler(match: Match[str], payload: str) -> None:
+        async def _handler(
+            match: Match[str],
+            payload: ReceivedPayload,
+            reply_to: Optional[ReplyTo],
+        ) -> None:
             try:
-                req = parse_obj_as(typ, loads(payload))
-                response = await handler(req)
-                self._mqtt.publish(
-                    f"request/{name}/{req.uuid}",
-                    response,
+                req = decoder.decode(payload)
+                response = await self._response_cache.get_or_handle(
+                    req.uuid,
+                    lambda: handler(req),
                 )
+                self._mqtt.publish_response(name, response, reply_to)
             except JSONDecodeError:
                 LOGGER.warning(
                     f"Received {name} request, but unable to decode JSON: {payload}",
@@ -90,4 +198,4 @@ class StateManager(DataComponent, Generic[T], metaclass=ABCMeta):
                 )
                 LOGGER.warning(str(e))
 
-        self._mqtt.subscribe(f"{self.name}/request/{name}", _handler)
+        self._mqtt.subscribe_request(f"{self.name}/request/{name}", _handler)
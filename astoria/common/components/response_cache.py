@@ -0,0 +1,110 @@
+"""
+Request Response Cache.
+
+Remembers the responses to recent manager requests, so that a request that
+is delivered more than once is only handled once.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from time import monotonic
+from typing import Awaitable, Callable, Tuple
+from uuid import UUID
+
+from astoria.common.ipc import RequestResponse
+
+LOGGER = logging.getLogger(__name__)
+
+# Defaults for the response cache of a state manager.
+RESPONSE_CACHE_SIZE = 256
+RESPONSE_CACHE_TTL = 60.0  # seconds
+
+
+class ResponseCache:
+    """
+    A bounded cache of request responses, keyed by request UUID.
+
+    A duplicate of a request that is still being handled waits for the
+    original to finish and shares its response. Entries expire after a
+    fixed time, and the oldest entries are evicted when the cache is full.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_size: int = RESPONSE_CACHE_SIZE,
+        ttl: float = RESPONSE_CACHE_TTL,
+    ) -> None:
+        if max_size <= 0:
+            raise ValueError("Maximum size must be positive")
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries: OrderedDict[
+            UUID,
+            Tuple[float, asyncio.Future[RequestResponse]],
+        ] = OrderedDict()
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, uuid: object) -> bool:
+        return uuid in self._entries
+
+    async def get_or_handle(
+        self,
+        uuid: UUID,
+        handler: Callable[[], Awaitable[RequestResponse]],
+    ) -> RequestResponse:
+        """
+        Get the response to a request, calling the handler if it is not cached.
+
+        If the handler raises an exception, nothing is cached so that a retry
+        of the request is handled again.
+
+        :param uuid: The UUID of the request.
+        :param handler: Called to handle the request if there is no response.
+        :returns: The response to the request.
+        """
+        self._expire()
+
+        entry = self._entries.get(uuid)
+        if entry is not None:
+            self.hits += 1
+            LOGGER.debug(f"Duplicate request {uuid}, using cached response")
+            return await asyncio.shield(entry[1])
+
+        future: asyncio.Future[RequestResponse] = asyncio.get_event_loop().create_future()
+        self._entries[uuid] = (monotonic() + self._ttl, future)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+        try:
+            response = await handler()
+        except asyncio.CancelledError:
+            self._forget(uuid, future)
+            future.cancel()
+            raise
+        except Exception as e:
+            self._forget(uuid, future)
+            future.set_exception(e)
+            # Mark the exception as retrieved, it is raised to our caller.
+            future.exception()
+            raise
+
+        future.set_result(response)
+        return response
+
+    def _forget(self, uuid: UUID, future: "asyncio.Future[RequestResponse]") -> None:
+        entry = self._entries.get(uuid)
+        if entry is not None and entry[1] is future:
+            del self._entries[uuid]
+
+    def _expire(self) -> None:
+        """Remove expired entries, which are always the oldest."""
+        now = monotonic()
+        while self._entries:
+            uuid, (expiry, _) = next(iter(self._entries.items()))
+            if expiry > now:
+                break
+            del self._entries[uuid]
@@ -4,10 +4,11 @@ System Configuration schema for Astoria.
 Common to all components.
 """
 import sys
+from enum import Enum
 from pathlib import Path
 from typing import BinaryIO, Dict, List, Optional
 
-from pydantic import BaseModel, parse_obj_as
+from pydantic import BaseModel, parse_obj_as, validator
 
 if sys.version_info >= (3, 11):
     import tomllib
@@ -15,20 +16,98 @@ else:
     import tomli as tomllib
 
 
+class PayloadEncoding(Enum):
+    """Encoding used for the payloads of published MQTT messages."""
+
+    JSON = "json"
+    MSGPACK = "msgpack"
+
+
+class TopicPolicy(BaseModel):
+    """
+    Delivery policy for messages published to matching topics.
+
+    The topic is relative to the topic prefix and may contain wildcards.
+    """
+
+    topic: str
+    qos: int = 1
+    retain: Optional[bool] = None  # If not set, the publisher decides.
+    message_expiry: Optional[int] = None  # Seconds, only supported by MQTT v5.
+
+    class Config:
+        """Pydantic config."""
+
+        extra = "forbid"
+
+    @validator("qos")
+    def validate_qos(cls, val: int) -> int:
+        """Validate that the QoS level exists."""
+        if val not in (0, 1, 2):
+            raise ValueError("QoS must be 0, 1 or 2.")
+        return val
+
+    @validator("message_expiry")
+    def validate_message_expiry(cls, val: Optional[int]) -> Optional[int]:
+        """Validate that the message expiry is positive."""
+        if val is not None and val <= 0:
+            raise ValueError("Message expiry must be a positive number of seconds.")
+        return val
+
+
 class MQTTBrokerInfo(BaseModel):
     """MQTT Broker Information."""
 
     host: str
     port: int
+    socket_path: Optional[Path] = None  # If set, used instead of the host and port
     enable_tls: bool = False
     topic_prefix: str = "astoria"
     force_protocol_version_3_1: bool = False
+    payload_encoding: PayloadEncoding = PayloadEncoding.JSON
+    publish_queue_size: int = 1000
+    publish_queue_high_water_mark: int = 500
+    topic_policies: List[TopicPolicy] = []  # Takes precedence over the defaults
+    reconnect: bool = False  # If False, components exit when the broker is lost
+    reconnect_delay_min: float = 0.5
+    reconnect_delay_max: float = 30
+    request_concurrency: int = 4  # Requests of each type that are handled at once
 
     class Config:
         """Pydantic config."""
 
         extra = "forbid"
 
+    @validator("enable_tls")
+    def validate_enable_tls(
+        cls,
+        val: bool,  # noqa: FBT001
+        values: Dict[str, object],
+    ) -> bool:
+        """Validate that TLS is not enabled for a Unix socket."""
+        if val and values.get("socket_path") is not None:
+            raise ValueError("TLS is not supported over a Unix socket.")
+        return val
+
+    @validator("reconnect_delay_min")
+    def validate_reconnect_delay_min(cls, val: float) -> float:
+        """Validate that the reconnect delay is positive."""
+        if val <= 0:
+            raise ValueError("Reconnect delay must be a positive number of seconds.")
+        return val
+
+    @validator("reconnect_delay_max")
+    def validate_reconnect_delay_max(
+        cls,
+        val: float,
+        values: Dict[str, object],
+    ) -> float:
+        """Validate that the maximum reconnect delay is at least the minimum."""
+        minimum = values.get("reconnect_delay_min")
+        if isinstance(minimum, float) and val < minimum:
+            raise ValueError("Maximum reconnect delay must be at least the minimum.")
+        return val
+
 
 class WiFiInfo(BaseModel):
     """System settings for WiFi."""
@@ -48,6 +127,7 @@ class SystemInfo(BaseModel):
 
     cache_dir: Path
     initial_log_lines: List[str] = []
+    status_publish_interval: float = 0.1  # Minimum seconds between status updates
 
     class Config:
         """Pydantic config."""
@@ -65,6 +145,15 @@ class ProcessManagerInfo(BaseModel):
     """Settings specifically for astprocd."""
 
     default_usercode_entrypoint: str = "robot.py"
+    log_batch_size: int = 64  # Maximum number of lines in a log batch event
+    log_batch_latency: float = 0.02  # Maximum time a line waits to be sent, in seconds
+    legacy_log_events: bool = True  # Also send a usercode_log event for each line
+    log_max_line_length: int = 16384  # Longer lines of output are split
+    log_replay_lines: int = 10000  # Number of recent lines kept for log_replay requests
+    log_archive_count: int = 5  # Compressed logs of previous runs to keep, 0 to disable
+    log_rate_limit: float = 500  # Lines broadcast per second per source, 0 for no limit
+    log_rate_burst: int = 1000  # Lines that can be broadcast at once, above the rate
+    resource_sample_interval: float = 1.0  # Seconds between samples, 0 to disable
 
 
 CONFIG_SEARCH_PATHS = [
@@ -4,8 +4,11 @@ from .broadcast_event import (
     BroadcastEvent,
     LogEventSource,
     StartButtonBroadcastEvent,
+    UsercodeLogBatchBroadcastEvent,
     UsercodeLogBroadcastEvent,
+    UsercodeLogLine,
 )
+from .log_reorder import LogReorderBuffer
 from .manager_messages import (
     DiskManagerMessage,
     ManagerMessage,
@@ -21,25 +24,65 @@ from .manager_requests import (
     RemoveStaticDiskRequest,
     RequestResponse,
     UsercodeKillManagerRequest,
+    UsercodeLogReplayLine,
+    UsercodeLogReplayManagerRequest,
+    UsercodeLogReplayResponse,
     UsercodeRestartManagerRequest,
 )
+from .resource_metrics import ResourceRollup, UsercodeResourceMetrics
+from .schema_registry import (
+    SCHEMA_REGISTRY,
+    DecodedPayload,
+    MessageDecoder,
+    Payload,
+    ReceivedPayload,
+    SchemaRegistry,
+    decode_message,
+    load_payload,
+)
+from .status_patch import (
+    StatusPatch,
+    StatusTracker,
+    apply_merge_patch,
+    create_merge_patch,
+)
 
 __all__ = [
+    "SCHEMA_REGISTRY",
     "AddStaticDiskRequest",
     "BroadcastEvent",
+    "DecodedPayload",
     "DiskManagerMessage",
     "LogEventSource",
+    "LogReorderBuffer",
     "ManagerMessage",
     "ManagerRequest",
+    "MessageDecoder",
     "MetadataManagerMessage",
     "MetadataSetManagerRequest",
+    "Payload",
     "ProcessManagerMessage",
+    "ReceivedPayload",
     "RemoveAllStaticDisksRequest",
     "RemoveStaticDiskRequest",
     "RequestResponse",
+    "ResourceRollup",
+    "SchemaRegistry",
     "StartButtonBroadcastEvent",
+    "StatusPatch",
+    "StatusTracker",
     "UsercodeKillManagerRequest",
+    "UsercodeLogBatchBroadcastEvent",
     "UsercodeLogBroadcastEvent",
+    "UsercodeLogLine",
+    "UsercodeLogReplayLine",
+    "UsercodeLogReplayManagerRequest",
+    "UsercodeLogReplayResponse",
+    "UsercodeResourceMetrics",
     "UsercodeRestartManagerRequest",
     "WiFiManagerMessage",
+    "apply_merge_patch",
+    "create_merge_patch",
+    "decode_message",
+    "load_payload",
 ]
@@ -1,6 +1,6 @@
 """Broadcast Event Schemas."""
 from enum import Enum
-from typing import ClassVar
+from typing import ClassVar, List
 
 from pydantic import BaseModel
 
@@ -52,3 +52,29 @@ class UsercodeLogBroadcastEvent(BroadcastEvent):
     pid: int
     content: str
     source: LogEventSource
+
+
+class UsercodeLogLine(BaseModel):
+    """A line of log output from a usercode process."""
+
+    sequence: int  # Position of the line in the log of the code run.
+    source: LogEventSource
+    timestamp: float  # Seconds since the log was started.
+    content: str
+
+
+class UsercodeLogBatchBroadcastEvent(BroadcastEvent):
+    """
+    Schema for a batch of log lines from a usercode process.
+
+    Sent instead of a UsercodeLogBroadcastEvent for each line, to reduce the
+    number of messages when the usercode produces a lot of output.
+
+    The sequence of each line should be used to order the lines of the log.
+    The pid should be used to differentiate between code runs.
+    """
+
+    name: ClassVar[str] = "usercode_log_batch"
+
+    pid: int
+    lines: List[UsercodeLogLine]
@@ -0,0 +1,161 @@
+"""Put usercode log lines received from broadcasts back into order."""
+
+import logging
+from time import monotonic
+from typing import Dict, Iterable, List, Optional, Set
+
+from .broadcast_event import UsercodeLogLine
+
+LOGGER = logging.getLogger(__name__)
+
+
+class LogReorderBuffer:
+    """
+    Release the log lines of a code run in order of their sequence numbers.
+
+    Lines that arrive early wait for the lines before them. If a line has not
+    arrived within the maximum latency, or too many lines are waiting, it is
+    assumed to be lost: the gap is counted in ``missed`` and skipped.
+
+    Lines are only released once the consumer calls ``add`` or ``expire``, so
+    consumers should call ``expire`` when the ``deadline`` passes.
+    """
+
+    def __init__(self, *, max_latency: float = 0.1, max_pending: int = 4096) -> None:
+        self._max_latency = max_latency
+        self._max_pending = max_pending
+
+        self._pid: Optional[int] = None
+        self._previous_pids: Set[int] = set()
+        self._next_sequence: Optional[int] = None
+        self._pending: Dict[int, UsercodeLogLine] = {}
+        self._deadline: Optional[float] = None
+
+        self.missed = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    @property
+    def deadline(self) -> Optional[float]:
+        """The monotonic time at which waiting lines should be released."""
+        return self._deadline
+
+    def add(self, pid: int, lines: Iterable[UsercodeLogLine]) -> List[UsercodeLogLine]:
+        """
+        Add received lines to the buffer.
+
+        If the lines are from a new code run, the lines of the previous run are
+        released first. Lines from earlier runs that arrive late are ignored.
+
+        :param pid: The pid of the code run that the lines are from.
+        :param lines: The received lines.
+        :returns: The lines that are now ready, in order.
+        """
+        ready: List[UsercodeLogLine] = []
+        if pid != self._pid:
+            if pid in self._previous_pids:
+                return ready
+            ready.extend(self._start_run(pid))
+
+        for line in lines:
+            if self._next_sequence is None or line.sequence >= self._next_sequence:
+                self._pending.setdefault(line.sequence, line)
+
+        # Until the start of the run is seen, the first line is not known.
+        if self._next_sequence is None and 0 in self._pending:
+            self._next_sequence = 0
+        ready.extend(self._release())
+        while len(self._pending) > self._max_pending:
+            ready.extend(self._skip_gap())
+
+        self._update_deadline()
+        return ready
+
+    def skip_to(self, pid: int, sequence: int) -> List[UsercodeLogLine]:
+        """
+        Ignore the lines of a code run before a sequence number.
+
+        Used when the earlier lines have already been received some other way,
+        such as by replaying the log. Lines of the previous run are released.
+
+        :param pid: The pid of the code run.
+        :param sequence: The sequence number of the next line to release.
+        :returns: The lines that are now ready, in order.
+        """
+        ready: List[UsercodeLogLine] = []
+        if pid != self._pid:
+            self._previous_pids.discard(pid)
+            ready.extend(self._start_run(pid))
+
+        self._pending = {k: v for k, v in self._pending.items() if k >= sequence}
+        self._next_sequence = max(self._next_sequence or 0, sequence)
+        ready.extend(self._release())
+        self._deadline = None
+        self._update_deadline()
+        return ready
+
+    def expire(self, now: Optional[float] = None) -> List[UsercodeLogLine]:
+        """
+        Skip a gap that has been waiting for longer than the maximum latency.
+
+        :param now: The current monotonic time.
+        :returns: The lines that are now ready, in order.
+        """
+        if now is None:
+            now = monotonic()
+        if self._deadline is None or now < self._deadline:
+            return []
+        ready = self._skip_gap()
+        self._deadline = None
+        self._update_deadline()
+        return ready
+
+    def flush(self) -> List[UsercodeLogLine]:
+        """
+        Release all of the waiting lines, skipping any gaps.
+
+        :returns: The lines, in order.
+        """
+        ready: List[UsercodeLogLine] = []
+        while self._pending:
+            ready.extend(self._skip_gap())
+        self._deadline = None
+        return ready
+
+    def _start_run(self, pid: int) -> List[UsercodeLogLine]:
+        """Release the lines of the current run, and start a new run."""
+        ready = self.flush()
+        if self._pid is not None:
+            self._previous_pids.add(self._pid)
+        self._pid = pid
+        self._next_sequence = None
+        return ready
+
+    def _release(self) -> List[UsercodeLogLine]:
+        """Release the lines that follow the last released line."""
+        ready: List[UsercodeLogLine] = []
+        if self._next_sequence is None:
+            return ready
+        while self._next_sequence in self._pending:
+            ready.append(self._pending.pop(self._next_sequence))
+            self._next_sequence += 1
+        return ready
+
+    def _skip_gap(self) -> List[UsercodeLogLine]:
+        """Skip to the first waiting line, and release the lines that follow it."""
+        if not self._pending:
+            return []
+        first = min(self._pending)
+        if self._next_sequence is not None and first > self._next_sequence:
+            missed = first - self._next_sequence
+            LOGGER.debug(f"Missed {missed} log lines from pid {self._pid}")
+            self.missed += missed
+        self._next_sequence = first
+        return self._release()
+
+    def _update_deadline(self) -> None:
+        if not self._pending:
+            self._deadline = None
+        elif self._deadline is None:
+            self._deadline = monotonic() + self._max_latency
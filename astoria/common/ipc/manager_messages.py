@@ -22,6 +22,7 @@ class ManagerMessage(BaseModel):
 
     status: Status
     astoria_version: str = __version__
+    sequence: int = 0  # Increases by one with each published status.
 
 
 class ProcessManagerMessage(ManagerMessage):
@@ -1,10 +1,12 @@
 """Schema definitions for manager requests."""
 from pathlib import Path
-from typing import final
+from typing import List
 from uuid import UUID, uuid4
 
 from pydantic import BaseModel, Field
 
+from .broadcast_event import UsercodeLogLine
+
 
 class ManagerRequest(BaseModel):
     """Schema definition for a Manager Request."""
@@ -13,14 +15,24 @@ class ManagerRequest(BaseModel):
     sender_name: str  # client name of component that sent the request
 
 
-@final
 class RequestResponse(BaseModel):
-    """Schema definition for the response to a Manager Request."""
+    """
+    Schema definition for the response to a Manager Request.
+
+    Requests that return data have a subclass of this schema as a response.
+    Extra fields are kept, so that the response can be converted to the
+    subclass once the request that it belongs to is known.
+    """
 
     uuid: UUID
     success: bool
     reason: str = ""
 
+    class Config:
+        """Pydantic config."""
+
+        extra = "allow"
+
 
 class MetadataSetManagerRequest(ManagerRequest):
     """Schema definition for a metadata mutation."""
@@ -33,6 +45,32 @@ UsercodeKillManagerRequest = ManagerRequest
 UsercodeRestartManagerRequest = ManagerRequest
 
 
+class UsercodeLogReplayManagerRequest(ManagerRequest):
+    """Schema definition for a request for recent usercode log lines."""
+
+    cursor: int = 0  # Cursor of the first line to return
+    limit: int = 256  # Maximum number of lines to return
+
+
+class UsercodeLogReplayLine(UsercodeLogLine):
+    """A line of log output from a recent code run."""
+
+    pid: int
+    cursor: int  # Position of the line in the logs of all recent code runs.
+
+
+class UsercodeLogReplayResponse(RequestResponse):
+    """
+    Schema definition for a page of recent usercode log lines.
+
+    The next page starts at the next cursor, if there are more lines.
+    """
+
+    lines: List[UsercodeLogReplayLine] = []
+    next_cursor: int = 0
+    more: bool = False
+
+
 class AddStaticDiskRequest(ManagerRequest):
     """Schema definition for adding a static disk."""
 
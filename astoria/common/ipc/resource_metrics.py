@@ -0,0 +1,31 @@
+"""Schemas for the resource usage of usercode."""
+
+from pydantic import BaseModel
+
+
+class ResourceRollup(BaseModel):
+    """The minimum, maximum, average and latest values of a metric."""
+
+    min: float
+    max: float
+    avg: float
+    last: float
+
+
+class UsercodeResourceMetrics(BaseModel):
+    """
+    Resource usage of the usercode process group, sampled from /proc.
+
+    Published to astoria/astprocd/metrics. The rollups cover every sample
+    since the code was started.
+    """
+
+    pid: int
+    samples: int
+    processes: int  # Number of running processes in the group
+    cpu_time: float  # CPU time used by the running processes, in seconds
+    cpu_percent: ResourceRollup  # Percentage of a single CPU
+    rss: ResourceRollup  # Resident memory, in bytes
+    threads: ResourceRollup
+    read_bytes: int  # Bytes read from storage by the running processes
+    write_bytes: int  # Bytes written to storage by the running processes
@@ -0,0 +1,150 @@
+"""
+Schema Registry.
+
+Holds a prebuilt decoder for each IPC message schema, so that payloads
+can be validated without building a temporary wrapper model on every call.
+
+Payloads are usually JSON text, but payloads in other encodings are decoded
+by the MQTT wrapper before they are dispatched, and are passed to handlers as
+a DecodedPayload so that they are not converted to JSON and parsed again.
+"""
+from json import loads
+from typing import Dict, Generic, Iterable, Type, TypeVar, Union
+
+from pydantic import BaseModel
+
+from .broadcast_event import BroadcastEvent
+from .manager_messages import ManagerMessage
+from .manager_requests import ManagerRequest, RequestResponse
+
+M = TypeVar("M", bound=BaseModel)
+
+
+class DecodedPayload:
+    """A payload that has already been decoded into JSON-compatible data."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: object) -> None:
+        self.data = data
+
+    def __repr__(self) -> str:
+        return f"DecodedPayload({self.data!r})"
+
+
+Payload = Union[str, bytes, DecodedPayload]
+
+# The form of the payloads that are passed to subscription handlers.
+ReceivedPayload = Union[str, DecodedPayload]
+
+
+def load_payload(payload: Payload) -> object:
+    """
+    Get the data in a payload.
+
+    :param payload: The raw JSON payload, or a payload that is already decoded.
+    :raises json.JSONDecodeError: The payload was not valid JSON.
+    :returns: The JSON-compatible data.
+    """
+    if isinstance(payload, DecodedPayload):
+        return payload.data
+    return loads(payload)
+
+
+class MessageDecoder(Generic[M]):
+    """Decode and validate payloads for a single schema."""
+
+    __slots__ = ("_schema",)
+
+    def __init__(self, schema: Type[M]) -> None:
+        self._schema = schema
+
+    @property
+    def schema(self) -> Type[M]:
+        """The schema that payloads are validated against."""
+        return self._schema
+
+    def decode(self, payload: Payload) -> M:
+        """
+        Decode a JSON payload into an instance of the schema.
+
+        :param payload: The raw JSON payload, or a payload that is already decoded.
+        :raises json.JSONDecodeError: The payload was not valid JSON.
+        :raises pydantic.ValidationError: The payload did not match the schema.
+        :returns: The validated message.
+        """
+        return self._schema.parse_obj(load_payload(payload))
+
+
+class SchemaRegistry:
+    """
+    A registry of message decoders.
+
+    Decoders are built for every subclass of the supplied schemas when the
+    registry is constructed. Schemas that are defined later are registered
+    the first time that they are used.
+    """
+
+    def __init__(self, schemas: Iterable[Type[BaseModel]] = ()) -> None:
+        self._decoders: Dict[Type[BaseModel], MessageDecoder[BaseModel]] = {}
+        for schema in schemas:
+            self.register(schema, include_subclasses=True)
+
+    def __contains__(self, schema: object) -> bool:
+        return schema in self._decoders
+
+    def register(
+        self,
+        schema: Type[M],
+        *,
+        include_subclasses: bool = False,
+    ) -> MessageDecoder[M]:
+        """
+        Build and store a decoder for a schema.
+
+        :param schema: The schema to register.
+        :param include_subclasses: Also register all subclasses of the schema.
+        :returns: The decoder for the schema.
+        """
+        decoder = self._decoders.setdefault(schema, MessageDecoder(schema))
+        if include_subclasses:
+            for subclass in schema.__subclasses__():
+                self.register(subclass, include_subclasses=True)
+        return decoder  # type: ignore[return-value]
+
+    def decoder(self, schema: Type[M]) -> MessageDecoder[M]:
+        """Get the decoder for a schema, registering it if required."""
+        try:
+            return self._decoders[schema]  # type: ignore[return-value]
+        except KeyError:
+            return self.register(schema)
+
+    def decode(self, schema: Type[M], payload: Payload) -> M:
+        """
+        Decode a JSON payload into an instance of a schema.
+
+        :param schema: The schema to validate the payload against.
+        :param payload: The raw JSON payload, or a payload that is already decoded.
+        :raises json.JSONDecodeError: The payload was not valid JSON.
+        :raises pydantic.ValidationError: The payload did not match the schema.
+        :returns: The validated message.
+        """
+        return self.decoder(schema).decode(payload)
+
+
+SCHEMA_REGISTRY = SchemaRegistry(
+    [BroadcastEvent, ManagerMessage, ManagerRequest, RequestResponse],
+)
+
+
+def decode_message(schema: Type[M], payload: Payload) -> M:
+    """
+    Decode a JSON payload using the shared schema registry.
+
+    :param schema: The schema to validate the payload against.
+    :param payload: The raw JSON payload, or a payload that is already decoded.
+    :raises json.JSONDecodeError: The payload was not valid JSON.
+    :raises pydantic.ValidationError: The payload did not match the schema.
+    :returns: The validated message.
+    """
+    return SCHEMA_REGISTRY.decode(schema, payload)
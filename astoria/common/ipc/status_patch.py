@@ -0,0 +1,202 @@
+"""
+Manager Status Patches.
+
+A manager can publish a JSON merge patch (RFC 7396) alongside each retained
+status message, describing the changes since its previous status. Consumers
+can apply the patches to the status that they already have, rather than
+decoding and processing the whole status on every change.
+"""
+import logging
+from json import dumps, loads
+from typing import Any, Dict, Generic, Optional, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+from pydantic.json import pydantic_encoder
+
+from .manager_messages import ManagerMessage
+from .schema_registry import Payload, decode_message, load_payload
+
+LOGGER = logging.getLogger(__name__)
+
+M = TypeVar("M", bound=BaseModel)
+ManagerMessageT = TypeVar("ManagerMessageT", bound=ManagerMessage)
+
+JSONObject = Dict[str, Any]  # type: ignore
+
+
+class StatusPatch(BaseModel):
+    """
+    A merge patch between consecutive manager status messages.
+
+    Published to astoria/[manager_name]/patch, and applies to the status with
+    the previous sequence number.
+    """
+
+    sequence: int
+    patch: JSONObject
+
+
+def create_merge_patch(source: JSONObject, target: JSONObject) -> JSONObject:
+    """
+    Create a JSON merge patch that transforms one object into another.
+
+    Merge patches cannot set a member to null, as null removes the member.
+
+    :param source: The original JSON object.
+    :param target: The JSON object that the patch should produce.
+    :returns: The merge patch, which is empty if the objects are equal.
+    """
+    patch: JSONObject = {key: None for key in source if key not in target}
+    for key, value in target.items():
+        original = source.get(key)
+        if isinstance(value, dict) and isinstance(original, dict):
+            child = create_merge_patch(original, value)
+            if child:
+                patch[key] = child
+        elif key not in source or value != original:
+            patch[key] = value
+    return patch
+
+
+def apply_merge_patch(target: JSONObject, patch: JSONObject) -> JSONObject:
+    """
+    Apply a JSON merge patch to an object.
+
+    :param target: The JSON object to patch, which is not modified.
+    :param patch: The merge patch to apply.
+    :returns: The patched JSON object.
+    """
+    result = dict(target)
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        elif isinstance(value, dict):
+            original = result.get(key)
+            result[key] = apply_merge_patch(
+                original if isinstance(original, dict) else {},
+                value,
+            )
+        else:
+            result[key] = value
+    return result
+
+
+def _patch_model(model: M, patch: JSONObject) -> M:
+    """
+    Apply a merge patch to a model, only validating the fields that changed.
+
+    The model is not modified, as it may still be in use elsewhere.
+
+    :raises pydantic.ValidationError: A patched field is not valid.
+    """
+    update: JSONObject = {}
+    for name, value in patch.items():
+        field = model.__fields__.get(name)
+        if field is None:
+            # Unknown fields are ignored, as they are when decoding a message.
+            continue
+        current = getattr(model, name)
+        if isinstance(value, dict) and isinstance(current, BaseModel):
+            update[name] = _patch_model(current, value)
+            continue
+        if isinstance(value, dict) and isinstance(current, dict):
+            value = apply_merge_patch(
+                loads(dumps(current, default=pydantic_encoder)),
+                value,
+            )
+        validated, errors = field.validate(value, {}, loc=name, cls=type(model))
+        if errors:
+            raise ValidationError([errors], type(model))
+        update[name] = validated
+    return model.copy(update=update)
+
+
+def _is_reset(status: ManagerMessage) -> bool:
+    """
+    Does the status replace the current status, whatever its sequence number?.
+
+    The sequence restarts from 1 when a manager restarts, and the last will of
+    a manager is its offline status, without a sequence number.
+    """
+    return status.sequence <= 1 or status.status is ManagerMessage.Status.STOPPED
+
+
+class StatusTracker(Generic[ManagerMessageT]):
+    """
+    Track the latest status of a manager, from its status messages and patches.
+
+    A patch is only applied if it follows on from the current status, as
+    otherwise a message has been missed. The next status message will contain
+    the full status, so the tracker catches up then.
+
+    A status message with the same sequence number as the last applied patch
+    is not decoded, as the tracker already has that status. A status message
+    that is older than the current status, such as a delayed retained message,
+    is ignored, unless it resets the status: the first status of a restarted
+    manager, or an offline status.
+    """
+
+    def __init__(self, schema: Type[ManagerMessageT]) -> None:
+        self._schema = schema
+        self._status: Optional[ManagerMessageT] = None
+        self._patched_sequence: Optional[int] = None
+
+    @property
+    def status(self) -> Optional[ManagerMessageT]:
+        """The latest status, if one has been received."""
+        return self._status
+
+    def update(self, payload: Payload) -> Optional[ManagerMessageT]:
+        """
+        Update the status from a full status message.
+
+        :param payload: The JSON payload of the status message.
+        :raises json.JSONDecodeError: The payload was not valid JSON.
+        :raises pydantic.ValidationError: The payload did not match the schema.
+        :returns: The new status, or None if it was already applied from a patch,
+            or is older than the current status.
+        """
+        data = load_payload(payload)
+        if (
+            self._patched_sequence is not None
+            and isinstance(data, dict)
+            and data.get("sequence") == self._patched_sequence
+        ):
+            return None
+        status = self._schema.parse_obj(data)
+        if (
+            self._status is not None
+            and status.sequence < self._status.sequence
+            and not _is_reset(status)
+        ):
+            LOGGER.debug(
+                f"Ignoring status {status.sequence}, which is older than the "
+                f"current status {self._status.sequence}.",
+            )
+            return None
+        self._status = status
+        self._patched_sequence = None
+        return self._status
+
+    def apply_patch(self, payload: Payload) -> Optional[JSONObject]:
+        """
+        Update the status from a patch.
+
+        :param payload: The JSON payload of the patch.
+        :raises json.JSONDecodeError: The payload was not valid JSON.
+        :raises pydantic.ValidationError: The patch or patched status was not valid.
+        :returns: The patch, or None if it did not follow on from the current status.
+        """
+        patch = decode_message(StatusPatch, payload)
+        if self._status is None:
+            return None
+        if patch.sequence != self._status.sequence + 1:
+            if patch.sequence > self._status.sequence + 1:
+                LOGGER.debug(
+                    f"Missed status patches {self._status.sequence + 1} to "
+                    f"{patch.sequence - 1}, waiting for the next status.",
+                )
+            return None
+        self._status = _patch_model(self._status, patch.patch)
+        self._patched_sequence = self._status.sequence
+        return patch.patch
@@ -2,12 +2,14 @@
 
 import asyncio
 import logging
-from json import JSONDecodeError, loads
-from typing import Dict, Match
+from json import JSONDecodeError
+from typing import Dict, Match, Optional
+
+from pydantic import ValidationError
 
 from astoria.common.config.system import AstoriaConfig
 from astoria.common.disks import DiskInfo, DiskUUID
-from astoria.common.ipc import DiskManagerMessage
+from astoria.common.ipc import DiskManagerMessage, ReceivedPayload, StatusTracker
 
 LOGGER = logging.getLogger(__name__)
 
@@ -18,38 +20,69 @@ class DiskHandlerMixin:
     config: AstoriaConfig
     _cur_disks: Dict[DiskUUID, DiskInfo]
 
+    @property
+    def _astdiskd_tracker(self) -> StatusTracker[DiskManagerMessage]:
+        tracker: Optional[StatusTracker[DiskManagerMessage]]
+        tracker = getattr(self, "_astdiskd_status_tracker", None)
+        if tracker is None:
+            tracker = StatusTracker(DiskManagerMessage)
+            self._astdiskd_status_tracker = tracker
+        return tracker
+
     async def handle_astdiskd_disk_info_message(
         self,
         match: Match[str],
-        payload: str,
+        payload: ReceivedPayload,
     ) -> None:
         """Handle disk info messages."""
         if payload:
             try:
-                message = DiskManagerMessage(**loads(payload))
-
-                new_set = set(message.disks.keys())
-                old_set = set(self._cur_disks.keys())
-
-                added_disks = new_set - old_set
-                removed_disks = old_set - new_set
-
-                for uuid in removed_disks:
-                    info = self._cur_disks.pop(uuid)
-                    asyncio.ensure_future(self.handle_disk_removal(uuid, info))
-
-                disk_info_dict = message.calculate_disk_info(
-                    self.config.astprocd.default_usercode_entrypoint,
-                )
-                for uuid in added_disks:
-                    info = disk_info_dict[uuid]
-                    self._cur_disks[uuid] = info
-                    asyncio.ensure_future(self.handle_disk_insertion(uuid, info))
+                message = self._astdiskd_tracker.update(payload)
+                # If None, the change was already handled from a patch.
+                if message is not None:
+                    self._update_disks(message)
             except JSONDecodeError:
                 LOGGER.warning("Received bad JSON in disk manager message.")
         else:
             LOGGER.warning("Received empty disk manager message.")
 
+    async def handle_astdiskd_patch_message(
+        self,
+        match: Match[str],
+        payload: ReceivedPayload,
+    ) -> None:
+        """Handle disk manager status patches."""
+        try:
+            patch = self._astdiskd_tracker.apply_patch(payload)
+            message = self._astdiskd_tracker.status
+            # Only update the disks if they were changed by the patch.
+            if patch is not None and "disks" in patch and message is not None:
+                self._update_disks(message)
+        except ValidationError:
+            LOGGER.warning("Received bad disk manager patch.")
+        except JSONDecodeError:
+            LOGGER.warning("Received bad JSON in disk manager patch.")
+
+    def _update_disks(self, message: DiskManagerMessage) -> None:
+        """Handle the insertion and removal of disks since the last message."""
+        new_set = set(message.disks.keys())
+        old_set = set(self._cur_disks.keys())
+
+        added_disks = new_set - old_set
+        removed_disks = old_set - new_set
+
+        for uuid in removed_disks:
+            info = self._cur_disks.pop(uuid)
+            asyncio.ensure_future(self.handle_disk_removal(uuid, info))
+
+        disk_info_dict = message.calculate_disk_info(
+            self.config.astprocd.default_usercode_entrypoint,
+        )
+        for uuid in added_disks:
+            info = disk_info_dict[uuid]
+            self._cur_disks[uuid] = info
+            asyncio.ensure_future(self.handle_disk_insertion(uuid, info))
+
     async def handle_disk_insertion(self, uuid: DiskUUID, disk_info: DiskInfo) -> None:
         """Handle a disk insertion."""
         LOGGER.debug(
@@ -1,12 +1,12 @@
 """Mixin to handle metadata."""
 import logging
-from json import JSONDecodeError, loads
-from typing import Match
+from json import JSONDecodeError
+from typing import Match, Optional
 
-from pydantic import ValidationError, parse_obj_as
+from pydantic import ValidationError
 
 from astoria.common.config import AstoriaConfig
-from astoria.common.ipc import MetadataManagerMessage
+from astoria.common.ipc import MetadataManagerMessage, ReceivedPayload, StatusTracker
 from astoria.common.metadata import Metadata
 
 LOGGER = logging.getLogger(__name__)
@@ -17,17 +17,27 @@ class MetadataHandlerMixin:
 
     config: AstoriaConfig
 
+    @property
+    def _astmetad_tracker(self) -> StatusTracker[MetadataManagerMessage]:
+        tracker: Optional[StatusTracker[MetadataManagerMessage]]
+        tracker = getattr(self, "_astmetad_status_tracker", None)
+        if tracker is None:
+            tracker = StatusTracker(MetadataManagerMessage)
+            self._astmetad_status_tracker = tracker
+        return tracker
+
     async def handle_astmetad_message(
         self,
         match: Match[str],
-        payload: str,
+        payload: ReceivedPayload,
     ) -> None:
         """Event handler for metadata changes."""
         if payload:
             try:
-                data = loads(payload)
-                metadata_manager_message = parse_obj_as(MetadataManagerMessage, data)
-                await self.handle_metadata(metadata_manager_message.metadata)
+                metadata_manager_message = self._astmetad_tracker.update(payload)
+                # If None, the change was already handled from a patch.
+                if metadata_manager_message is not None:
+                    await self.handle_metadata(metadata_manager_message.metadata)
             except ValidationError:
                 LOGGER.warning("Received bad metadata manager message.")
             except JSONDecodeError:
@@ -35,6 +45,23 @@ class MetadataHandlerMixin:
         else:
             LOGGER.warning("Received empty metadata manager message.")
 
+    async def handle_astmetad_patch_message(
+        self,
+        match: Match[str],
+        payload: ReceivedPayload,
+    ) -> None:
+        """Event handler for metadata manager status patches."""
+        try:
+            patch = self._astmetad_tracker.apply_patch(payload)
+            status = self._astmetad_tracker.status
+            # Only handle the metadata if it was changed by the patch.
+            if patch is not None and "metadata" in patch and status is not None:
+                await self.handle_metadata(status.metadata)
+        except ValidationError:
+            LOGGER.warning("Received bad metadata manager patch.")
+        except JSONDecodeError:
+            LOGGER.warning("Received bad JSON in metadata manager patch.")
+
     async def handle_metadata(self, metadata: Metadata) -> None:
         """
         Handle the updated metadata.
@@ -1,6 +1,8 @@
 """MQTT Helper Functions and Classes."""
 
 from .broadcast_helper import BroadcastHelper
+from .dispatch import OverflowPolicy
+from .publish_queue import PublishPriority
 from .topic import Topic
 
-__all__ = ["BroadcastHelper", "Topic"]
+__all__ = ["BroadcastHelper", "OverflowPolicy", "PublishPriority", "Topic"]
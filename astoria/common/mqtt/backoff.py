@@ -0,0 +1,42 @@
+"""
+Reconnection Backoff.
+
+Calculates the delay between attempts to reconnect to the broker.
+"""
+import random
+
+
+class ExponentialBackoff:
+    """
+    Exponential backoff with full jitter.
+
+    The upper bound of the delay doubles after each attempt, up to a maximum.
+    Each delay is chosen uniformly between the minimum and the current bound,
+    so that clients which lost the broker at the same time do not all
+    reconnect at the same time.
+    """
+
+    def __init__(self, *, minimum: float, maximum: float) -> None:
+        # With a minimum of 0, every delay would be 0.
+        if not 0 < minimum <= maximum:
+            raise ValueError("Backoff minimum must be above 0 and at most the maximum")
+        self._minimum = minimum
+        self._maximum = maximum
+        self._attempts = 0
+
+    @property
+    def attempts(self) -> int:
+        """The number of delays since the last reset."""
+        return self._attempts
+
+    def next_delay(self) -> float:
+        """Get the delay before the next attempt, in seconds."""
+        bound = min(self._maximum, self._minimum * 2**self._attempts)
+        # Stop counting once the maximum is reached, the bound cannot grow.
+        if bound < self._maximum:
+            self._attempts += 1
+        return random.uniform(self._minimum, bound)  # noqa: S311
+
+    def reset(self) -> None:
+        """Start again from the minimum delay, after a successful attempt."""
+        self._attempts = 0
@@ -1,56 +1,181 @@
 """Helper class to manage broadcast events."""
+import asyncio
 import logging
-from asyncio import PriorityQueue
-from json import JSONDecodeError, loads
-from typing import TYPE_CHECKING, Any, Generic, Match, Type, TypeVar
+from collections import deque
+from json import JSONDecodeError
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Deque,
+    Generic,
+    List,
+    Match,
+    Optional,
+    Type,
+    TypeVar,
+)
 
-from pydantic import parse_obj_as
+from astoria.common.ipc import SCHEMA_REGISTRY, BroadcastEvent, ReceivedPayload
 
-from astoria.common.ipc import BroadcastEvent
+from .dispatch import OverflowPolicy
+from .publish_queue import PublishPriority
 
 if TYPE_CHECKING:
+    from .codec import PayloadCodec
     from .wrapper import MQTTWrapper
 
 LOGGER = logging.getLogger(__name__)
 
 T = TypeVar("T", bound=BroadcastEvent)
 
+# Default maximum number of received events waiting to be read.
+DEFAULT_BROADCAST_BUFFER_SIZE = 1024
+
 
 class BroadcastHelper(Generic[T]):
-    """Helper class to manager broadcast events."""
+    """
+    Helper class to manager broadcast events.
+
+    Received events are kept in a bounded buffer, in the order that they were
+    received, until they are read. If events are not read quickly enough, they
+    are dropped according to the overflow policy.
+    """
+
+    def __init__(
+        self,
+        mqtt: "MQTTWrapper",
+        name: str,
+        schema: Type[T],
+        *,
+        codec: Optional["PayloadCodec"] = None,
+        priority: PublishPriority = PublishPriority.NORMAL,
+        max_size: int = DEFAULT_BROADCAST_BUFFER_SIZE,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        receive: bool = True,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("Maximum size must be at least 1")
 
-    def __init__(self, mqtt: "MQTTWrapper", name: str, schema: Type[T]) -> None:
         self._mqtt = mqtt
         self._name = name
         self._schema = schema
+        self._codec = codec
+        self._priority = priority
+        self._decoder = SCHEMA_REGISTRY.decoder(schema)
+
+        self._max_size = max_size
+        self._overflow = overflow
+        self._buffer: Deque[T] = deque()
+        self._not_empty = asyncio.Event()
+        self._closed = False
+
+        self.dropped = 0
 
-        self._event_queue: PriorityQueue[T] = PriorityQueue()
-        self._mqtt.subscribe(f"broadcast/{name}", self._handle_broadcast)
+        if receive:
+            self._mqtt.subscribe(f"broadcast/{name}", self._handle_broadcast)
 
     @classmethod
-    def get_helper(cls, mqtt: "MQTTWrapper", schema: Type[T]) -> "BroadcastHelper[T]":
-        """Get the broadcast helper for a given event."""
-        return BroadcastHelper[T](mqtt, schema.name, schema)
+    def get_helper(
+        cls,
+        mqtt: "MQTTWrapper",
+        schema: Type[T],
+        *,
+        codec: Optional["PayloadCodec"] = None,
+        priority: PublishPriority = PublishPriority.NORMAL,
+        max_size: int = DEFAULT_BROADCAST_BUFFER_SIZE,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        receive: bool = True,
+    ) -> "BroadcastHelper[T]":
+        """
+        Get the broadcast helper for a given event.
+
+        :param codec: Codec to encode sent events with, defaults to that of the wrapper.
+        :param priority: Publish priority of sent events.
+        :param max_size: Maximum number of received events waiting to be read.
+        :param overflow: What to do with received events when the buffer is full.
+        :param receive: Receive events, set to False if the helper only sends events.
+        """
+        return BroadcastHelper[T](
+            mqtt,
+            schema.name,
+            schema,
+            codec=codec,
+            priority=priority,
+            max_size=max_size,
+            overflow=overflow,
+            receive=receive,
+        )
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def __aiter__(self) -> AsyncIterator[T]:
+        return self
+
+    async def __anext__(self) -> T:
+        if not await self._wait_not_empty():
+            raise StopAsyncIteration
+        return self._buffer.popleft()
+
+    @property
+    def closed(self) -> bool:
+        """Has the helper been closed?."""
+        return self._closed
 
     async def _handle_broadcast(
         self,
         match: Match[str],
-        payload: str,
+        payload: ReceivedPayload,
     ) -> None:
         """
         Handle a broadcast event message.
 
-        Inserts the event inserts it into the priority queue.
+        Inserts the event into the buffer.
         """
         try:
-            ev = parse_obj_as(self._schema, loads(payload))
+            ev = self._decoder.decode(payload)
             LOGGER.debug(
                 f"Received {ev.event_name} broadcast event from {ev.sender_name}",
             )
-            await self._event_queue.put(ev)
+            self._push(ev)
         except JSONDecodeError:
             LOGGER.warning(f"Broadcast event {self._name} contained invalid JSON")
 
+    def _push(self, ev: T) -> None:
+        """Add a received event to the buffer, applying the overflow policy."""
+        if self._closed:
+            return
+        if self._overflow is OverflowPolicy.LATEST_WINS:
+            self.dropped += len(self._buffer)
+            self._buffer.clear()
+        elif len(self._buffer) >= self._max_size:
+            self.dropped += 1
+            # Log at exponentially increasing intervals to avoid flooding the log.
+            if self.dropped & (self.dropped - 1) == 0:
+                LOGGER.warning(
+                    f"Broadcast buffer for {self._name} is full, "
+                    f"{self.dropped} events have been dropped in total.",
+                )
+            if self._overflow is OverflowPolicy.DROP_NEWEST:
+                return
+            self._buffer.popleft()
+        self._buffer.append(ev)
+        self._not_empty.set()
+
+    async def _wait_not_empty(self) -> bool:
+        """
+        Wait until there is an event in the buffer.
+
+        :returns: False if the helper was closed and no events are left.
+        """
+        while not self._buffer:
+            if self._closed:
+                return False
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        return True
+
     def send(self, **kwargs: Any) -> None:  # type: ignore
         """Send an event."""
         data = self._schema(
@@ -62,12 +187,43 @@ class BroadcastHelper(Generic[T]):
             f"broadcast/{self._schema.name}",
             data,
             auto_prefix_client_name=False,
+            codec=self._codec,
+            priority=self._priority,
         )
 
     async def wait_broadcast(self) -> T:
         """
         Wait for an event on the given broadcast.
 
-        :param broadcast_name: The name of the broadcast to wait for.
+        :raises RuntimeError: The helper was closed and no events are left.
+        :returns: The oldest event that has not been read.
+        """
+        if not await self._wait_not_empty():
+            raise RuntimeError(f"Broadcast helper for {self._name} is closed")
+        return self._buffer.popleft()
+
+    async def drain(self, max_items: Optional[int] = None) -> List[T]:
+        """
+        Wait for events, then read all of the events in the buffer at once.
+
+        :param max_items: The maximum number of events to read.
+        :returns: The events, oldest first. Empty if the helper was closed.
+        """
+        if not await self._wait_not_empty():
+            return []
+        if max_items is None or max_items >= len(self._buffer):
+            events = list(self._buffer)
+            self._buffer.clear()
+        else:
+            events = [self._buffer.popleft() for _ in range(max_items)]
+        return events
+
+    def close(self) -> None:
+        """
+        Stop receiving events.
+
+        Events already in the buffer can still be read, after which iteration
+        stops and drain returns an empty list.
         """
-        return await self._event_queue.get()
+        self._closed = True
+        self._not_empty.set()
@@ -0,0 +1,126 @@
+"""
+Payload Codecs.
+
+Codecs convert message models to and from the bytes sent over MQTT.
+The codec used for a message is signalled using the MQTT v5 content type
+property. Messages without a content type are assumed to be JSON, so that
+clients using MQTT v3.1.1 or older versions of Astoria can still communicate.
+"""
+from abc import ABCMeta, abstractmethod
+from functools import partial
+from json import loads
+from typing import ClassVar, Dict, Optional
+
+from pydantic import BaseModel
+from pydantic.json import custom_pydantic_encoder, pydantic_encoder
+
+from astoria.common.config.system import PayloadEncoding
+
+from .msgpack import MessagePackError, packb, unpackb
+
+
+class CodecError(ValueError):
+    """A payload could not be decoded."""
+
+
+class PayloadCodec(metaclass=ABCMeta):
+    """Encode and decode message payloads."""
+
+    content_type: ClassVar[str]
+
+    @abstractmethod
+    def encode(self, payload: BaseModel) -> bytes:
+        """Encode a message model into a payload."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def decode(self, payload: bytes) -> object:
+        """
+        Decode a payload into JSON-compatible data.
+
+        :raises CodecError: The payload could not be decoded.
+        """
+        raise NotImplementedError
+
+
+class JSONCodec(PayloadCodec):
+    """Encode payloads as UTF-8 JSON."""
+
+    content_type = "application/json"
+
+    def encode(self, payload: BaseModel) -> bytes:
+        """Encode a message model into a payload."""
+        return payload.json().encode()
+
+    def decode(self, payload: bytes) -> object:
+        """
+        Decode a payload into JSON-compatible data.
+
+        :raises CodecError: The payload could not be decoded.
+        """
+        try:
+            return loads(payload)
+        except ValueError as e:
+            raise CodecError(str(e)) from e
+
+
+class MessagePackCodec(PayloadCodec):
+    """
+    Encode payloads as MessagePack.
+
+    This is considerably more compact than JSON for messages that are mostly
+    small integers and enum values.
+    """
+
+    content_type = "application/msgpack"
+
+    def encode(self, payload: BaseModel) -> bytes:
+        """
+        Encode a message model into a payload.
+
+        Values that are not MessagePack types are converted by the encoder
+        that the model uses for JSON, so that the json_encoders in the model
+        config apply to both codecs.
+        """
+        encoders = payload.__config__.json_encoders
+        if encoders:
+            return packb(
+                payload.dict(),
+                default=partial(custom_pydantic_encoder, encoders),
+            )
+        return packb(payload.dict(), default=pydantic_encoder)
+
+    def decode(self, payload: bytes) -> object:
+        """
+        Decode a payload into JSON-compatible data.
+
+        :raises CodecError: The payload could not be decoded.
+        """
+        try:
+            return unpackb(payload)
+        except MessagePackError as e:
+            raise CodecError(str(e)) from e
+
+
+JSON_CODEC = JSONCodec()
+
+CODECS: Dict[PayloadEncoding, PayloadCodec] = {
+    PayloadEncoding.JSON: JSON_CODEC,
+    PayloadEncoding.MSGPACK: MessagePackCodec(),
+}
+
+_CODECS_BY_CONTENT_TYPE: Dict[str, PayloadCodec] = {
+    codec.content_type: codec for codec in CODECS.values()
+}
+
+
+def get_codec_for_content_type(content_type: Optional[str]) -> Optional[PayloadCodec]:
+    """
+    Get the codec for an MQTT content type.
+
+    :param content_type: The content type property of a message, if present.
+    :returns: The codec, or None if the content type is not recognised.
+    """
+    if content_type is None:
+        return JSON_CODEC
+    return _CODECS_BY_CONTENT_TYPE.get(content_type)
@@ -0,0 +1,120 @@
+"""
+Dependency Gate.
+
+Tracks whether the state managers that a component depends on are available.
+"""
+import asyncio
+import logging
+from enum import Enum
+from typing import Dict, List, Optional, Sequence, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+
+class GateState(Enum):
+    """State of a dependency gate."""
+
+    WAITING = "waiting"  # Not all dependencies have been available yet.
+    READY = "ready"  # All dependencies are available.
+    LOST = "lost"  # A dependency became unavailable after the gate was ready.
+
+
+class DependencyGate:
+    """
+    Track the availability of dependencies as a single state machine.
+
+    The gate is waiting until every dependency has been available at the same
+    time, at which point it is ready. If a dependency then becomes unavailable,
+    the gate is lost and stays lost, as the component must be restarted.
+
+    Futures are created lazily in the running event loop, so the gate can be
+    constructed before the loop is running.
+    """
+
+    def __init__(
+        self,
+        dependencies: Sequence[str],
+        *,
+        lost_event: Optional[asyncio.Event] = None,
+    ) -> None:
+        self._available: Dict[str, bool] = dict.fromkeys(dependencies, False)
+        self._lost_event = lost_event
+        self._state = GateState.READY if not dependencies else GateState.WAITING
+        self._ready: Optional[asyncio.Future[None]] = None
+        self._waiters: Dict[str, List[Tuple[bool, asyncio.Future[None]]]] = {}
+
+    @property
+    def dependencies(self) -> List[str]:
+        """The names of the dependencies."""
+        return list(self._available)
+
+    @property
+    def state(self) -> GateState:
+        """The state of the gate."""
+        return self._state
+
+    @property
+    def is_ready(self) -> bool:
+        """Have all dependencies been available at the same time?."""
+        return self._state is not GateState.WAITING
+
+    @property
+    def ready(self) -> "asyncio.Future[None]":
+        """A future that is resolved when the gate becomes ready."""
+        if self._ready is None:
+            self._ready = asyncio.get_event_loop().create_future()
+            if self.is_ready:
+                self._ready.set_result(None)
+        return self._ready
+
+    def is_available(self, dependency: str) -> bool:
+        """Is the dependency currently available?."""
+        return self._available[dependency]
+
+    async def wait_for(self, dependency: str, *, available: bool = True) -> None:
+        """
+        Wait for a dependency to become available, or unavailable.
+
+        Returns immediately if the dependency is already in that state.
+
+        :raises KeyError: The dependency is not tracked by the gate.
+        """
+        if self._available[dependency] is available:
+            return
+        future: asyncio.Future[None] = asyncio.get_event_loop().create_future()
+        self._waiters.setdefault(dependency, []).append((available, future))
+        try:
+            await future
+        finally:
+            waiters = self._waiters.get(dependency, [])
+            if (available, future) in waiters:
+                waiters.remove((available, future))
+
+    def update(self, dependency: str, *, available: bool) -> None:
+        """
+        Update the availability of a dependency.
+
+        Updates for unknown dependencies are ignored.
+        """
+        if self._available.get(dependency, available) is available:
+            return
+        self._available[dependency] = available
+
+        waiters = self._waiters.pop(dependency, [])
+        for target, future in waiters:
+            if target is available and not future.done():
+                future.set_result(None)
+        remaining = [(t, f) for t, f in waiters if not f.done()]
+        if remaining:
+            self._waiters[dependency] = remaining
+
+        if self._state is GateState.WAITING and all(self._available.values()):
+            LOGGER.debug("All dependencies are available")
+            self._state = GateState.READY
+            if self._ready is not None and not self._ready.done():
+                self._ready.set_result(None)
+        elif self._state is GateState.READY and not available:
+            LOGGER.warning(f"{dependency} is unavailable!")
+            self._state = GateState.LOST
+            if self._lost_event is not None:
+                self._lost_event.set()
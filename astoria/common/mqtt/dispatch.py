@@ -0,0 +1,136 @@
+"""
+Subscription Dispatch Queues.
+
+Each subscription has a bounded queue of received messages, which are
+passed to its handler by a limited number of workers.
+"""
+import asyncio
+import logging
+from collections import deque
+from enum import Enum
+from typing import Awaitable, Callable, Deque, Dict
+
+LOGGER = logging.getLogger(__name__)
+
+# Default maximum number of messages waiting for a subscription handler.
+DEFAULT_DISPATCH_DEPTH = 256
+
+Job = Callable[[], Awaitable[None]]
+
+
+class OverflowPolicy(Enum):
+    """What to do with messages that arrive faster than they are handled."""
+
+    # Keep every message, dropping the oldest when the queue is full.
+    # Suitable for broadcasts, where each message is an event.
+    DROP_OLDEST = "drop_oldest"
+
+    # Keep the messages that are already waiting, dropping new messages when the
+    # queue is full. Suitable where the start of a sequence matters most.
+    DROP_NEWEST = "drop_newest"
+
+    # Keep only the latest waiting message for each topic.
+    # Suitable for retained status topics, where only the latest state matters.
+    LATEST_WINS = "latest_wins"
+
+
+class _Entry:
+    __slots__ = ("topic", "job")
+
+    def __init__(self, topic: str, job: Job) -> None:
+        self.topic = topic
+        self.job = job
+
+
+class Dispatcher:
+    """
+    A bounded queue of messages for a subscription handler.
+
+    With a concurrency of 1, messages are handled one at a time in the order
+    that they were received. Workers are only running whilst there are
+    messages waiting.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        concurrency: int = 1,
+        max_depth: int = DEFAULT_DISPATCH_DEPTH,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError("Concurrency must be at least 1")
+        if max_depth < 1:
+            raise ValueError("Maximum depth must be at least 1")
+
+        self._name = name
+        self._concurrency = concurrency
+        self._max_depth = max_depth
+        self._overflow = overflow
+
+        self._pending: Deque[_Entry] = deque()
+        self._latest: Dict[str, _Entry] = {}
+        self._workers = 0
+
+        self.dropped = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    @property
+    def overflow(self) -> OverflowPolicy:
+        """The overflow policy of the queue."""
+        return self._overflow
+
+    def submit(self, topic: str, job: Job) -> None:
+        """
+        Queue a job to handle a message.
+
+        :param topic: The topic that the message was received on.
+        :param job: Called to handle the message.
+        """
+        if self._overflow is OverflowPolicy.LATEST_WINS:
+            pending = self._latest.get(topic)
+            if pending is not None:
+                pending.job = job
+                self.coalesced += 1
+                return
+
+        if len(self._pending) >= self._max_depth:
+            self.dropped += 1
+            # Log at exponentially increasing intervals to avoid flooding the log.
+            if self.dropped & (self.dropped - 1) == 0:
+                LOGGER.warning(
+                    f"Dispatch queue for {self._name} is full, "
+                    f"{self.dropped} messages have been dropped in total.",
+                )
+            if self._overflow is OverflowPolicy.DROP_NEWEST:
+                return
+            self._discard(self._pending.popleft())
+
+        entry = _Entry(topic, job)
+        self._pending.append(entry)
+        if self._overflow is OverflowPolicy.LATEST_WINS:
+            self._latest[topic] = entry
+
+        if self._workers < self._concurrency:
+            self._workers += 1
+            asyncio.ensure_future(self._worker())
+
+    def _discard(self, entry: _Entry) -> None:
+        if self._latest.get(entry.topic) is entry:
+            del self._latest[entry.topic]
+
+    async def _worker(self) -> None:
+        try:
+            while self._pending:
+                entry = self._pending.popleft()
+                self._discard(entry)
+                try:
+                    await entry.job()
+                except Exception:
+                    LOGGER.exception(f"Error in {self._name} handling {entry.topic}")
+        finally:
+            self._workers -= 1
@@ -0,0 +1,106 @@
+"""
+In-process Loopback Transport.
+
+Delivers messages directly between MQTT wrappers in the same process, so
+that components sharing an event loop do not need a round trip through the
+broker to talk to each other.
+"""
+import logging
+from typing import TYPE_CHECKING, Dict, List, Mapping, Tuple
+from uuid import uuid4
+
+if TYPE_CHECKING:
+    from .wrapper import MQTTWrapper
+
+LOGGER = logging.getLogger(__name__)
+
+# Name of the MQTT v5 user property that identifies the hub that sent a message.
+HUB_USER_PROPERTY = "astoria-hub"
+
+# Properties that describe the encoding on the wire, which do not apply to
+# messages delivered in-process.
+_WIRE_PROPERTIES = {"content_type", "message_expiry_interval", "user_property"}
+
+Properties = Dict[str, List[object]]
+
+
+class LoopbackHub:
+    """
+    A hub that delivers messages between MQTT wrappers in the same process.
+
+    Messages published by an attached wrapper are delivered straight to the
+    handlers of every attached wrapper, and are also sent to the broker for
+    clients in other processes. Messages sent to the broker are tagged with
+    the hub ID, so that attached wrappers can drop the copies the broker
+    sends back to them.
+
+    As copies from the broker are dropped, the hub keeps its own store of
+    retained messages, which are delivered to wrappers when they attach.
+
+    Handlers are given the same JSON payload that they would receive from the
+    broker, so each message is still encoded to JSON once and parsed by each
+    handler. Only the broker round trip and the wire codec are skipped.
+
+    Requires MQTT v5, as the hub ID is sent in a user property.
+    """
+
+    def __init__(self) -> None:
+        self._id = uuid4().hex
+        self._wrappers: List[MQTTWrapper] = []
+        self._retained: Dict[str, Tuple[str, Properties]] = {}
+
+    @property
+    def user_property(self) -> Tuple[str, str]:
+        """The user property that tags messages sent by this hub."""
+        return (HUB_USER_PROPERTY, self._id)
+
+    def is_attached(self, wrapper: "MQTTWrapper") -> bool:
+        """Is the wrapper attached to the hub?."""
+        return wrapper in self._wrappers
+
+    def attach(self, wrapper: "MQTTWrapper") -> None:
+        """Attach a wrapper, delivering the retained messages to it."""
+        if wrapper in self._wrappers:
+            return
+        self._wrappers.append(wrapper)
+        for topic, (payload, properties) in self._retained.items():
+            wrapper.dispatch(topic, payload, properties)
+
+    def detach(self, wrapper: "MQTTWrapper") -> None:
+        """Stop delivering messages to a wrapper."""
+        if wrapper in self._wrappers:
+            self._wrappers.remove(wrapper)
+
+    def publish(
+        self,
+        topic: str,
+        payload: str,
+        *,
+        retain: bool,
+        properties: Mapping[str, object],
+    ) -> None:
+        """
+        Deliver a message to all attached wrappers.
+
+        :param topic: The topic of the message.
+        :param payload: The JSON payload of the message.
+        :param retain: Keep the message for wrappers that attach later.
+        :param properties: The MQTT v5 properties of the message.
+        """
+        # Match the form of the properties received from gmqtt.
+        received_properties: Properties = {
+            name: [value]
+            for name, value in properties.items()
+            if name not in _WIRE_PROPERTIES
+        }
+        if retain:
+            self._retained[topic] = (payload, received_properties)
+        for wrapper in list(self._wrappers):
+            wrapper.dispatch(topic, payload, received_properties)
+
+    def is_echo(self, properties: Mapping[str, object]) -> bool:
+        """Was a message received from the broker sent by this hub?."""
+        user_properties = properties.get("user_property")
+        if not isinstance(user_properties, list):
+            return False
+        return any(tuple(prop) == self.user_property for prop in user_properties)
@@ -0,0 +1,279 @@
+"""
+MessagePack Serialisation.
+
+A minimal implementation of the MessagePack format, sufficient for the
+JSON-like data in Astoria messages. Extension types are not supported.
+
+https://github.com/msgpack/msgpack/blob/master/spec.md
+"""
+from struct import Struct
+from typing import Callable, Dict, List, Optional, Tuple
+
+_U8 = Struct(">B")
+_U16 = Struct(">H")
+_U32 = Struct(">I")
+_U64 = Struct(">Q")
+_I8 = Struct(">b")
+_I16 = Struct(">h")
+_I32 = Struct(">i")
+_I64 = Struct(">q")
+_F32 = Struct(">f")
+_F64 = Struct(">d")
+
+Default = Callable[[object], object]
+
+
+class MessagePackError(ValueError):
+    """The data could not be packed or unpacked."""
+
+
+def packb(obj: object, *, default: Optional[Default] = None) -> bytes:
+    """
+    Serialise an object to MessagePack.
+
+    :param obj: The object to serialise.
+    :param default: Called to convert objects of an unsupported type.
+    :raises MessagePackError: The object could not be serialised.
+    :returns: The serialised data.
+    """
+    buf = bytearray()
+    _pack(obj, buf, default, 0)
+    return bytes(buf)
+
+
+def unpackb(data: bytes) -> object:
+    """
+    Deserialise MessagePack data.
+
+    :param data: The data to deserialise, containing exactly one object.
+    :raises MessagePackError: The data was invalid.
+    :returns: The deserialised object.
+    """
+    view = memoryview(data)
+    try:
+        obj, offset = _unpack(view, 0)
+    except (IndexError, RecursionError, UnicodeDecodeError) as e:
+        raise MessagePackError("Invalid MessagePack data") from e
+    if offset != len(view):
+        raise MessagePackError("Trailing data after MessagePack object")
+    return obj
+
+
+_MAX_DEPTH = 64
+
+
+def _pack(
+    obj: object,
+    buf: bytearray,
+    default: Optional[Default],
+    depth: int,
+) -> None:
+    if depth > _MAX_DEPTH:
+        raise MessagePackError("Object is nested too deeply")
+
+    if obj is None:
+        buf.append(0xC0)
+    elif obj is True:
+        buf.append(0xC3)
+    elif obj is False:
+        buf.append(0xC2)
+    elif isinstance(obj, int):
+        _pack_int(obj, buf)
+    elif isinstance(obj, float):
+        buf.append(0xCB)
+        buf += _F64.pack(obj)
+    elif isinstance(obj, str):
+        data = obj.encode("utf-8")
+        length = len(data)
+        if length < 32:
+            buf.append(0xA0 | length)
+        elif length < 0x100:
+            buf.append(0xD9)
+            buf.append(length)
+        elif length < 0x10000:
+            buf.append(0xDA)
+            buf += _U16.pack(length)
+        else:
+            buf.append(0xDB)
+            buf += _U32.pack(length)
+        buf += data
+    elif isinstance(obj, (bytes, bytearray)):
+        length = len(obj)
+        if length < 0x100:
+            buf.append(0xC4)
+            buf.append(length)
+        elif length < 0x10000:
+            buf.append(0xC5)
+            buf += _U16.pack(length)
+        else:
+            buf.append(0xC6)
+            buf += _U32.pack(length)
+        buf += obj
+    elif isinstance(obj, (list, tuple)):
+        _pack_header(len(obj), 0x90, 0xDC, buf)
+        for item in obj:
+            _pack(item, buf, default, depth + 1)
+    elif isinstance(obj, dict):
+        _pack_header(len(obj), 0x80, 0xDE, buf)
+        for key, value in obj.items():
+            _pack(key, buf, default, depth + 1)
+            _pack(value, buf, default, depth + 1)
+    elif default is not None:
+        # The converted value may contain further values that need converting.
+        _pack(default(obj), buf, default, depth + 1)
+    else:
+        raise MessagePackError(f"Cannot serialise object of type {type(obj).__name__}")
+
+
+def _pack_int(obj: int, buf: bytearray) -> None:
+    if 0 <= obj < 0x80:
+        buf.append(obj)
+    elif -32 <= obj < 0:
+        buf.append(obj & 0xFF)
+    elif obj >= 0:
+        if obj < 0x100:
+            buf.append(0xCC)
+            buf += _U8.pack(obj)
+        elif obj < 0x10000:
+            buf.append(0xCD)
+            buf += _U16.pack(obj)
+        elif obj < 0x100000000:
+            buf.append(0xCE)
+            buf += _U32.pack(obj)
+        elif obj < 0x10000000000000000:
+            buf.append(0xCF)
+            buf += _U64.pack(obj)
+        else:
+            raise MessagePackError("Integer is too large")
+    else:
+        if obj >= -0x80:
+            buf.append(0xD0)
+            buf += _I8.pack(obj)
+        elif obj >= -0x8000:
+            buf.append(0xD1)
+            buf += _I16.pack(obj)
+        elif obj >= -0x80000000:
+            buf.append(0xD2)
+            buf += _I32.pack(obj)
+        elif obj >= -0x8000000000000000:
+            buf.append(0xD3)
+            buf += _I64.pack(obj)
+        else:
+            raise MessagePackError("Integer is too small")
+
+
+def _pack_header(length: int, fix: int, code: int, buf: bytearray) -> None:
+    """Pack the header of an array or map. code + 1 is the 32 bit variant."""
+    if length < 16:
+        buf.append(fix | length)
+    elif length < 0x10000:
+        buf.append(code)
+        buf += _U16.pack(length)
+    else:
+        buf.append(code + 1)
+        buf += _U32.pack(length)
+
+
+# Fixed size types: code -> (struct, size)
+_FIXED: Dict[int, Tuple[Struct, int]] = {
+    0xCA: (_F32, 4),
+    0xCB: (_F64, 8),
+    0xCC: (_U8, 1),
+    0xCD: (_U16, 2),
+    0xCE: (_U32, 4),
+    0xCF: (_U64, 8),
+    0xD0: (_I8, 1),
+    0xD1: (_I16, 2),
+    0xD2: (_I32, 4),
+    0xD3: (_I64, 8),
+}
+
+# Variable length types: code -> (length struct, length size)
+_STR: Dict[int, Tuple[Struct, int]] = {0xD9: (_U8, 1), 0xDA: (_U16, 2), 0xDB: (_U32, 4)}
+_BIN: Dict[int, Tuple[Struct, int]] = {0xC4: (_U8, 1), 0xC5: (_U16, 2), 0xC6: (_U32, 4)}
+_ARRAY: Dict[int, Tuple[Struct, int]] = {0xDC: (_U16, 2), 0xDD: (_U32, 4)}
+_MAP: Dict[int, Tuple[Struct, int]] = {0xDE: (_U16, 2), 0xDF: (_U32, 4)}
+
+
+def _read_length(
+    view: memoryview,
+    offset: int,
+    fmt: Tuple[Struct, int],
+) -> Tuple[int, int]:
+    struct, size = fmt
+    end = offset + size
+    if end > len(view):
+        raise MessagePackError("Unexpected end of MessagePack data")
+    (length,) = struct.unpack_from(view, offset)
+    return length, end
+
+
+def _read_bytes(view: memoryview, offset: int, length: int) -> Tuple[memoryview, int]:
+    end = offset + length
+    if end > len(view):
+        raise MessagePackError("Unexpected end of MessagePack data")
+    return view[offset:end], end
+
+
+def _unpack(view: memoryview, offset: int) -> Tuple[object, int]:
+    code = view[offset]
+    offset += 1
+
+    if code < 0x80:
+        return code, offset
+    if code >= 0xE0:
+        return code - 0x100, offset
+    if 0xA0 <= code <= 0xBF:
+        data, offset = _read_bytes(view, offset, code & 0x1F)
+        return str(data, "utf-8"), offset
+    if 0x90 <= code <= 0x9F:
+        return _unpack_array(view, offset, code & 0x0F)
+    if 0x80 <= code <= 0x8F:
+        return _unpack_map(view, offset, code & 0x0F)
+    if code == 0xC0:
+        return None, offset
+    if code == 0xC2:
+        return False, offset
+    if code == 0xC3:
+        return True, offset
+    if code in _FIXED:
+        struct, size = _FIXED[code]
+        if offset + size > len(view):
+            raise MessagePackError("Unexpected end of MessagePack data")
+        (value,) = struct.unpack_from(view, offset)
+        return value, offset + size
+    if code in _STR:
+        length, offset = _read_length(view, offset, _STR[code])
+        data, offset = _read_bytes(view, offset, length)
+        return str(data, "utf-8"), offset
+    if code in _BIN:
+        length, offset = _read_length(view, offset, _BIN[code])
+        data, offset = _read_bytes(view, offset, length)
+        return bytes(data), offset
+    if code in _ARRAY:
+        length, offset = _read_length(view, offset, _ARRAY[code])
+        return _unpack_array(view, offset, length)
+    if code in _MAP:
+        length, offset = _read_length(view, offset, _MAP[code])
+        return _unpack_map(view, offset, length)
+    raise MessagePackError(f"Unsupported MessagePack type: {code:#x}")
+
+
+def _unpack_array(view: memoryview, offset: int, length: int) -> Tuple[object, int]:
+    items: List[object] = []
+    for _ in range(length):
+        item, offset = _unpack(view, offset)
+        items.append(item)
+    return items, offset
+
+
+def _unpack_map(view: memoryview, offset: int, length: int) -> Tuple[object, int]:
+    items: Dict[object, object] = {}
+    for _ in range(length):
+        key, offset = _unpack(view, offset)
+        value, offset = _unpack(view, offset)
+        try:
+            items[key] = value
+        except TypeError as e:
+            raise MessagePackError("Unhashable MessagePack map key") from e
+    return items, offset
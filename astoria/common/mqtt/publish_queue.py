@@ -0,0 +1,229 @@
+"""
+Outbound Publish Queue.
+
+Messages are queued before being handed to the MQTT client, so that bursts
+can be coalesced and low priority traffic can be shed under load.
+"""
+import asyncio
+from collections import deque
+from enum import IntEnum
+from typing import Deque, Dict, Optional, Tuple, Union
+
+
+class PublishPriority(IntEnum):
+    """
+    Priority of a published message.
+
+    Higher priority messages are sent first, and low priority messages are
+    dropped when the queue is above its high water mark.
+    """
+
+    LOW = 0
+    NORMAL = 1
+
+
+PropertyValue = Union[str, bytes, int, Tuple[str, str]]
+
+
+class OutboundMessage:
+    """A message waiting to be published."""
+
+    __slots__ = (
+        "topic",
+        "payload",
+        "qos",
+        "retain",
+        "priority",
+        "properties",
+        "loopback_payload",
+    )
+
+    def __init__(
+        self,
+        topic: str,
+        payload: bytes,
+        *,
+        qos: int = 1,
+        retain: bool = False,
+        priority: PublishPriority = PublishPriority.NORMAL,
+        properties: Optional[Dict[str, PropertyValue]] = None,
+    ) -> None:
+        self.topic = topic
+        self.payload = payload
+        self.qos = qos
+        self.retain = retain
+        self.priority = priority
+        self.properties = properties or {}
+        # The JSON payload for handlers in the same process, if required.
+        self.loopback_payload: Optional[str] = None
+
+    def __repr__(self) -> str:
+        return (
+            f"OutboundMessage(topic={self.topic!r}, qos={self.qos}, "
+            f"retain={self.retain}, priority={self.priority.name})"
+        )
+
+
+class PublishQueue:
+    """
+    A bounded queue of outbound messages.
+
+    - Retained messages are coalesced per topic. Only the latest payload for a
+      topic is kept, in the queue position of the first pending message. The
+      higher of the priorities is kept, and if the priority is raised the
+      message moves to the back of the higher priority queue.
+    - Above the high water mark, low priority messages are dropped and
+      :meth:`put` waits for the queue to drain.
+    - At the maximum size, the oldest low priority message is dropped to make
+      room. If there are none, the new message is dropped.
+
+    Messages are removed in priority order, and in FIFO order within a priority.
+    """
+
+    def __init__(self, *, max_size: int, high_water_mark: int) -> None:
+        if not 0 < high_water_mark <= max_size:
+            raise ValueError("High water mark must be between 1 and the maximum size")
+
+        self._max_size = max_size
+        self._high_water_mark = high_water_mark
+
+        self._queues: Dict[PublishPriority, Deque[OutboundMessage]] = {
+            priority: deque() for priority in sorted(PublishPriority, reverse=True)
+        }
+        self._retained: Dict[str, OutboundMessage] = {}
+        self._len = 0
+
+        self._not_empty = asyncio.Event()
+        self._below_high_water_mark = asyncio.Event()
+        self._below_high_water_mark.set()
+
+        self.dropped: Dict[PublishPriority, int] = dict.fromkeys(PublishPriority, 0)
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    @property
+    def max_size(self) -> int:
+        """The maximum number of messages in the queue."""
+        return self._max_size
+
+    @property
+    def high_water_mark(self) -> int:
+        """The queue length at which low priority messages are dropped."""
+        return self._high_water_mark
+
+    @property
+    def total_dropped(self) -> int:
+        """The total number of messages dropped."""
+        return sum(self.dropped.values())
+
+    def put_nowait(self, message: OutboundMessage) -> bool:
+        """
+        Add a message to the queue without waiting.
+
+        :returns: False if the message was dropped.
+        """
+        if message.retain:
+            pending = self._retained.get(message.topic)
+            if pending is not None:
+                pending.payload = message.payload
+                pending.qos = message.qos
+                pending.properties = message.properties
+                if message.priority > pending.priority:
+                    self._queues[pending.priority].remove(pending)
+                    pending.priority = message.priority
+                    self._queues[pending.priority].append(pending)
+                self.coalesced += 1
+                return True
+
+        if self._len >= self._high_water_mark and message.priority is PublishPriority.LOW:
+            self.dropped[message.priority] += 1
+            return False
+
+        if self._len >= self._max_size and not self._drop_oldest_low_priority():
+            self.dropped[message.priority] += 1
+            return False
+
+        self._queues[message.priority].append(message)
+        if message.retain:
+            self._retained[message.topic] = message
+        self._len += 1
+        self._update_events()
+        return True
+
+    async def put(self, message: OutboundMessage) -> bool:
+        """
+        Add a message to the queue, waiting whilst above the high water mark.
+
+        :returns: False if the message was dropped.
+        """
+        while self._len >= self._high_water_mark:
+            await self._below_high_water_mark.wait()
+        return self.put_nowait(message)
+
+    def get_nowait(self) -> Optional[OutboundMessage]:
+        """Remove the next message from the queue, if there is one."""
+        for queue in self._queues.values():
+            if queue:
+                message = queue.popleft()
+                if message.retain and self._retained.get(message.topic) is message:
+                    del self._retained[message.topic]
+                self._len -= 1
+                self._update_events()
+                return message
+        return None
+
+    def requeue(self, message: OutboundMessage) -> bool:
+        """
+        Return a message that could not be sent to the front of the queue.
+
+        A retained message is discarded if a newer message for the same topic
+        is already queued.
+
+        :returns: False if the message was dropped.
+        """
+        if message.retain and message.topic in self._retained:
+            self.coalesced += 1
+            return False
+
+        if self._len >= self._max_size:
+            self.dropped[message.priority] += 1
+            return False
+
+        self._queues[message.priority].appendleft(message)
+        if message.retain:
+            self._retained[message.topic] = message
+        self._len += 1
+        self._update_events()
+        return True
+
+    async def get(self) -> OutboundMessage:
+        """Remove the next message from the queue, waiting for one if empty."""
+        while True:
+            message = self.get_nowait()
+            if message is not None:
+                return message
+            await self._not_empty.wait()
+
+    def _drop_oldest_low_priority(self) -> bool:
+        queue = self._queues[PublishPriority.LOW]
+        if not queue:
+            return False
+        message = queue.popleft()
+        if message.retain and self._retained.get(message.topic) is message:
+            del self._retained[message.topic]
+        self._len -= 1
+        self.dropped[PublishPriority.LOW] += 1
+        return True
+
+    def _update_events(self) -> None:
+        if self._len > 0:
+            self._not_empty.set()
+        else:
+            self._not_empty.clear()
+
+        if self._len < self._high_water_mark:
+            self._below_high_water_mark.set()
+        else:
+            self._below_high_water_mark.clear()
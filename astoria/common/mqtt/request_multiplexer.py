@@ -0,0 +1,111 @@
+"""
+Manager Request Multiplexer.
+
+Tracks the manager requests that are waiting for a response, so that many
+requests can be in flight at once over a single connection.
+"""
+import asyncio
+from typing import Callable, Dict, Optional
+from uuid import UUID
+
+from astoria.common.ipc import RequestResponse
+
+
+class RequestMultiplexer:
+    """
+    Match request responses to the requests that are waiting for them.
+
+    Each pending request has a future that is resolved when the response with
+    the same UUID arrives. Requests are removed when they are resolved, time out
+    or are cancelled, so that abandoned requests cannot leak.
+    """
+
+    def __init__(self) -> None:
+        self._pending: Dict[UUID, asyncio.Future[RequestResponse]] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __contains__(self, uuid: object) -> bool:
+        return uuid in self._pending
+
+    def register(self, uuid: UUID) -> "asyncio.Future[RequestResponse]":
+        """
+        Register a request that is waiting for a response.
+
+        :param uuid: The UUID of the request.
+        :raises ValueError: A request with the same UUID is already pending.
+        :returns: A future that is resolved with the response.
+        """
+        if uuid in self._pending:
+            raise ValueError(f"Request {uuid} is already pending")
+        future: asyncio.Future[RequestResponse] = asyncio.get_event_loop().create_future()
+        self._pending[uuid] = future
+        return future
+
+    def resolve(self, response: RequestResponse) -> bool:
+        """
+        Resolve the pending request with the same UUID as a response.
+
+        :param response: The response that was received.
+        :returns: False if no request was waiting for the response.
+        """
+        future = self._pending.pop(response.uuid, None)
+        if future is None or future.done():
+            return False
+        future.set_result(response)
+        return True
+
+    def discard(self, uuid: UUID) -> None:
+        """Stop waiting for a response to a request, cancelling it if pending."""
+        future = self._pending.pop(uuid, None)
+        if future is not None:
+            future.cancel()
+
+    def fail_all(self, exc: BaseException) -> None:
+        """Fail all pending requests with an exception."""
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(exc)
+
+    async def wait(
+        self,
+        uuid: UUID,
+        future: "asyncio.Future[RequestResponse]",
+        timeout: float,
+        *,
+        retries: int = 0,
+        resend: Optional[Callable[[], None]] = None,
+    ) -> RequestResponse:
+        """
+        Wait for the response to a request.
+
+        If there is no response, the request is resent up to ``retries`` times,
+        doubling the timeout each time. A late response to an earlier attempt
+        still resolves the request.
+
+        The request is always removed when this returns, including when the
+        caller is cancelled.
+
+        :param uuid: The UUID of the request.
+        :param future: The future returned when the request was registered.
+        :param timeout: The time to wait for the first response, in seconds.
+        :param retries: The number of times to resend the request.
+        :param resend: Called to resend the request.
+        :raises asyncio.TimeoutError: No response was received in time.
+        :returns: The response to the request.
+        """
+        try:
+            for attempt in range(retries):
+                try:
+                    return await asyncio.wait_for(
+                        asyncio.shield(future),
+                        timeout * 2**attempt,
+                    )
+                except asyncio.TimeoutError:
+                    if resend is not None:
+                        resend()
+            return await asyncio.wait_for(asyncio.shield(future), timeout * 2**retries)
+        finally:
+            self.discard(uuid)
@@ -4,8 +4,12 @@ MQTT Topic Abstraction.
 Allows topic strings to be constructed, along with regex to match them.
 """
 
+from functools import lru_cache
 from re import compile
-from typing import Dict, Match, Optional, Pattern, Sequence
+from typing import Dict, Match, Optional, Pattern, Sequence, Tuple
+
+# Maximum number of distinct topic strings kept by the Topic.parse intern cache.
+TOPIC_INTERN_CACHE_SIZE = 1024
 
 
 class Topic:
@@ -13,19 +17,53 @@ class Topic:
     An MQTT Topic.
 
     A topic that may be published or subscribed to.
+
+    Topics are immutable. The string representation, hash, publishability and
+    regular expression are calculated once when the topic is constructed.
     """
 
+    __slots__ = ("_parts", "_str", "_hash", "_is_publishable", "_regex")
+
     WILDCARDS: Dict[str, str] = {
         "+": "([^/]+)",
         "#": "(.+)",
     }
 
+    _parts: Tuple[str, ...]
+    _str: str
+    _hash: int
+    _is_publishable: bool
+    _regex: Pattern[str]
+
     def __init__(self, parts: Sequence[str]) -> None:
-        self.parts = parts
+        parts = tuple(str(p) for p in parts)
+        topic = "/".join(parts)
+        handled_parts = (self.WILDCARDS.get(p, p) for p in parts)
+
+        object.__setattr__(self, "_parts", parts)
+        object.__setattr__(self, "_str", topic)
+        object.__setattr__(self, "_hash", hash(topic))
+        object.__setattr__(
+            self,
+            "_is_publishable",
+            all(x not in parts for x in self.WILDCARDS),
+        )
+        object.__setattr__(self, "_regex", compile("^" + "/".join(handled_parts) + "$"))
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    @property
+    def parts(self) -> Tuple[str, ...]:
+        """The levels of the topic."""
+        return self._parts
 
     def match(self, topic: str) -> Optional[Match[str]]:
         """Perform a regex match on a topic."""
-        return self.regex.match(topic)
+        return self._regex.match(topic)
 
     @classmethod
     def parse(cls, topic: str) -> "Topic":
@@ -34,7 +72,16 @@ class Topic:
 
         It is assumed that the supplied topic complies with the MQTT spec.
         If not, then behaviour is undefined.
+
+        Recently parsed topics are interned, so parsing the same string
+        repeatedly returns the same instance.
         """
+        if cls is Topic:
+            return _parse_interned(topic)
+        return cls._parse(topic)
+
+    @classmethod
+    def _parse(cls, topic: str) -> "Topic":
         if len(topic) > 1:
             if topic[:1] == "/" or topic[-1:] == "/":
                 raise ValueError("Topic cannot begin or end with /")
@@ -45,17 +92,19 @@ class Topic:
         return cls(topic.split("/"))
 
     def __str__(self) -> str:
-        return "/".join(str(p) for p in self.parts)
+        return self._str
 
     def __repr__(self) -> str:
         return f'Topic("{self}")'
 
     def __hash__(self) -> int:
-        return hash(repr(self))
+        return self._hash
 
     def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
         try:
-            return self.parts == other.parts  # type: ignore
+            return self._parts == other._parts  # type: ignore
         except AttributeError:
             return False
 
@@ -66,7 +115,7 @@ class Topic:
 
         We are not permitting publication to topics containing wildcards.
         """
-        return all(x not in self.parts for x in self.WILDCARDS)
+        return self._is_publishable
 
     @property
     def regex(self) -> Pattern[str]:
@@ -75,11 +124,9 @@ class Topic:
 
         Any wildcard fields are available as capture groups.
         """
-        handled_parts = []
-        for p in self.parts:
-            try:
-                handled_parts.append(self.WILDCARDS[p])
-            except KeyError:
-                handled_parts.append(p)
-
-        return compile("^" + "/".join(handled_parts) + "$")
+        return self._regex
+
+
+@lru_cache(maxsize=TOPIC_INTERN_CACHE_SIZE)
+def _parse_interned(topic: str) -> Topic:
+    return Topic._parse(topic)
@@ -0,0 +1,58 @@
+"""
+Topic Policies.
+
+Determine the QoS, retain flag and expiry of published messages by topic.
+"""
+from typing import List, Optional, Sequence
+
+from astoria.common.config.system import TopicPolicy
+
+from .topic import Topic
+from .topic_trie import TopicTrie
+
+# Policies that apply unless overridden in the config.
+DEFAULT_TOPIC_POLICIES: List[TopicPolicy] = [
+    # Log lines are also written to disk, so do not need acknowledging.
+    TopicPolicy(topic="broadcast/usercode_log", qos=0),
+    TopicPolicy(topic="broadcast/usercode_log_batch", qos=0),
+]
+
+
+class TopicPolicyTable:
+    """
+    Look up the policy that applies to a topic.
+
+    If more than one policy matches a topic, the first one listed wins.
+    """
+
+    def __init__(self, prefix: str, policies: Sequence[TopicPolicy]) -> None:
+        self._policies: TopicTrie[int] = TopicTrie()
+        self._policy_list: List[TopicPolicy] = []
+
+        for policy in policies:
+            topic = Topic.parse(f"{prefix}/{policy.topic}")
+            # Only the first policy for an identical topic is used.
+            if topic not in self._policies:
+                self._policies.insert(topic, len(self._policy_list))
+                self._policy_list.append(policy)
+
+    @classmethod
+    def with_defaults(
+        cls,
+        prefix: str,
+        policies: Sequence[TopicPolicy],
+    ) -> "TopicPolicyTable":
+        """Create a table where the given policies override the defaults."""
+        return cls(prefix, [*policies, *DEFAULT_TOPIC_POLICIES])
+
+    def lookup(self, topic: str) -> Optional[TopicPolicy]:
+        """
+        Find the policy for a topic.
+
+        :param topic: The full topic that a message is being published to.
+        :returns: The matching policy with the highest precedence, if any.
+        """
+        matches = self._policies.match(topic)
+        if not matches:
+            return None
+        return self._policy_list[min(index for _, index in matches)]
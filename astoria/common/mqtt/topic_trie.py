@@ -0,0 +1,138 @@
+"""
+Topic Trie.
+
+Resolves the subscriptions that match an MQTT topic in a single walk.
+"""
+
+from typing import Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
+
+from .topic import Topic
+
+V = TypeVar("V")
+
+
+class _TopicTrieNode(Generic[V]):
+    """A single topic level in a TopicTrie."""
+
+    __slots__ = ("children", "entry")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, _TopicTrieNode[V]] = {}
+        self.entry: Optional[Tuple[Topic, V]] = None
+
+
+class TopicTrie(Generic[V]):
+    """
+    A trie of subscribed topics, keyed by topic level.
+
+    Each level of a subscription is stored as a node, with the ``+`` and ``#``
+    wildcards stored as ordinary children. Matching a published topic walks the
+    literal and wildcard branches together, so the cost is proportional to the
+    depth of the topic rather than the number of subscriptions.
+
+    The wildcards follow the semantics of :class:`Topic`: ``+`` matches exactly
+    one non-empty level and ``#`` matches one or more remaining levels.
+    """
+
+    def __init__(self) -> None:
+        self._root: _TopicTrieNode[V] = _TopicTrieNode()
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __contains__(self, topic: Topic) -> bool:
+        node = self._find(topic)
+        return node is not None and node.entry is not None
+
+    def __iter__(self) -> Iterator[Tuple[Topic, V]]:
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node.entry is not None:
+                yield node.entry
+            stack.extend(node.children.values())
+
+    def insert(self, topic: Topic, value: V) -> None:
+        """
+        Store a value against a subscription topic.
+
+        Any existing value for the same topic is replaced.
+        """
+        node = self._root
+        for part in topic.parts:
+            node = node.children.setdefault(part, _TopicTrieNode())
+        if node.entry is None:
+            self._len += 1
+        node.entry = (topic, value)
+
+    def remove(self, topic: Topic) -> None:
+        """
+        Remove the value stored against a subscription topic.
+
+        :raises KeyError: The topic is not in the trie.
+        """
+        path = [self._root]
+        for part in topic.parts:
+            try:
+                path.append(path[-1].children[part])
+            except KeyError:
+                raise KeyError(topic) from None
+
+        if path[-1].entry is None:
+            raise KeyError(topic)
+        path[-1].entry = None
+        self._len -= 1
+
+        # Prune any branches that no longer lead to an entry.
+        for part, node, parent in zip(
+            reversed(topic.parts),
+            reversed(path[1:]),
+            reversed(path[:-1]),
+        ):
+            if node.entry is not None or node.children:
+                break
+            del parent.children[part]
+
+    def match(self, topic: str) -> List[Tuple[Topic, V]]:
+        """
+        Find all subscriptions that match a published topic.
+
+        :param topic: The topic that a message was published on.
+        :returns: A list of matching subscription topics and their values.
+        """
+        parts = topic.split("/")
+        depth = len(parts)
+        matches: List[Tuple[Topic, V]] = []
+
+        stack = [(self._root, 0)]
+        while stack:
+            node, level = stack.pop()
+            if level == depth:
+                if node.entry is not None:
+                    matches.append(node.entry)
+                continue
+
+            multi = node.children.get("#")
+            if multi is not None and multi.entry is not None:
+                matches.append(multi.entry)
+
+            if parts[level]:
+                single = node.children.get("+")
+                if single is not None:
+                    stack.append((single, level + 1))
+
+            child = node.children.get(parts[level])
+            if child is not None:
+                stack.append((child, level + 1))
+
+        return matches
+
+    def _find(self, topic: Topic) -> Optional[_TopicTrieNode[V]]:
+        node = self._root
+        for part in topic.parts:
+            try:
+                node = node.children[part]
+            except KeyError:
+                return None
+        return node
@@ -2,31 +2,140 @@
 
 import asyncio
 import logging
-from json import JSONDecodeError, loads
+from functools import partial
+from json import JSONDecodeError
+from pathlib import Path
 from typing import (
     Any,
     Callable,
     Coroutine,
     Dict,
     List,
+    Mapping,
     Match,
+    NamedTuple,
     Optional,
+    Sequence,
+    Tuple,
+    Type,
     TypeVar,
+    overload,
 )
 from uuid import UUID
 
 import gmqtt
-from pydantic import BaseModel, ValidationError, parse_obj_as
+from gmqtt.mqtt.connection import MQTTConnection
+from gmqtt.mqtt.protocol import MQTTProtocol
+from pydantic import BaseModel, ValidationError
 
 from astoria.common.config.system import MQTTBrokerInfo
-from astoria.common.ipc import ManagerMessage, ManagerRequest, RequestResponse
+from astoria.common.ipc import (
+    DecodedPayload,
+    ManagerMessage,
+    ManagerRequest,
+    ReceivedPayload,
+    RequestResponse,
+    decode_message,
+)
 
+from .backoff import ExponentialBackoff
+from .codec import (
+    CODECS,
+    JSON_CODEC,
+    CodecError,
+    PayloadCodec,
+    get_codec_for_content_type,
+)
+from .dependency_gate import DependencyGate
+from .dispatch import DEFAULT_DISPATCH_DEPTH, Dispatcher, OverflowPolicy
+from .loopback import LoopbackHub
+from .publish_queue import OutboundMessage, PublishPriority, PublishQueue
+from .request_multiplexer import RequestMultiplexer
 from .topic import Topic
+from .topic_policy import TopicPolicyTable
+from .topic_trie import TopicTrie
 
 LOGGER = logging.getLogger(__name__)
 
-Handler = Callable[[Match[str], str], Coroutine[Any, Any, None]]  # type: ignore
+Handler = Callable[[Match[str], ReceivedPayload], Coroutine[Any, Any, None]]  # type: ignore
 RequestT = TypeVar("RequestT", bound=ManagerRequest)
+ResponseT = TypeVar("ResponseT", bound=RequestResponse)
+
+
+class ReplyTo(NamedTuple):
+    """The destination for the response to a request, from MQTT v5 properties."""
+
+    topic: str
+    correlation_data: Optional[bytes]
+
+
+RequestHandler = Callable[  # type: ignore
+    [Match[str], ReceivedPayload, Optional[ReplyTo]],
+    Coroutine[Any, Any, None],
+]
+
+
+class _Client(gmqtt.Client):
+    """
+    An MQTT client that can reconnect with backoff, and use a Unix socket.
+
+    gmqtt calls reconnect for each reconnection attempt, and waits for the
+    reconnect delay first when delay is True. If there is a backoff, the delay
+    is updated before each attempt, rather than using a fixed delay.
+
+    gmqtt creates the connection in _create_connection, for both the first
+    connection and reconnections, so the socket is chosen there. The TLS
+    settings are ignored over a Unix socket.
+    """
+
+    backoff: Optional[ExponentialBackoff] = None
+    socket_path: Optional[Path] = None
+
+    async def reconnect(self, delay: bool = False) -> None:  # noqa: FBT001, FBT002
+        if delay and self.backoff is not None:
+            self.reconnect_delay = self.backoff.next_delay()
+        await super().reconnect(delay=delay)
+
+    async def _create_connection(  # type: ignore
+        self,
+        host: str,
+        port: int,
+        ssl: bool,  # noqa: FBT001
+        clean_session: bool,  # noqa: FBT001
+        keepalive: int,
+    ) -> Any:
+        if self.socket_path is None:
+            return await super()._create_connection(
+                host,
+                port,
+                ssl,
+                clean_session,
+                keepalive,
+            )
+
+        # The same preparation as gmqtt does before connecting over TCP.
+        self._exit_reconnecting_state()
+        self._package_handler.clear_topics_aliases()
+        self._connack_received.clear()
+        self._connection_lost.clear()
+
+        protocol_factory = partial(
+            MQTTProtocol,
+            connection_state=self._connection_state,
+            id_generator=self._package_handler.id_generator,
+        )
+        transport, protocol = await asyncio.get_event_loop().create_unix_connection(
+            protocol_factory,
+            str(self.socket_path),
+        )
+        return MQTTConnection(
+            transport,
+            protocol,
+            clean_session,
+            keepalive,
+            package_handler=self._package_handler,
+            logger=self._logger,
+        )
 
 
 class MQTTWrapper:
@@ -38,8 +147,6 @@ class MQTTWrapper:
     likely to go wrong.
     """
 
-    _client: gmqtt.Client
-
     def __init__(
         self,
         client_name: str,
@@ -48,6 +155,7 @@ class MQTTWrapper:
         last_will: Optional[BaseModel] = None,
         dependencies: Optional[List[str]] = None,
         no_dependency_event: Optional[asyncio.Event] = None,
+        hub: Optional[LoopbackHub] = None,
     ) -> None:
         self._client_name = client_name
         self._broker_info = broker_info
@@ -55,39 +163,98 @@ class MQTTWrapper:
         self._dependencies = dependencies or []
         self._no_dependency_event = no_dependency_event
 
-        self._dependency_events: Dict[str, asyncio.Event] = {
-            name: asyncio.Event() for name in self._dependencies
-        }
+        # Messages from the hub are identified using a property that only
+        # exists in MQTT v5.
+        if hub is not None and self._broker_info.force_protocol_version_3_1:
+            LOGGER.warning(
+                "In-process delivery requires MQTT v5, all messages will be sent "
+                "through the broker.",
+            )
+            hub = None
+        self._hub = hub
+
+        # The codec is signalled using a property that only exists in MQTT v5.
+        if self._broker_info.force_protocol_version_3_1:
+            self._codec: PayloadCodec = JSON_CODEC
+        else:
+            self._codec = CODECS[self._broker_info.payload_encoding]
+
+        self._dependency_gate = DependencyGate(
+            self._dependencies,
+            lost_event=self._no_dependency_event,
+        )
+
+        self._subscriptions: TopicTrie[Tuple[Handler, Dispatcher]] = TopicTrie()
+        self._request_subscriptions: TopicTrie[
+            Tuple[RequestHandler, Dispatcher]
+        ] = TopicTrie()
 
-        self._topic_handlers: Dict[Topic, Handler] = {}
+        self._topic_policies = TopicPolicyTable.with_defaults(
+            self._broker_info.topic_prefix,
+            self._broker_info.topic_policies,
+        )
+        self._publish_queue = PublishQueue(
+            max_size=self._broker_info.publish_queue_size,
+            high_water_mark=self._broker_info.publish_queue_high_water_mark,
+        )
+        self._publish_task: Optional[asyncio.Task[None]] = None
+        self._connected_event = asyncio.Event()
+        self._has_connected = False
+        self._last_status: Optional[OutboundMessage] = None
 
-        self._client = gmqtt.Client(
+        self._client = _Client(
             self._client_name,
             will_message=self.last_will_message,
         )
-
-        self._client.reconnect_retries = 0
+        self._client.socket_path = self._broker_info.socket_path
+        if self._broker_info.reconnect:
+            self._client.backoff = ExponentialBackoff(
+                minimum=self._broker_info.reconnect_delay_min,
+                maximum=self._broker_info.reconnect_delay_max,
+            )
+            self._client.reconnect_retries = gmqtt.constants.UNLIMITED_RECONNECTS
+        else:
+            self._client.reconnect_retries = 0
 
         self._client.on_message = self.on_message
         self._client.on_connect = self.on_connect
         self._client.on_disconnect = self.on_disconnect
 
-        self.subscribe("+", self._dependency_message_handler)
+        self.subscribe(
+            "+",
+            self._dependency_message_handler,
+            overflow=OverflowPolicy.LATEST_WINS,
+        )
 
-        # Subscribe to request response from dependent managers
-        for manager in self._dependencies:
-            self.subscribe(
-                f"{manager}/request/+/+",
-                self._request_response_message_handler,
-            )
-        self._request_response_events: Dict[UUID, asyncio.Event] = {}
-        self._request_response_data: Dict[UUID, RequestResponse] = {}
+        # Subscribe to request responses from dependent managers.
+        #
+        # With MQTT v5, managers publish responses to the private reply topic
+        # given in the request. Otherwise responses are published to a topic
+        # per request, and every client receives the responses for all clients.
+        if self._dependencies:
+            if self._broker_info.force_protocol_version_3_1:
+                for manager in self._dependencies:
+                    self.subscribe(
+                        f"{manager}/request/+/+",
+                        self._request_response_message_handler,
+                    )
+            else:
+                self.subscribe(
+                    f"{self._client_name}/response",
+                    self._request_response_message_handler,
+                )
+        self._requests = RequestMultiplexer()
 
     @property
     def is_connected(self) -> bool:
         """Determine if the client connected to the broker."""
         return self._client.is_connected
 
+    @property
+    def publish_queue(self) -> PublishQueue:
+        """The queue of messages waiting to be published."""
+        return self._publish_queue
+
     @property
     def last_will_message(self) -> Optional[gmqtt.Message]:
         """Last will and testament message for this client."""
@@ -105,6 +272,13 @@ class MQTTWrapper:
         """The topic prefix for MQTT."""
         return f"{self._broker_info.topic_prefix}/{self._client_name}"
 
+    @property
+    def response_topic(self) -> Optional[str]:
+        """The private topic that request responses are sent to, if supported."""
+        if self._broker_info.force_protocol_version_3_1:
+            return None
+        return f"{self.mqtt_prefix}/response"
+
     async def connect(self) -> None:
         """Connect to the broker."""
         if self.is_connected:
@@ -120,6 +294,12 @@ class MQTTWrapper:
             version=mqtt_version,
         )
 
+        if self._publish_task is None:
+            self._publish_task = asyncio.ensure_future(self._publish_worker())
+
+        if self._hub is not None:
+            self._hub.attach(self)
+
     async def disconnect(self) -> None:
         """Disconnect from the broker."""
         if not self.is_connected:
@@ -127,6 +307,15 @@ class MQTTWrapper:
                 "Attempting disconnection, but client is already disconnected.",
             )
 
+        if self._hub is not None:
+            self._hub.detach(self)
+
+        if self._publish_task is not None:
+            self._publish_task.cancel()
+            self._publish_task = None
+        self.flush()
+        self._requests.fail_all(RuntimeError("Disconnected before request response"))
+
         await self._client.disconnect()
 
         if self.is_connected:
@@ -140,13 +329,33 @@ class MQTTWrapper:
         properties: Dict[str, List[int]],
     ) -> None:
         """Callback for mqtt connection."""
-        for topic in self._topic_handlers:
+        for topic, _ in [*self._subscriptions, *self._request_subscriptions]:
             LOGGER.debug(f"Subscribing to {topic}")
             client.subscribe(str(topic))
 
+        if self._has_connected:
+            LOGGER.info("Reconnected to MQTT broker")
+            if self._client.backoff is not None:
+                self._client.backoff.reset()
+
+            # The broker published our last will when the connection was lost,
+            # so the status must be published again.
+            if self._last_will is not None and self._last_status is not None:
+                self._publish_queue.requeue(self._last_status)
+
+        self._has_connected = True
+        self._connected_event.set()
+
     def on_disconnect(self, client: gmqtt.client.Client, packet: bytes) -> None:
         """Callback for mqtt disconnection."""
         LOGGER.debug("MQTT client disconnected")
+        self._connected_event.clear()
+
+        # When reconnecting, messages are queued until the connection returns.
+        if self._broker_info.reconnect and self._publish_task is not None:
+            LOGGER.warning("Lost connection to MQTT broker, reconnecting")
+            return
+
         if self._no_dependency_event is not None:
             self._no_dependency_event.set()
 
@@ -156,18 +365,106 @@ class MQTTWrapper:
         topic: str,
         payload: bytes,
         qos: int,
-        properties: Dict[str, int],
+        properties: Mapping[str, object],
     ) -> gmqtt.constants.PubRecReasonCode:
         """Callback for mqtt messages."""
         LOGGER.debug(f"Message received on {topic} with payload: {payload!r}")
-        for t, handler in self._topic_handlers.items():
+        if self._hub is not None and self._hub.is_echo(properties):
+            # The message has already been delivered in-process.
+            return gmqtt.constants.PubRecReasonCode.SUCCESS
+
+        decoded = self._decode_payload(topic, payload, properties)
+        if decoded is None:
+            return gmqtt.constants.PubRecReasonCode.PAYLOAD_FORMAT_INVALID
+
+        self.dispatch(topic, decoded, properties)
+        return gmqtt.constants.PubRecReasonCode.SUCCESS
+
+    def dispatch(
+        self,
+        topic: str,
+        payload: ReceivedPayload,
+        properties: Mapping[str, object],
+    ) -> None:
+        """
+        Pass a received message to the handlers of matching subscriptions.
+
+        :param topic: The topic that the message was received on.
+        :param payload: The JSON payload of the message, or its decoded data.
+        :param properties: The MQTT v5 properties of the message.
+        """
+        for t, (handler, dispatcher) in self._subscriptions.match(topic):
+            # The trie has already selected the subscription, the regex is only
+            # used to capture the wildcard groups for the handler.
             match = t.match(topic)
             if match:
-                asyncio.ensure_future(self.wait_dependencies())
-                LOGGER.debug(f"Calling {handler.__name__} to handle {topic}")
-                asyncio.ensure_future(handler(match, payload.decode()))
+                LOGGER.debug(f"Queueing {handler.__name__} to handle {topic}")
+                dispatcher.submit(topic, partial(handler, match, payload))
+
+        request_matches = self._request_subscriptions.match(topic)
+        if request_matches:
+            reply_to = self._get_reply_to(properties)
+            for t, (request_handler, dispatcher) in request_matches:
+                match = t.match(topic)
+                if match:
+                    LOGGER.debug(
+                        f"Queueing {request_handler.__name__} to handle {topic}",
+                    )
+                    dispatcher.submit(
+                        topic,
+                        partial(request_handler, match, payload, reply_to),
+                    )
+
+    def _get_reply_to(self, properties: Mapping[str, object]) -> Optional[ReplyTo]:
+        """
+        Get the reply destination from the properties of a request.
 
-        return gmqtt.constants.PubRecReasonCode.SUCCESS
+        Response topics outside of the topic prefix are ignored, so that a
+        request cannot be used to publish to arbitrary topics.
+        """
+        response_topic = properties.get("response_topic")
+        if not isinstance(response_topic, list) or not response_topic:
+            return None
+
+        topic = str(response_topic[0])
+        if not topic.startswith(f"{self._broker_info.topic_prefix}/"):
+            LOGGER.warning(f"Ignoring response topic outside of prefix: {topic}")
+            return None
+
+        correlation_data = properties.get("correlation_data")
+        if isinstance(correlation_data, list) and correlation_data:
+            return ReplyTo(topic, bytes(correlation_data[0]))
+        return ReplyTo(topic, None)
+
+    def _decode_payload(
+        self,
+        topic: str,
+        payload: bytes,
+        properties: Mapping[str, object],
+    ) -> Optional[ReceivedPayload]:
+        """
+        Convert a received payload into the form expected by handlers.
+
+        JSON payloads are passed to handlers as text. Payloads in other
+        encodings are identified by their content type and decoded here, and
+        the decoded data is passed to handlers to be validated directly.
+        """
+        content_type = properties.get("content_type")
+        if not payload or not isinstance(content_type, list) or not content_type:
+            return payload.decode()
+
+        codec = get_codec_for_content_type(str(content_type[0]))
+        if codec is None:
+            LOGGER.warning(f"Unknown content type {content_type[0]} on {topic}")
+            return None
+        if codec is JSON_CODEC:
+            return payload.decode()
+
+        try:
+            return DecodedPayload(codec.decode(payload))
+        except CodecError:
+            LOGGER.warning(f"Unable to decode {codec.content_type} payload on {topic}")
+            return None
 
     def publish(
         self,
@@ -177,13 +474,111 @@ class MQTTWrapper:
         retain: bool = False,
         auto_prefix_topic: bool = True,
         auto_prefix_client_name: bool = True,
+        codec: Optional[PayloadCodec] = None,
+        priority: PublishPriority = PublishPriority.NORMAL,
     ) -> None:
-        """Publish a payload to the broker."""
+        """
+        Publish a payload to the broker.
+
+        The payload is encoded with the codec from the broker config, unless
+        another codec is given.
+
+        Messages are added to the publish queue and sent in the background.
+        Low priority messages are dropped if the queue is above its high water mark.
+        """
+        message = self._build_message(
+            topic,
+            payload,
+            retain=retain,
+            auto_prefix_topic=auto_prefix_topic,
+            auto_prefix_client_name=auto_prefix_client_name,
+            codec=codec,
+            priority=priority,
+        )
+        self._enqueue(message)
+
+    async def publish_async(
+        self,
+        topic: str,
+        payload: BaseModel,
+        *,
+        retain: bool = False,
+        auto_prefix_topic: bool = True,
+        auto_prefix_client_name: bool = True,
+        codec: Optional[PayloadCodec] = None,
+        priority: PublishPriority = PublishPriority.NORMAL,
+    ) -> None:
+        """
+        Publish a payload to the broker.
+
+        As publish, but waits whilst the publish queue is above its high water mark.
+        """
+        message = self._build_message(
+            topic,
+            payload,
+            retain=retain,
+            auto_prefix_topic=auto_prefix_topic,
+            auto_prefix_client_name=auto_prefix_client_name,
+            codec=codec,
+            priority=priority,
+        )
+        if not await self._publish_queue.put(message):
+            self._log_dropped_message(message)
+
+    def publish_response(
+        self,
+        request_name: str,
+        response: RequestResponse,
+        reply_to: Optional[ReplyTo],
+    ) -> None:
+        """
+        Publish the response to a manager request.
+
+        The response is sent to the reply topic of the request if it has one,
+        otherwise it is sent to the request topic for the request UUID.
+        """
+        if reply_to is None:
+            self.publish(f"request/{request_name}/{response.uuid}", response)
+            return
+
+        message = self._build_message(
+            reply_to.topic,
+            response,
+            retain=False,
+            auto_prefix_topic=False,
+            auto_prefix_client_name=False,
+            codec=None,
+            priority=PublishPriority.NORMAL,
+        )
+        if reply_to.correlation_data is not None:
+            message.properties["correlation_data"] = reply_to.correlation_data
+        self._enqueue(message)
+
+    def flush(self) -> None:
+        """Send all queued messages to the broker immediately."""
         if not self.is_connected:
-            LOGGER.error(
-                "Attempted to publish message, but client is not connected.",
+            LOGGER.warning(
+                f"Unable to flush {len(self._publish_queue)} queued messages, "
+                "client is not connected.",
             )
+            return
+
+        message = self._publish_queue.get_nowait()
+        while message is not None:
+            self._send(message)
+            message = self._publish_queue.get_nowait()
 
+    def _build_message(
+        self,
+        topic: str,
+        payload: BaseModel,
+        *,
+        retain: bool,
+        auto_prefix_topic: bool,
+        auto_prefix_client_name: bool,
+        codec: Optional[PayloadCodec],
+        priority: PublishPriority,
+    ) -> OutboundMessage:
         if auto_prefix_client_name:
             prefix = self.mqtt_prefix
         else:
@@ -199,23 +594,124 @@ class MQTTWrapper:
         if not topic_complete.is_publishable:
             raise ValueError(f"Cannot publish to MQTT topic: {topic_complete}")
 
-        self._client.publish(
+        if codec is None or self._broker_info.force_protocol_version_3_1:
+            codec = self._codec
+
+        qos = 1
+        policy = self._topic_policies.lookup(str(topic_complete))
+        if policy is not None:
+            qos = policy.qos
+            if policy.retain is not None:
+                retain = policy.retain
+
+        message = OutboundMessage(
             str(topic_complete),
-            payload.json(),
-            qos=1,
+            codec.encode(payload),
+            qos=qos,
             retain=retain,
+            priority=priority,
+        )
+
+        # JSON is the default, so the content type is not required.
+        if codec is not JSON_CODEC:
+            message.properties["content_type"] = codec.content_type
+
+        # Handlers in the same process are given the JSON payload directly.
+        if self._hub is not None:
+            if codec is JSON_CODEC:
+                message.loopback_payload = message.payload.decode()
+            else:
+                message.loopback_payload = payload.json()
+
+        if (
+            policy is not None
+            and policy.message_expiry is not None
+            and not self._broker_info.force_protocol_version_3_1
+        ):
+            message.properties["message_expiry_interval"] = policy.message_expiry
+
+        return message
+
+    def _enqueue(self, message: OutboundMessage) -> None:
+        if (
+            self._hub is not None
+            and self._hub.is_attached(self)
+            and message.loopback_payload is not None
+        ):
+            self._hub.publish(
+                message.topic,
+                message.loopback_payload,
+                retain=message.retain,
+                properties=message.properties,
+            )
+            message.properties["user_property"] = self._hub.user_property
+
+        if not self._publish_queue.put_nowait(message):
+            self._log_dropped_message(message)
+
+    def _send(self, message: OutboundMessage) -> None:
+        if message.retain and message.topic == self.mqtt_prefix:
+            self._last_status = message
+        self._client.publish(
+            message.topic,
+            message.payload,
+            qos=message.qos,
+            retain=message.retain,
+            **message.properties,
         )
 
+    async def _publish_worker(self) -> None:
+        """Send queued messages to the broker, whilst it is connected."""
+        while True:
+            await self._connected_event.wait()
+            message = await self._publish_queue.get()
+            if not self.is_connected:
+                # The connection was lost whilst waiting for a message.
+                self._connected_event.clear()
+                self._publish_queue.requeue(message)
+                continue
+
+            try:
+                self._send(message)
+            except Exception:
+                if self.is_connected:
+                    # Sending the message again would fail in the same way.
+                    LOGGER.exception(f"Unable to publish message on {message.topic}")
+                    self._publish_queue.dropped[message.priority] += 1
+                else:
+                    LOGGER.warning(
+                        f"Connection lost whilst publishing on {message.topic}",
+                        exc_info=True,
+                    )
+                    self._publish_queue.requeue(message)
+
+    def _log_dropped_message(self, message: OutboundMessage) -> None:
+        dropped = self._publish_queue.total_dropped
+        # Log at exponentially increasing intervals to avoid flooding the log.
+        if dropped & (dropped - 1) == 0:
+            LOGGER.warning(
+                f"Publish queue is full, dropped message on {message.topic}. "
+                f"{dropped} messages have been dropped in total.",
+            )
+
     def subscribe(
         self,
         topic: str,
         callback: Handler,
+        *,
+        concurrency: int = 1,
+        max_depth: int = DEFAULT_DISPATCH_DEPTH,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
     ) -> None:
         """
         Subscribe to an MQTT Topic.
 
         Callback is called when a message arrives.
 
+        Received messages wait in a queue of at most max_depth messages, and
+        at most concurrency calls to the callback run at once. A concurrency
+        of 1 handles messages in the order that they were received.
+
         Should be called before the MQTT wrapper is connected.
         """
         if len(topic) == 0:
@@ -223,52 +719,91 @@ class MQTTWrapper:
         else:
             topic_complete = Topic.parse(f"{self._broker_info.topic_prefix}/{topic}")
 
-        self._topic_handlers[topic_complete] = callback
+        dispatcher = Dispatcher(
+            str(topic_complete),
+            concurrency=concurrency,
+            max_depth=max_depth,
+            overflow=overflow,
+        )
+        self._subscriptions.insert(topic_complete, (callback, dispatcher))
+
+    def subscribe_request(
+        self,
+        topic: str,
+        callback: RequestHandler,
+        *,
+        concurrency: Optional[int] = None,
+        max_depth: int = DEFAULT_DISPATCH_DEPTH,
+    ) -> None:
+        """
+        Subscribe to an MQTT Topic that receives manager requests.
+
+        As subscribe, but the callback is also given the reply destination
+        of the request, which should be passed to publish_response.
+
+        Requests are independent of each other, so by default several are
+        handled at once, as set by request_concurrency in the broker config.
+        A slow request then does not hold up the requests after it.
+
+        Should be called before the MQTT wrapper is connected.
+        """
+        if concurrency is None:
+            concurrency = self._broker_info.request_concurrency
+        topic_complete = Topic.parse(f"{self._broker_info.topic_prefix}/{topic}")
+        dispatcher = Dispatcher(
+            str(topic_complete),
+            concurrency=concurrency,
+            max_depth=max_depth,
+        )
+        self._request_subscriptions.insert(topic_complete, (callback, dispatcher))
+
+    @property
+    def dependency_gate(self) -> DependencyGate:
+        """The availability of the dependencies."""
+        return self._dependency_gate
 
     async def wait_dependencies(self) -> None:
-        """Wait for all dependencies."""
-        if len(self._dependencies) > 0:
-            LOGGER.debug("Waiting for " + ", ".join(self._dependencies))
+        """
+        Wait for all dependencies.
 
-            tasks = [
-                asyncio.gather(
-                    *(event.wait() for event in self._dependency_events.values()),
-                ),
-            ]
+        Also returns if the no dependency event is set, e.g on disconnection.
+        """
+        if self._dependency_gate.is_ready:
+            return
 
-            if self._no_dependency_event is not None:
-                tasks.append(self._no_dependency_event.wait())  # type: ignore
+        LOGGER.debug("Waiting for " + ", ".join(self._dependencies))
+        if self._no_dependency_event is None:
+            await self._dependency_gate.ready
+            return
 
-            await asyncio.wait(
-                tasks,
+        stopped = asyncio.ensure_future(self._no_dependency_event.wait())
+        try:
+            await asyncio.wait(  # type: ignore[type-var]
+                [self._dependency_gate.ready, stopped],
                 return_when=asyncio.FIRST_COMPLETED,
             )
+        finally:
+            stopped.cancel()
 
     @property
     def has_dependencies(self) -> bool:
         """Are the dependencies of the manager available?."""
-        return all(event.is_set() for event in self._dependency_events.values())
+        return self._dependency_gate.is_ready
 
     async def _dependency_message_handler(
         self,
         match: Match[str],
-        payload: str,
+        payload: ReceivedPayload,
     ) -> None:
         """Handle status messages from state managers."""
         manager = match.group(1)
         try:
-            info = parse_obj_as(ManagerMessage, loads(payload))
+            info = decode_message(ManagerMessage, payload)
             LOGGER.debug(f"Status update from {manager}: {info.status}")
-            if info.status is ManagerMessage.Status.RUNNING:
-                try:
-                    self._dependency_events[manager].set()
-                except KeyError:
-                    pass
-            else:
-                if self.has_dependencies and manager in self._dependency_events:
-                    LOGGER.warning(f"{manager} is unavailable!")
-                    if self._no_dependency_event is not None:
-                        self._no_dependency_event.set()
+            self._dependency_gate.update(
+                manager,
+                available=info.status is ManagerMessage.Status.RUNNING,
+            )
         except JSONDecodeError:
             LOGGER.warning(
                 f"Received invalid JSON in manager message for {manager}: {payload}",
@@ -278,6 +813,7 @@ class MQTTWrapper:
                 f"Received invalid manager message for {manager}: {payload}",
             )
 
+    @overload
     async def manager_request(
         self,
         manager: str,
@@ -285,59 +821,190 @@ class MQTTWrapper:
         request: RequestT,
         *,
         response_timeout: float = 1,
+        retries: int = 0,
+    ) -> RequestResponse:
+        ...
+
+    @overload
+    async def manager_request(
+        self,
+        manager: str,
+        request_name: str,
+        request: RequestT,
+        *,
+        response_timeout: float = 1,
+        retries: int = 0,
+        response_schema: Type[ResponseT],
+    ) -> ResponseT:
+        ...
+
+    async def manager_request(
+        self,
+        manager: str,
+        request_name: str,
+        request: RequestT,
+        *,
+        response_timeout: float = 1,
+        retries: int = 0,
+        response_schema: Type[RequestResponse] = RequestResponse,
     ) -> RequestResponse:
         """
         Perform a manager request.
 
+        If there is no response within the timeout, the request is resent up
+        to ``retries`` times, doubling the timeout each time. Managers only
+        handle each request UUID once, so it is safe to retry any request.
+
+        Requests that return data should pass the schema of their response.
+
         Raises exception if not dependent on manager, or if request fails.
         """
-        if manager not in self._dependencies:
-            raise ValueError(
-                f"{manager} must be listed as dependency to make manager request",
+        self._check_request_manager(manager)
+        message = self._build_request_message(manager, request_name, request)
+        future = self._requests.register(request.uuid)
+        self._enqueue(message)
+        try:
+            response = await self._requests.wait(
+                request.uuid,
+                future,
+                response_timeout,
+                retries=retries,
+                resend=lambda: self._enqueue(message),
             )
+        except asyncio.TimeoutError as e:
+            raise RuntimeError("No response to manager request") from e
 
-        topic = f"{self._broker_info.topic_prefix}/{manager}/request/{request_name}"
+        if isinstance(response, response_schema):
+            return response
+        try:
+            return response_schema.parse_obj(response.dict())
+        except ValidationError as e:
+            raise RuntimeError("Invalid response to manager request") from e
 
-        self._request_response_events[request.uuid] = asyncio.Event()
+    async def manager_request_many(
+        self,
+        manager: str,
+        request_name: str,
+        requests: Sequence[RequestT],
+        *,
+        response_timeout: float = 1,
+        retries: int = 0,
+    ) -> List[RequestResponse]:
+        """
+        Perform several manager requests at once.
 
-        self.publish(topic, request, auto_prefix_topic=False)
+        All of the requests are sent before waiting for any responses, so the
+        batch takes a single response timeout rather than one per request.
+        Requests are retried as in manager_request.
 
-        try:
-            await asyncio.wait_for(
-                self._request_response_events[request.uuid].wait(),
-                response_timeout,
+        A failed response is returned in place of any request that times out.
+        Raises exception if not dependent on manager.
+        """
+        self._check_request_manager(manager)
+        messages = [
+            self._build_request_message(manager, request_name, request)
+            for request in requests
+        ]
+        futures = [self._requests.register(request.uuid) for request in requests]
+        for message in messages:
+            self._enqueue(message)
+
+        async def _wait(
+            request: RequestT,
+            message: OutboundMessage,
+            future: "asyncio.Future[RequestResponse]",
+        ) -> RequestResponse:
+            try:
+                return await self._requests.wait(
+                    request.uuid,
+                    future,
+                    response_timeout,
+                    retries=retries,
+                    resend=lambda: self._enqueue(message),
+                )
+            except asyncio.TimeoutError:
+                return RequestResponse(
+                    uuid=request.uuid,
+                    success=False,
+                    reason="No response to manager request",
+                )
+
+        return list(
+            await asyncio.gather(
+                *(
+                    _wait(request, message, future)
+                    for request, message, future in zip(requests, messages, futures)
+                ),
+            ),
+        )
+
+    def _check_request_manager(self, manager: str) -> None:
+        if manager not in self._dependencies:
+            raise ValueError(
+                f"{manager} must be listed as dependency to make manager request",
             )
-        except asyncio.TimeoutError as e:
-            raise RuntimeError("No response to manager request") from e
-        if request.uuid not in self._request_response_data:
-            raise RuntimeError("Request Response not available.")
-        else:
-            self._request_response_events.pop(request.uuid)
-            return self._request_response_data.pop(request.uuid)
+
+    def _build_request_message(
+        self,
+        manager: str,
+        request_name: str,
+        request: ManagerRequest,
+    ) -> OutboundMessage:
+        topic = f"{self._broker_info.topic_prefix}/{manager}/request/{request_name}"
+        message = self._build_message(
+            topic,
+            request,
+            retain=False,
+            auto_prefix_topic=False,
+            auto_prefix_client_name=True,
+            codec=None,
+            priority=PublishPriority.NORMAL,
+        )
+        if self.response_topic is not None:
+            message.properties["response_topic"] = self.response_topic
+            message.properties["correlation_data"] = request.uuid.bytes
+        return message
 
     async def _request_response_message_handler(
         self,
         match: Match[str],
-        payload: str,
+        payload: ReceivedPayload,
     ) -> None:
-        """Handle request response messages."""
-        try:
-            uuid = UUID(match.group(2))
-        except ValueError:
-            # The UUID is invalid, ignore it.
-            return
+        """
+        Handle request response messages.
 
-        # If uuid not recognised, probably a response for another client
-        if uuid in self._request_response_events:
+        Responses on the legacy request topics carry the UUID in the topic.
+        Responses on the private reply topic are identified by their payload.
+        """
+        if match.lastindex == 2:
             try:
-                self._request_response_data[uuid] = parse_obj_as(
-                    RequestResponse,
-                    loads(payload),
-                )
-            except JSONDecodeError:
-                self._request_response_data[uuid] = RequestResponse(
-                    uuid=uuid,
-                    success=False,
-                    reason="Unable to decode request response.",
-                )
-            self._request_response_events[uuid].set()
+                uuid: Optional[UUID] = UUID(match.group(2))
+            except ValueError:
+                # The UUID is invalid, ignore it.
+                return
+
+            # If uuid not recognised, probably a response for another client
+            if uuid not in self._requests:
+                return
+        else:
+            uuid = None
+
+        try:
+            response = decode_message(RequestResponse, payload)
+        except (JSONDecodeError, ValidationError):
+            if uuid is None:
+                LOGGER.warning(f"Received invalid request response: {payload}")
+                return
+            response = RequestResponse(
+                uuid=uuid,
+                success=False,
+                reason="Unable to decode request response.",
+            )
+
+        if uuid is not None and response.uuid != uuid:
+            response = RequestResponse(
+                uuid=uuid,
+                success=False,
+                reason="Request response UUID does not match request.",
+            )
+        self._requests.resolve(response)
@@ -0,0 +1,79 @@
+"""
+Micro-benchmark for decoding IPC messages.
+
+Compares pydantic's parse_obj_as with the prebuilt decoders in the schema
+registry. Run with ``python -m benchmarks.decode_ipc``.
+"""
+from json import loads
+from pathlib import Path
+from timeit import repeat
+from typing import Callable, List, Tuple, Type
+from uuid import UUID
+
+from pydantic import BaseModel, parse_obj_as
+
+from astoria.common.code_status import CodeStatus
+from astoria.common.disks import DiskInfo, DiskType, DiskUUID
+from astoria.common.ipc import (
+    LogEventSource,
+    ProcessManagerMessage,
+    RequestResponse,
+    UsercodeLogBroadcastEvent,
+    decode_message,
+)
+
+ITERATIONS = 20_000
+REPEATS = 5
+
+MESSAGES: List[BaseModel] = [
+    UsercodeLogBroadcastEvent(
+        event_name="usercode_log",
+        sender_name="astprocd",
+        priority=1234,
+        pid=4567,
+        content="[0:00:01.234567] Hello World\n",
+        source=LogEventSource.STDOUT,
+    ),
+    ProcessManagerMessage(
+        status=ProcessManagerMessage.Status.RUNNING,
+        code_status=CodeStatus.RUNNING,
+        disk_info=DiskInfo(
+            uuid=DiskUUID("bees"),
+            mount_path=Path("/media/bees"),
+            disk_type=DiskType.USERCODE,
+        ),
+        pid=4567,
+    ),
+    RequestResponse(
+        uuid=UUID("7d8ff8e5-4c2a-4ad3-a1ac-a2e5e2d1b0c9"),
+        success=True,
+    ),
+]
+
+
+def _throughput(func: Callable[[], object]) -> float:
+    """Best-of throughput in messages per second."""
+    best = min(repeat(func, number=ITERATIONS, repeat=REPEATS))
+    return ITERATIONS / best
+
+
+def _benchmark(schema: Type[BaseModel], payload: bytes) -> Tuple[float, float]:
+    before = _throughput(lambda: parse_obj_as(schema, loads(payload)))
+    after = _throughput(lambda: decode_message(schema, payload))
+    return before, after
+
+
+def main() -> None:
+    """Run the benchmark and print a table of results."""
+    print(f"{'schema':<28} {'parse_obj_as':>14} {'registry':>14} {'speedup':>8}")
+    for message in MESSAGES:
+        schema = type(message)
+        before, after = _benchmark(schema, message.json().encode())
+        print(
+            f"{schema.__name__:<28} {before:>12.0f}/s {after:>12.0f}/s "
+            f"{after / before:>7.2f}x",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark for formatting usercode log lines.
+
+Compares formatting a timedelta from the wall clock for every line with the
+cached LogLineFormatter, over a million lines, and compares building the
+initial log lines from templates each run with the precompiled templates.
+Run with ``python -m benchmarks.log_format``.
+"""
+from datetime import datetime, timezone
+from pathlib import Path
+from string import Template
+from timeit import repeat
+from typing import Callable, List
+
+from astoria.astprocd.log_format import (
+    LogLineFormatter,
+    compile_initial_log_lines,
+    render_initial_log_lines,
+)
+from astoria.common.config import AstoriaConfig
+from astoria.common.metadata import Metadata
+
+LINES = 1_000_000
+RUNS = 10_000
+REPEATS = 3
+
+CONTENT = "Hello World\n"
+INITIAL_LOG_LINES = [
+    "Zone: $zone",
+    "Arena: $arena",
+    "Mode: $mode",
+    "Astoria: $astoria_version",
+]
+
+
+def _format_lines_timedelta() -> None:
+    start_time = datetime.now(tz=timezone.utc)
+    for _ in range(LINES):
+        time_passed = datetime.now(tz=timezone.utc) - start_time
+        f"[{time_passed}] {CONTENT}"
+
+
+def _format_lines_formatter() -> None:
+    formatter = LogLineFormatter()
+    for _ in range(LINES):
+        formatter.format(CONTENT)
+
+
+def _initial_lines_templates(metadata: Metadata) -> List[str]:
+    return [Template(line).safe_substitute(metadata.dict()) for line in INITIAL_LOG_LINES]
+
+
+def _best(func: Callable[[], object], number: int) -> float:
+    """Best-of time for a number of calls, in seconds."""
+    return min(repeat(func, number=number, repeat=REPEATS))
+
+
+def _print_result(name: str, unit: str, count: int, before: float, after: float) -> None:
+    print(
+        f"{name:<20} {count / before:>12.0f}/s {count / after:>12.0f}/s "
+        f"{before / after:>7.2f}x  ({unit})",
+    )
+
+
+def main() -> None:
+    """Run the benchmark and print a table of results."""
+    with Path("astoria.toml").open("rb") as fh:
+        config = AstoriaConfig.load_from_file(fh)
+    metadata = Metadata.init(config)
+
+    print(f"{'benchmark':<20} {'before':>14} {'after':>14} {'speedup':>8}")
+
+    before = _best(_format_lines_timedelta, 1)
+    after = _best(_format_lines_formatter, 1)
+    _print_result("format lines", "lines", LINES, before, after)
+
+    templates = compile_initial_log_lines(INITIAL_LOG_LINES)
+    before = _best(lambda: _initial_lines_templates(metadata), RUNS)
+    after = _best(lambda: render_initial_log_lines(templates, metadata), RUNS)
+    _print_result("initial log lines", "runs", RUNS, before, after)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 """Stubs for gmqtt.client."""
+import asyncio
 from typing import (
     Any,
     Callable,
@@ -12,6 +13,7 @@ from typing import (
 )
 
 from .constants import PubRecReasonCode
+from .mqtt.handler import MqttPackageHandler
 
 class Message:
     def __init__(
@@ -51,6 +53,13 @@ class Client:
     ): ...
 
     _client_id: str
+    _connack_received: asyncio.Event
+    _connection_lost: asyncio.Event
+    _connection_state: Any
+    _logger: Any
+    _package_handler: MqttPackageHandler
+
+    def _exit_reconnecting_state(self) -> None: ...
 
     @property
     def is_connected(self) -> bool: ...
@@ -79,6 +88,23 @@ class Client:
     @reconnect_retries.setter
     def reconnect_retries(self, n: int) -> None: ...
 
+    @property
+    def reconnect_delay(self) -> float: ...
+
+    @reconnect_delay.setter
+    def reconnect_delay(self, delay: float) -> None: ...
+
+    async def reconnect(self, delay: bool = False) -> None: ...
+
+    async def _create_connection(
+        self,
+        host: str,
+        port: int,
+        ssl: bool,
+        clean_session: bool,
+        keepalive: int,
+    ) -> Any: ...
+
 
     def set_auth_credentials(self, username: str, password: Optional[str] = None) -> None: ...
 
@@ -109,4 +135,5 @@ class Client:
         payloadOptional: Optional[Union[List[Any], Tuple[Any, ...], Dict[Any, Any], int, float, str, bytes]] = None,
         qos: int = 0,
         retain: bool = False,
+        **kwargs: Any,
     ) -> None: ...
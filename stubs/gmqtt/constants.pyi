@@ -4,6 +4,8 @@ import enum
 MQTTv311 = 4
 MQTTv50 = 5
 
+UNLIMITED_RECONNECTS = -1
+
 
 class PubRecReasonCode(enum.IntEnum):
     SUCCESS = 0
@@ -0,0 +1 @@
+"""Stubs for gmqtt.mqtt."""
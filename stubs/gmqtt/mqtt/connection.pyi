@@ -0,0 +1,18 @@
+"""Stubs for gmqtt.mqtt.connection."""
+import asyncio
+from typing import Any
+
+from .handler import MqttPackageHandler
+from .protocol import MQTTProtocol
+
+class MQTTConnection:
+
+    def __init__(
+        self,
+        transport: asyncio.BaseTransport,
+        protocol: MQTTProtocol,
+        clean_session: bool,
+        keepalive: int,
+        package_handler: MqttPackageHandler,
+        logger: Any = None,
+    ): ...
@@ -0,0 +1,8 @@
+"""Stubs for gmqtt.mqtt.handler."""
+from typing import Any
+
+class MqttPackageHandler:
+
+    id_generator: Any
+
+    def clear_topics_aliases(self) -> None: ...
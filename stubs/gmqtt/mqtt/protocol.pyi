@@ -0,0 +1,7 @@
+"""Stubs for gmqtt.mqtt.protocol."""
+import asyncio
+from typing import Any
+
+class MQTTProtocol(asyncio.Protocol):
+
+    def __init__(self, *args: Any, **kwargs: Any): ...
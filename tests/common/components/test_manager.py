@@ -0,0 +1,155 @@
+"""Tests for the state manager base class."""
+
+import asyncio
+from typing import Any, List, Tuple
+
+import pytest
+from pydantic import BaseModel
+
+from astoria.common.components import StateManager
+from astoria.common.ipc import ManagerMessage, StatusPatch
+
+CONFIG_FILE = "tests/data/config/valid.toml"
+
+
+class StubManager(StateManager[ManagerMessage]):
+    """State manager that records the messages that it publishes."""
+
+    name = "stubd"
+
+    def _init(self) -> None:
+        self.messages: List[Tuple[str, BaseModel]] = []
+        self._mqtt.publish = self._record  # type: ignore[method-assign]
+
+    def _record(self, topic: str, payload: BaseModel, **kwargs: Any) -> None:  # type: ignore
+        self.messages.append((topic, payload))
+
+    @property
+    def published(self) -> List[ManagerMessage.Status]:
+        """The statuses that have been published."""
+        return [
+            payload.status
+            for topic, payload in self.messages
+            if isinstance(payload, ManagerMessage)
+        ]
+
+    @property
+    def offline_status(self) -> ManagerMessage:
+        """Status to publish when the manager goes offline."""
+        return ManagerMessage(status=ManagerMessage.Status.STOPPED)
+
+    async def main(self) -> None:
+        """Main method of the manager."""
+        pass
+
+
+class RateLimitedStubManager(StubManager):
+    """State manager with a minimum status publish interval."""
+
+    @property
+    def status_publish_interval(self) -> float:
+        """Minimum time between status publications, in seconds."""
+        return 0.05
+
+
+class PatchingStubManager(StubManager):
+    """State manager that publishes status patches."""
+
+    @property
+    def publish_status_patches(self) -> bool:
+        """Publish a merge patch to the patch topic with each status change."""
+        return True
+
+
+RUNNING = ManagerMessage(status=ManagerMessage.Status.RUNNING)
+STOPPED = ManagerMessage(status=ManagerMessage.Status.STOPPED)
+
+
+def test_status_unchanged_not_published() -> None:
+    """Test that setting an equal status does not publish it again."""
+    manager = StubManager(verbose=False, config_file=CONFIG_FILE)
+
+    manager.status = RUNNING
+    manager.status = ManagerMessage(status=ManagerMessage.Status.RUNNING)
+    assert manager.published == [RUNNING.status]
+
+    manager.status = STOPPED
+    manager.status = RUNNING
+    assert manager.published == [RUNNING.status, STOPPED.status, RUNNING.status]
+
+
+@pytest.mark.asyncio
+async def test_status_publish_interval() -> None:
+    """Test that changes within the interval are coalesced."""
+    manager = RateLimitedStubManager(verbose=False, config_file=CONFIG_FILE)
+
+    manager.status = RUNNING
+    manager.status = STOPPED
+    manager.status = RUNNING
+    manager.status = STOPPED
+    assert manager.published == [RUNNING.status]
+    assert manager.status.status == STOPPED.status
+
+    # Only the latest status is published at the end of the interval.
+    await asyncio.sleep(0.1)
+    assert manager.published == [RUNNING.status, STOPPED.status]
+
+
+@pytest.mark.asyncio
+async def test_status_publish_interval_unchanged() -> None:
+    """Test that no trailing publish is sent if the status changed back."""
+    manager = RateLimitedStubManager(verbose=False, config_file=CONFIG_FILE)
+
+    manager.status = RUNNING
+    manager.status = STOPPED
+    manager.status = RUNNING
+
+    await asyncio.sleep(0.1)
+    assert manager.published == [RUNNING.status]
+
+
+@pytest.mark.asyncio
+async def test_offline_status_not_delayed() -> None:
+    """Test that the offline status is published immediately on disconnect."""
+    manager = RateLimitedStubManager(verbose=False, config_file=CONFIG_FILE)
+
+    manager.status = RUNNING
+    manager.status = STOPPED
+    manager.status = RUNNING
+    await manager._pre_disconnect()
+    assert manager.published == [RUNNING.status, STOPPED.status]
+
+    # The cancelled trailing publish is not sent later.
+    await asyncio.sleep(0.1)
+    assert manager.published == [RUNNING.status, STOPPED.status]
+
+
+def test_status_sequence() -> None:
+    """Test that each published status has the next sequence number."""
+    manager = StubManager(verbose=False, config_file=CONFIG_FILE)
+
+    manager.status = RUNNING
+    manager.status = RUNNING
+    manager.status = STOPPED
+    assert manager.status.sequence == 2
+    sequences = [
+        payload.sequence
+        for _, payload in manager.messages
+        if isinstance(payload, ManagerMessage)
+    ]
+    assert sequences == [1, 2]
+
+
+def test_status_patches() -> None:
+    """Test that a patch is published with each status change."""
+    manager = PatchingStubManager(verbose=False, config_file=CONFIG_FILE)
+
+    manager.status = RUNNING
+    manager.status = STOPPED
+    assert [topic for topic, _ in manager.messages] == ["", "patch", ""]
+
+    _, patch = manager.messages[1]
+    assert patch == StatusPatch(
+        sequence=2,
+        patch={"status": "STOPPED", "sequence": 2},
+    )
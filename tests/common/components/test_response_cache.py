@@ -0,0 +1,107 @@
+"""Tests for the request response cache."""
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from astoria.common.components.response_cache import ResponseCache
+from astoria.common.ipc import RequestResponse
+
+
+@pytest.mark.asyncio
+async def test_response_cache_duplicate_request() -> None:
+    """Test that a duplicate request gets the cached response."""
+    cache = ResponseCache()
+    uuid = uuid4()
+    calls = 0
+
+    async def handler() -> RequestResponse:
+        nonlocal calls
+        calls += 1
+        return RequestResponse(uuid=uuid, success=True, reason=str(calls))
+
+    first = await cache.get_or_handle(uuid, handler)
+    second = await cache.get_or_handle(uuid, handler)
+
+    assert first == second
+    assert calls == 1
+    assert cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_response_cache_in_flight_duplicate() -> None:
+    """Test that a duplicate of a request in progress shares its response."""
+    cache = ResponseCache()
+    uuid = uuid4()
+    release = asyncio.Event()
+    calls = 0
+
+    async def handler() -> RequestResponse:
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return RequestResponse(uuid=uuid, success=True)
+
+    tasks = [asyncio.ensure_future(cache.get_or_handle(uuid, handler)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+
+    responses = await asyncio.gather(*tasks)
+    assert calls == 1
+    assert all(r == responses[0] for r in responses)
+
+
+@pytest.mark.asyncio
+async def test_response_cache_handler_error_not_cached() -> None:
+    """Test that a request is handled again if the handler failed."""
+    cache = ResponseCache()
+    uuid = uuid4()
+
+    async def failing_handler() -> RequestResponse:
+        raise RuntimeError("bees")
+
+    async def handler() -> RequestResponse:
+        return RequestResponse(uuid=uuid, success=True)
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_handle(uuid, failing_handler)
+    assert uuid not in cache
+
+    assert (await cache.get_or_handle(uuid, handler)).success
+
+
+@pytest.mark.asyncio
+async def test_response_cache_bounded() -> None:
+    """Test that the oldest responses are evicted when the cache is full."""
+    cache = ResponseCache(max_size=2)
+    uuids = [uuid4() for _ in range(3)]
+
+    async def handler() -> RequestResponse:
+        return RequestResponse(uuid=uuid4(), success=True)
+
+    for uuid in uuids:
+        await cache.get_or_handle(uuid, handler)
+
+    assert len(cache) == 2
+    assert uuids[0] not in cache
+    assert uuids[2] in cache
+
+
+@pytest.mark.asyncio
+async def test_response_cache_expiry() -> None:
+    """Test that responses expire after the TTL."""
+    cache = ResponseCache(ttl=0.01)
+    uuid = uuid4()
+    calls = 0
+
+    async def handler() -> RequestResponse:
+        nonlocal calls
+        calls += 1
+        return RequestResponse(uuid=uuid, success=True)
+
+    await cache.get_or_handle(uuid, handler)
+    await asyncio.sleep(0.02)
+    await cache.get_or_handle(uuid, handler)
+
+    assert calls == 2
@@ -26,7 +26,8 @@ def test_manager_status_fields() -> None:
     assert message.astoria_version == __version__
 
     assert (
-        message.json() == f'{{"status": "STOPPED", "astoria_version": "{__version__}"}}'
+        message.json()
+        == f'{{"status": "STOPPED", "astoria_version": "{__version__}", "sequence": 0}}'
     )
 
 
@@ -47,7 +48,7 @@ def test_manager_status_subclass() -> None:
 
     assert (
         message.json()
-        == f'{{"status": "RUNNING", "astoria_version": "{__version__}", "custom_field": 12}}'  # noqa: E501
+        == f'{{"status": "RUNNING", "astoria_version": "{__version__}", "sequence": 0, "custom_field": 12}}'  # noqa: E501
     )
 
     # Check for Validation Error
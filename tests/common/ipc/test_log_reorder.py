@@ -0,0 +1,118 @@
+"""Tests for the reordering of usercode log lines."""
+
+from typing import List
+
+from astoria.common.ipc import LogEventSource, LogReorderBuffer, UsercodeLogLine
+
+
+def _lines(*sequences: int) -> List[UsercodeLogLine]:
+    return [
+        UsercodeLogLine(
+            sequence=sequence,
+            source=LogEventSource.STDOUT,
+            timestamp=0,
+            content=f"{sequence}\n",
+        )
+        for sequence in sequences
+    ]
+
+
+def _sequences(lines: List[UsercodeLogLine]) -> List[int]:
+    return [line.sequence for line in lines]
+
+
+def test_log_reorder_in_order() -> None:
+    """Test that lines in order are released immediately."""
+    buffer = LogReorderBuffer()
+    assert _sequences(buffer.add(1, _lines(0, 1, 2))) == [0, 1, 2]
+    assert _sequences(buffer.add(1, _lines(3))) == [3]
+    assert buffer.deadline is None
+
+
+def test_log_reorder_out_of_order() -> None:
+    """Test that lines are released once the lines before them arrive."""
+    buffer = LogReorderBuffer()
+    assert _sequences(buffer.add(1, _lines(0, 3, 4))) == [0]
+    assert buffer.deadline is not None
+    assert _sequences(buffer.add(1, _lines(2))) == []
+    assert _sequences(buffer.add(1, _lines(1))) == [1, 2, 3, 4]
+    assert buffer.deadline is None
+    assert buffer.missed == 0
+
+
+def test_log_reorder_duplicates() -> None:
+    """Test that lines that have already been released are ignored."""
+    buffer = LogReorderBuffer()
+    buffer.add(1, _lines(0, 1))
+    assert _sequences(buffer.add(1, _lines(1, 2))) == [2]
+
+
+def test_log_reorder_gap_expires() -> None:
+    """Test that a missing line is skipped after the maximum latency."""
+    buffer = LogReorderBuffer(max_latency=10)
+    buffer.add(1, _lines(0, 2, 3, 5))
+    deadline = buffer.deadline
+    assert deadline is not None
+
+    assert buffer.expire(deadline - 1) == []
+    assert _sequences(buffer.expire(deadline)) == [2, 3]
+    assert buffer.missed == 1
+
+    # The next gap has its own deadline.
+    assert buffer.deadline is not None
+    assert _sequences(buffer.expire(buffer.deadline)) == [5]
+    assert buffer.missed == 2
+    assert buffer.deadline is None
+
+
+def test_log_reorder_max_pending() -> None:
+    """Test that a gap is skipped if too many lines are waiting."""
+    buffer = LogReorderBuffer(max_pending=2)
+    buffer.add(1, _lines(0))
+    assert _sequences(buffer.add(1, _lines(2, 3, 4))) == [2, 3, 4]
+    assert buffer.missed == 1
+
+
+def test_log_reorder_join_part_way() -> None:
+    """Test that a run joined part way through waits for earlier lines once."""
+    buffer = LogReorderBuffer()
+    assert buffer.add(1, _lines(11, 12)) == []
+    assert _sequences(buffer.add(1, _lines(10))) == []
+
+    deadline = buffer.deadline
+    assert deadline is not None
+    assert _sequences(buffer.expire(deadline)) == [10, 11, 12]
+    assert buffer.missed == 0
+
+
+def test_log_reorder_new_run() -> None:
+    """Test that the previous run is released when a new run starts."""
+    buffer = LogReorderBuffer()
+    buffer.add(1, _lines(0, 2))
+    assert _sequences(buffer.add(2, _lines(0))) == [2, 0]
+    assert buffer.missed == 1
+
+    # Late lines from the previous run are ignored.
+    assert buffer.add(1, _lines(3)) == []
+    assert _sequences(buffer.add(2, _lines(1))) == [1]
+
+
+def test_log_reorder_flush() -> None:
+    """Test that all waiting lines can be released."""
+    buffer = LogReorderBuffer()
+    buffer.add(1, _lines(0, 2, 4))
+    assert _sequences(buffer.flush()) == [2, 4]
+    assert len(buffer) == 0
+    assert buffer.deadline is None
+
+
+def test_log_reorder_skip_to() -> None:
+    """Test that lines that have been received some other way are ignored."""
+    buffer = LogReorderBuffer()
+    buffer.skip_to(1, 5)
+    buffer.skip_to(2, 3)
+    assert _sequences(buffer.add(2, _lines(2, 3, 4))) == [3, 4]
+
+    # Lines of the earlier run are ignored.
+    assert buffer.add(1, _lines(5)) == []
+    assert buffer.missed == 0
@@ -0,0 +1,78 @@
+"""Tests for the IPC schema registry."""
+
+from json import JSONDecodeError
+from uuid import uuid4
+
+import pytest
+from pydantic import ValidationError
+
+from astoria.common.ipc import (
+    SCHEMA_REGISTRY,
+    DecodedPayload,
+    MetadataSetManagerRequest,
+    ProcessManagerMessage,
+    RequestResponse,
+    SchemaRegistry,
+    UsercodeLogBroadcastEvent,
+    decode_message,
+)
+from astoria.common.ipc.manager_messages import ManagerMessage
+
+
+def test_schema_registry_prebuilds_subclasses() -> None:
+    """Test that decoders are built for all known message classes."""
+    for schema in [
+        ManagerMessage,
+        ProcessManagerMessage,
+        MetadataSetManagerRequest,
+        RequestResponse,
+        UsercodeLogBroadcastEvent,
+    ]:
+        assert schema in SCHEMA_REGISTRY
+
+
+def test_schema_registry_registers_on_demand() -> None:
+    """Test that a schema defined later is registered on first use."""
+    registry = SchemaRegistry([ManagerMessage])
+
+    class LateManagerMessage(ManagerMessage):
+        bees: int
+
+    assert LateManagerMessage not in registry
+
+    message = registry.decode(LateManagerMessage, '{"status": "RUNNING", "bees": 3}')
+    assert message.bees == 3
+    assert LateManagerMessage in registry
+    assert registry.decoder(LateManagerMessage) is registry.decoder(LateManagerMessage)
+
+
+def test_decode_message_str_and_bytes() -> None:
+    """Test that a payload can be decoded from either str or bytes."""
+    response = RequestResponse(uuid=uuid4(), success=True, reason="bees")
+
+    assert decode_message(RequestResponse, response.json()) == response
+    assert decode_message(RequestResponse, response.json().encode()) == response
+
+
+def test_decode_message_decoded_payload() -> None:
+    """Test that a payload that is already decoded is validated directly."""
+    response = RequestResponse(uuid=uuid4(), success=True, reason="bees")
+    data = {"uuid": str(response.uuid), "success": True, "reason": "bees"}
+
+    assert decode_message(RequestResponse, DecodedPayload(data)) == response
+
+    with pytest.raises(ValidationError):
+        decode_message(RequestResponse, DecodedPayload([]))
+
+
+def test_decode_message_invalid_json() -> None:
+    """Test that invalid JSON raises the same error as json.loads."""
+    with pytest.raises(JSONDecodeError):
+        decode_message(RequestResponse, "{bees")
+
+
+@pytest.mark.parametrize("payload", ['{"uuid": "bees"}', "[]", "3"])
+def test_decode_message_invalid_schema(payload: str) -> None:
+    """Test that a payload that does not match the schema is rejected."""
+    with pytest.raises(ValidationError):
+        decode_message(RequestResponse, payload)
@@ -0,0 +1,192 @@
+"""Tests for manager status patches."""
+
+from json import loads
+from pathlib import Path
+from typing import Union
+
+import pytest
+from pydantic import ValidationError
+
+from astoria.common.config import AstoriaConfig
+from astoria.common.disks import DiskUUID
+from astoria.common.ipc import (
+    DiskManagerMessage,
+    MetadataManagerMessage,
+    StatusPatch,
+    StatusTracker,
+    apply_merge_patch,
+    create_merge_patch,
+)
+from astoria.common.metadata import Metadata
+
+with Path("tests/data/config/valid.toml").open("rb") as fh:
+    CONFIG = AstoriaConfig.load_from_file(fh)
+
+
+def _metadata_message(
+    sequence: int,
+    **kwargs: Union[str, bool],
+) -> MetadataManagerMessage:
+    return MetadataManagerMessage(
+        status=MetadataManagerMessage.Status.RUNNING,
+        metadata=Metadata.init(CONFIG).copy(update=kwargs),
+        sequence=sequence,
+    )
+
+
+def _patch(
+    source: MetadataManagerMessage,
+    target: MetadataManagerMessage,
+) -> str:
+    return StatusPatch(
+        sequence=target.sequence,
+        patch=create_merge_patch(loads(source.json()), loads(target.json())),
+    ).json()
+
+
+@pytest.mark.parametrize(
+    ("source", "target", "patch"),
+    [
+        ({"a": 1}, {"a": 1}, {}),
+        ({"a": 1}, {"a": 2}, {"a": 2}),
+        ({"a": 1, "b": 2}, {"a": 1}, {"b": None}),
+        ({"a": {"b": 1, "c": 2}}, {"a": {"b": 1, "c": 3}}, {"a": {"c": 3}}),
+        ({"a": [1, 2]}, {"a": [1]}, {"a": [1]}),
+        ({"a": 1}, {"a": {"b": 1}}, {"a": {"b": 1}}),
+    ],
+)
+def test_merge_patch(source: dict, target: dict, patch: dict) -> None:  # type: ignore
+    """Test creating and applying merge patches."""
+    assert create_merge_patch(source, target) == patch
+    assert apply_merge_patch(source, patch) == target
+
+
+def test_apply_merge_patch_does_not_modify_target() -> None:
+    """Test that applying a merge patch returns a new object."""
+    target = {"a": {"b": 1}}
+    apply_merge_patch(target, {"a": {"b": 2}})
+    assert target == {"a": {"b": 1}}
+
+
+def test_status_tracker_applies_patch() -> None:
+    """Test that a patch following the current status is applied."""
+    first = _metadata_message(1)
+    second = _metadata_message(2, wifi_enabled=False)
+    tracker = StatusTracker(MetadataManagerMessage)
+
+    assert tracker.update(first.json()) == first
+    assert tracker.apply_patch(_patch(first, second)) == {
+        "sequence": 2,
+        "metadata": {"wifi_enabled": False},
+    }
+    assert tracker.status == second
+
+    # The full status has already been applied.
+    assert tracker.update(second.json()) is None
+
+
+def test_status_tracker_does_not_modify_status() -> None:
+    """Test that applying a patch does not modify the previous status."""
+    first = _metadata_message(1)
+    second = _metadata_message(2, wifi_enabled=False)
+    tracker = StatusTracker(MetadataManagerMessage)
+
+    status = tracker.update(first.json())
+    tracker.apply_patch(_patch(first, second))
+    assert status == first
+
+
+def test_status_tracker_patch_gap() -> None:
+    """Test that a patch is ignored if an earlier patch was missed."""
+    first = _metadata_message(1)
+    second = _metadata_message(2, wifi_enabled=False)
+    third = _metadata_message(3, wifi_enabled=False, wifi_region="US")
+    tracker = StatusTracker(MetadataManagerMessage)
+
+    tracker.update(first.json())
+    assert tracker.apply_patch(_patch(second, third)) is None
+    assert tracker.status == first
+
+    # The tracker catches up from the next full status.
+    assert tracker.update(third.json()) == third
+
+
+def test_status_tracker_patch_before_status() -> None:
+    """Test that patches are ignored until there is a full status."""
+    tracker = StatusTracker(MetadataManagerMessage)
+    patch = _patch(_metadata_message(1), _metadata_message(2, wifi_enabled=False))
+    assert tracker.apply_patch(patch) is None
+    assert tracker.status is None
+
+
+def test_status_tracker_manager_restart() -> None:
+    """Test that a status with an earlier sequence number is applied."""
+    first = _metadata_message(1)
+    second = _metadata_message(2, wifi_enabled=False)
+    tracker = StatusTracker(MetadataManagerMessage)
+
+    tracker.update(first.json())
+    tracker.apply_patch(_patch(first, second))
+    assert tracker.update(first.json()) == first
+
+
+def test_status_tracker_ignores_older_status() -> None:
+    """Test that a delayed older status does not replace a newer one."""
+    first = _metadata_message(1)
+    second = _metadata_message(2, wifi_enabled=False)
+    third = _metadata_message(3, wifi_region="US")
+    tracker = StatusTracker(MetadataManagerMessage)
+
+    tracker.update(first.json())
+    tracker.update(third.json())
+    assert tracker.update(second.json()) is None
+    assert tracker.status == third
+
+
+def test_status_tracker_offline_status() -> None:
+    """Test that an offline status is applied, whatever its sequence number."""
+    first = _metadata_message(1)
+    third = _metadata_message(3, wifi_region="US")
+    offline = MetadataManagerMessage(
+        status=MetadataManagerMessage.Status.STOPPED,
+        metadata=first.metadata,
+        sequence=2,
+    )
+    tracker = StatusTracker(MetadataManagerMessage)
+
+    tracker.update(first.json())
+    tracker.update(third.json())
+    assert tracker.update(offline.json()) == offline
+
+
+def test_status_tracker_patch_dict_field() -> None:
+    """Test that dictionary fields are merged and validated."""
+    first = DiskManagerMessage(
+        status=DiskManagerMessage.Status.RUNNING,
+        disks={DiskUUID("foo"): Path("/media/foo")},
+        sequence=1,
+    )
+    tracker = StatusTracker(DiskManagerMessage)
+    tracker.update(first.json())
+
+    tracker.apply_patch(
+        StatusPatch(
+            sequence=2,
+            patch={"sequence": 2, "disks": {"foo": None, "bar": "/media/bar"}},
+        ).json(),
+    )
+    assert tracker.status is not None
+    assert tracker.status.disks == {DiskUUID("bar"): Path("/media/bar")}
+
+
+def test_status_tracker_invalid_patch() -> None:
+    """Test that an invalid patch is rejected."""
+    first = _metadata_message(1)
+    tracker = StatusTracker(MetadataManagerMessage)
+    tracker.update(first.json())
+
+    with pytest.raises(ValidationError):
+        tracker.apply_patch(
+            StatusPatch(sequence=2, patch={"status": "BEES"}).json(),
+        )
+    assert tracker.status == first
@@ -24,5 +24,5 @@ def test_proc_manager_fields() -> None:
 
     assert (
         pmm.json()
-        == f'{{"status": "RUNNING", "astoria_version": "{__version__}", "code_status": "code_running", "disk_info": {{"uuid": "foobar", "mount_path": "/mnt", "disk_type": "NOACTION"}}, "pid": 8335}}'  # noqa: E501
+        == f'{{"status": "RUNNING", "astoria_version": "{__version__}", "sequence": 0, "code_status": "code_running", "disk_info": {{"uuid": "foobar", "mount_path": "/mnt", "disk_type": "NOACTION"}}, "pid": 8335}}'  # noqa: E501
     )
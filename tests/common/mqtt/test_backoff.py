@@ -0,0 +1,48 @@
+"""Tests for the reconnection backoff."""
+
+import pytest
+from pydantic import ValidationError
+
+from astoria.common.config.system import MQTTBrokerInfo
+from astoria.common.mqtt.backoff import ExponentialBackoff
+
+
+def test_backoff_bounds() -> None:
+    """Test that delays stay within the exponentially growing bound."""
+    backoff = ExponentialBackoff(minimum=0.5, maximum=4)
+
+    for bound in (0.5, 1, 2, 4, 4, 4):
+        delay = backoff.next_delay()
+        assert 0.5 <= delay <= bound
+
+    assert backoff.attempts == 3
+
+
+def test_backoff_reset() -> None:
+    """Test that the backoff starts again from the minimum after a reset."""
+    backoff = ExponentialBackoff(minimum=1, maximum=10)
+    for _ in range(5):
+        backoff.next_delay()
+
+    backoff.reset()
+    assert backoff.attempts == 0
+    assert backoff.next_delay() == 1
+
+
+@pytest.mark.parametrize("minimum,maximum", [(-1, 1), (0, 1), (2, 1)])
+def test_backoff_invalid(minimum: float, maximum: float) -> None:
+    """Test that invalid bounds are rejected."""
+    with pytest.raises(ValueError):
+        ExponentialBackoff(minimum=minimum, maximum=maximum)
+
+
+@pytest.mark.parametrize("minimum,maximum", [(-1, 1), (0, 1), (2, 1)])
+def test_reconnect_delay_config_invalid(minimum: float, maximum: float) -> None:
+    """Test that invalid reconnect delays are rejected in the config."""
+    with pytest.raises(ValidationError):
+        MQTTBrokerInfo(
+            host="localhost",
+            port=1883,
+            reconnect_delay_min=minimum,
+            reconnect_delay_max=maximum,
+        )
@@ -0,0 +1,145 @@
+"""Tests for the broadcast helper."""
+
+import asyncio
+from re import match
+from typing import List, Match
+
+import pytest
+
+from astoria.common.config.system import MQTTBrokerInfo
+from astoria.common.ipc import StartButtonBroadcastEvent
+from astoria.common.mqtt import BroadcastHelper, OverflowPolicy
+from astoria.common.mqtt.wrapper import MQTTWrapper
+
+BROKER_INFO = MQTTBrokerInfo(
+    host="localhost",
+    port=1883,
+)
+
+
+def get_match() -> Match[str]:
+    """Get a Match[str] object."""
+    res = match(".*", "bees")
+    if res is not None:
+        return res
+    else:
+        raise RuntimeError("Regex did not match")
+
+
+def _helper(
+    max_size: int = 3,
+    overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+) -> BroadcastHelper[StartButtonBroadcastEvent]:
+    return BroadcastHelper.get_helper(
+        MQTTWrapper("foo", BROKER_INFO),
+        StartButtonBroadcastEvent,
+        max_size=max_size,
+        overflow=overflow,
+    )
+
+
+async def _receive(
+    helper: BroadcastHelper[StartButtonBroadcastEvent],
+    senders: List[str],
+) -> None:
+    for sender in senders:
+        ev = StartButtonBroadcastEvent(
+            event_name=StartButtonBroadcastEvent.name,
+            sender_name=sender,
+        )
+        await helper._handle_broadcast(get_match(), ev.json())
+
+
+def _senders(events: List[StartButtonBroadcastEvent]) -> List[str]:
+    return [ev.sender_name for ev in events]
+
+
+@pytest.mark.asyncio
+async def test_broadcast_helper_wait_broadcast() -> None:
+    """Test that events are read in the order they were received."""
+    helper = _helper()
+    await _receive(helper, ["a", "b"])
+
+    assert (await helper.wait_broadcast()).sender_name == "a"
+    assert (await helper.wait_broadcast()).sender_name == "b"
+
+    task = asyncio.ensure_future(helper.wait_broadcast())
+    await asyncio.sleep(0)
+    assert not task.done()
+
+    await _receive(helper, ["c"])
+    assert (await asyncio.wait_for(task, 0.1)).sender_name == "c"
+
+
+@pytest.mark.asyncio
+async def test_broadcast_helper_drop_oldest() -> None:
+    """Test that the oldest events are dropped when the buffer is full."""
+    helper = _helper()
+    await _receive(helper, ["a", "b", "c", "d", "e"])
+
+    assert len(helper) == 3
+    assert helper.dropped == 2
+    assert _senders(await helper.drain()) == ["c", "d", "e"]
+
+
+@pytest.mark.asyncio
+async def test_broadcast_helper_drop_newest() -> None:
+    """Test that new events are dropped when the buffer is full."""
+    helper = _helper(overflow=OverflowPolicy.DROP_NEWEST)
+    await _receive(helper, ["a", "b", "c", "d", "e"])
+
+    assert helper.dropped == 2
+    assert _senders(await helper.drain()) == ["a", "b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_broadcast_helper_latest_wins() -> None:
+    """Test that only the latest event is kept."""
+    helper = _helper(overflow=OverflowPolicy.LATEST_WINS)
+    await _receive(helper, ["a", "b", "c"])
+
+    assert helper.dropped == 2
+    assert _senders(await helper.drain()) == ["c"]
+
+
+@pytest.mark.asyncio
+async def test_broadcast_helper_drain_max_items() -> None:
+    """Test that drain reads at most the maximum number of events."""
+    helper = _helper()
+    await _receive(helper, ["a", "b", "c"])
+
+    assert _senders(await helper.drain(2)) == ["a", "b"]
+    assert _senders(await helper.drain(2)) == ["c"]
+
+
+@pytest.mark.asyncio
+async def test_broadcast_helper_drain_waits() -> None:
+    """Test that drain waits for an event."""
+    helper = _helper()
+    task = asyncio.ensure_future(helper.drain())
+    await asyncio.sleep(0)
+    assert not task.done()
+
+    await _receive(helper, ["a"])
+    assert _senders(await asyncio.wait_for(task, 0.1)) == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_broadcast_helper_iterator_close() -> None:
+    """Test that iteration ends when the helper is closed."""
+    helper = _helper()
+    await _receive(helper, ["a", "b"])
+
+    async def read() -> List[str]:
+        return [ev.sender_name async for ev in helper]
+
+    task = asyncio.ensure_future(read())
+    await asyncio.sleep(0)
+    helper.close()
+
+    assert await asyncio.wait_for(task, 0.1) == ["a", "b"]
+    assert await helper.drain() == []
+
+    # Events received after closing are ignored.
+    await _receive(helper, ["c"])
+    assert len(helper) == 0
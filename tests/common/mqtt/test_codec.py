@@ -0,0 +1,185 @@
+"""Tests for the MQTT payload codecs."""
+
+from datetime import timedelta
+from json import loads
+from typing import List
+
+import pytest
+from pydantic import BaseModel
+
+from astoria.common.code_status import CodeStatus
+from astoria.common.config.system import PayloadEncoding
+from astoria.common.ipc import LogEventSource, ProcessManagerMessage
+from astoria.common.ipc import UsercodeLogBroadcastEvent as LogEvent
+from astoria.common.mqtt.codec import (
+    CODECS,
+    JSON_CODEC,
+    CodecError,
+    MessagePackCodec,
+    get_codec_for_content_type,
+)
+from astoria.common.mqtt.msgpack import MessagePackError, packb, unpackb
+
+MSGPACK_VALUES: List[object] = [
+    None,
+    True,
+    False,
+    0,
+    127,
+    128,
+    255,
+    256,
+    65535,
+    65536,
+    2**32,
+    2**64 - 1,
+    -1,
+    -32,
+    -33,
+    -128,
+    -129,
+    -(2**15),
+    -(2**31) - 1,
+    -(2**63),
+    1.5,
+    "",
+    "bees",
+    "🐝" * 20,
+    "x" * 300,
+    "y" * 70000,
+    b"\x00\x01",
+    b"z" * 300,
+    [],
+    [1, "two", None],
+    list(range(20)),
+    list(range(70000)),
+    {},
+    {"a": 1, "b": [True, {"c": "d"}]},
+    {str(i): i for i in range(20)},
+]
+
+
+@pytest.mark.parametrize("value", MSGPACK_VALUES)
+def test_msgpack_round_trip(value: object) -> None:
+    """Test that values survive a round trip through msgpack."""
+    assert unpackb(packb(value)) == value
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        (None, b"\xc0"),
+        (5, b"\x05"),
+        (-1, b"\xff"),
+        (300, b"\xcd\x01\x2c"),
+        ("abc", b"\xa3abc"),
+        ([1, 2], b"\x92\x01\x02"),
+        ({"a": True}, b"\x81\xa1a\xc3"),
+    ],
+)
+def test_msgpack_encoding(value: object, expected: bytes) -> None:
+    """Test that values are encoded according to the msgpack spec."""
+    assert packb(value) == expected
+
+
+def test_msgpack_tuple_packed_as_array() -> None:
+    """Test that tuples are packed as arrays."""
+    assert unpackb(packb((1, 2))) == [1, 2]
+
+
+def test_msgpack_unsupported_type() -> None:
+    """Test that unsupported types are rejected unless a default is given."""
+    with pytest.raises(MessagePackError):
+        packb(object())
+
+    assert unpackb(packb({1, 2}, default=repr)) == "{1, 2}"
+
+
+def test_msgpack_default_nested() -> None:
+    """Test that the default is used for values inside a converted value."""
+
+    def default(obj: object) -> object:
+        if isinstance(obj, timedelta):
+            return obj.total_seconds()
+        if isinstance(obj, set):
+            return {"items": sorted(obj), "delay": timedelta(seconds=2)}
+        raise TypeError
+
+    assert unpackb(packb({1, 2}, default=default)) == {"items": [1, 2], "delay": 2.0}
+
+
+def test_msgpack_default_recursion() -> None:
+    """Test that a default which never converts to a native type is bounded."""
+    with pytest.raises(MessagePackError):
+        packb(object(), default=lambda obj: [obj])
+
+
+@pytest.mark.parametrize(
+    "data",
+    [b"", b"\xa3ab", b"\xc1", b"\x92\x01", b"\x05\x05", b"\xcd\x01", b"\x81\x90\x01"],
+)
+def test_msgpack_invalid_data(data: bytes) -> None:
+    """Test that invalid data raises MessagePackError."""
+    with pytest.raises(MessagePackError):
+        unpackb(data)
+
+
+@pytest.mark.parametrize("encoding", list(PayloadEncoding))
+def test_codec_round_trip(encoding: PayloadEncoding) -> None:
+    """Test that a message survives a round trip through each codec."""
+    codec = CODECS[encoding]
+    message = ProcessManagerMessage(
+        status=ProcessManagerMessage.Status.RUNNING,
+        code_status=CodeStatus.RUNNING,
+        disk_info=None,
+        pid=1234,
+    )
+    decoded = codec.decode(codec.encode(message))
+    assert decoded == loads(message.json())
+    assert ProcessManagerMessage.parse_obj(decoded) == message
+
+
+@pytest.mark.parametrize("encoding", list(PayloadEncoding))
+def test_codec_uses_json_encoders(encoding: PayloadEncoding) -> None:
+    """Test that each codec applies the json_encoders of the model."""
+
+    class DurationModel(BaseModel):
+        duration: timedelta
+
+        class Config:
+            json_encoders = {timedelta: lambda td: f"{td.total_seconds()}s"}
+
+    codec = CODECS[encoding]
+    message = DurationModel(duration=timedelta(seconds=90))
+    assert codec.decode(codec.encode(message)) == {"duration": "90.0s"}
+
+
+def test_msgpack_codec_is_smaller() -> None:
+    """Test that the msgpack codec produces smaller log events than JSON."""
+    event = LogEvent(
+        event_name="usercode_log",
+        sender_name="astprocd",
+        priority=12,
+        pid=4567,
+        content="[0:00:01.234567] Hello World\n",
+        source=LogEventSource.STDOUT,
+    )
+    assert len(MessagePackCodec().encode(event)) < len(JSON_CODEC.encode(event))
+
+
+def test_codec_decode_error() -> None:
+    """Test that invalid payloads raise CodecError."""
+    for codec in CODECS.values():
+        with pytest.raises(CodecError):
+            codec.decode(b"\xc1{")
+
+
+def test_get_codec_for_content_type() -> None:
+    """Test that codecs are selected by content type."""
+    assert get_codec_for_content_type(None) is JSON_CODEC
+    assert get_codec_for_content_type("application/json") is JSON_CODEC
+    assert isinstance(
+        get_codec_for_content_type("application/msgpack"),
+        MessagePackCodec,
+    )
+    assert get_codec_for_content_type("text/bees") is None
@@ -0,0 +1,74 @@
+"""Tests for the dependency gate."""
+
+import asyncio
+
+import pytest
+
+from astoria.common.mqtt.dependency_gate import DependencyGate, GateState
+
+
+def test_dependency_gate_no_dependencies() -> None:
+    """Test that a gate without dependencies is ready immediately."""
+    gate = DependencyGate([])
+    assert gate.is_ready
+    assert gate.state is GateState.READY
+
+
+@pytest.mark.asyncio
+async def test_dependency_gate_ready() -> None:
+    """Test that the gate is ready once all dependencies are available."""
+    gate = DependencyGate(["astdiskd", "astmetad"])
+    ready = gate.ready
+    assert gate.state is GateState.WAITING
+
+    gate.update("astdiskd", available=True)
+    gate.update("bees", available=True)
+    assert not ready.done()
+
+    gate.update("astmetad", available=True)
+    assert gate.state is GateState.READY
+    await asyncio.wait_for(ready, 0.1)
+
+    # The future is reused once the gate is ready.
+    assert gate.ready is ready
+
+
+@pytest.mark.asyncio
+async def test_dependency_gate_lost() -> None:
+    """Test that the lost event is set when a dependency becomes unavailable."""
+    ev = asyncio.Event()
+    gate = DependencyGate(["astdiskd", "astmetad"], lost_event=ev)
+
+    # Unavailable dependencies do not matter until the gate is ready.
+    gate.update("astdiskd", available=True)
+    gate.update("astdiskd", available=False)
+    assert not ev.is_set()
+
+    gate.update("astdiskd", available=True)
+    gate.update("astmetad", available=True)
+    gate.update("astmetad", available=False)
+    assert gate.state is GateState.LOST
+    assert ev.is_set()
+
+    # The gate stays lost.
+    gate.update("astmetad", available=True)
+    assert gate.state is GateState.LOST
+
+
+@pytest.mark.asyncio
+async def test_dependency_gate_wait_for() -> None:
+    """Test waiting for a single dependency to change availability."""
+    gate = DependencyGate(["astdiskd"])
+
+    up = asyncio.ensure_future(gate.wait_for("astdiskd"))
+    down = asyncio.ensure_future(gate.wait_for("astdiskd", available=False))
+    await asyncio.sleep(0)
+    assert down.done()
+    assert not up.done()
+
+    gate.update("astdiskd", available=True)
+    await asyncio.wait_for(up, 0.1)
+    assert gate.is_available("astdiskd")
+
+    with pytest.raises(KeyError):
+        await gate.wait_for("bees")
@@ -0,0 +1,157 @@
+"""Tests for the subscription dispatch queues."""
+
+import asyncio
+from typing import Awaitable, Callable, List
+
+import pytest
+
+from astoria.common.mqtt.dispatch import Dispatcher, OverflowPolicy
+
+
+def _recorder(
+    received: List[str],
+    gate: asyncio.Event,
+) -> Callable[[str], Callable[[], Awaitable[None]]]:
+    def job(value: str) -> Callable[[], Awaitable[None]]:
+        async def _job() -> None:
+            await gate.wait()
+            received.append(value)
+
+        return _job
+
+    return job
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_ordered() -> None:
+    """Test that messages are handled in order with a concurrency of 1."""
+    received: List[str] = []
+    gate = asyncio.Event()
+    job = _recorder(received, gate)
+    dispatcher = Dispatcher("test")
+
+    for i in range(10):
+        dispatcher.submit("astoria/bees", job(str(i)))
+    gate.set()
+
+    while len(received) < 10:
+        await asyncio.sleep(0)
+    assert received == [str(i) for i in range(10)]
+    assert dispatcher._workers == 0
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_concurrency() -> None:
+    """Test that no more than the concurrency limit of jobs run at once."""
+    running = 0
+    peak = 0
+    done = 0
+
+    async def job() -> None:
+        nonlocal running, peak, done
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        done += 1
+
+    dispatcher = Dispatcher("test", concurrency=3)
+    for _ in range(10):
+        dispatcher.submit("astoria/bees", job)
+
+    while done < 10:
+        await asyncio.sleep(0.01)
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_drop_oldest() -> None:
+    """Test that the oldest messages are dropped when the queue is full."""
+    received: List[str] = []
+    gate = asyncio.Event()
+    job = _recorder(received, gate)
+    dispatcher = Dispatcher("test", max_depth=3)
+
+    # The first job is taken by the worker straight away.
+    dispatcher.submit("astoria/bees", job("0"))
+    await asyncio.sleep(0)
+    for i in range(1, 6):
+        dispatcher.submit("astoria/bees", job(str(i)))
+    assert len(dispatcher) == 3
+    assert dispatcher.dropped == 2
+
+    gate.set()
+    while len(received) < 4:
+        await asyncio.sleep(0)
+    assert received == ["0", "3", "4", "5"]
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_drop_newest() -> None:
+    """Test that new messages are dropped when the queue is full."""
+    received: List[str] = []
+    gate = asyncio.Event()
+    job = _recorder(received, gate)
+    dispatcher = Dispatcher("test", max_depth=3, overflow=OverflowPolicy.DROP_NEWEST)
+
+    dispatcher.submit("astoria/bees", job("0"))
+    await asyncio.sleep(0)
+    for i in range(1, 6):
+        dispatcher.submit("astoria/bees", job(str(i)))
+    assert len(dispatcher) == 3
+    assert dispatcher.dropped == 2
+
+    gate.set()
+    while len(received) < 4:
+        await asyncio.sleep(0)
+    assert received == ["0", "1", "2", "3"]
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_latest_wins() -> None:
+    """Test that only the latest waiting message for each topic is handled."""
+    received: List[str] = []
+    gate = asyncio.Event()
+    job = _recorder(received, gate)
+    dispatcher = Dispatcher("test", overflow=OverflowPolicy.LATEST_WINS)
+
+    dispatcher.submit("astoria/astdiskd", job("disk-0"))
+    await asyncio.sleep(0)
+    dispatcher.submit("astoria/astdiskd", job("disk-1"))
+    dispatcher.submit("astoria/astmetad", job("meta-1"))
+    dispatcher.submit("astoria/astdiskd", job("disk-2"))
+    dispatcher.submit("astoria/astmetad", job("meta-2"))
+    assert len(dispatcher) == 2
+    assert dispatcher.coalesced == 2
+
+    gate.set()
+    while len(received) < 3:
+        await asyncio.sleep(0)
+    assert received == ["disk-0", "disk-2", "meta-2"]
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_handler_error() -> None:
+    """Test that an error in a handler does not stop later messages."""
+    received: List[str] = []
+
+    async def failing_job() -> None:
+        raise RuntimeError("bees")
+
+    async def job() -> None:
+        received.append("ok")
+
+    dispatcher = Dispatcher("test")
+    dispatcher.submit("astoria/bees", failing_job)
+    dispatcher.submit("astoria/bees", job)
+
+    while not received:
+        await asyncio.sleep(0)
+    assert received == ["ok"]
+
+
+@pytest.mark.parametrize("concurrency,max_depth", [(0, 1), (1, 0)])
+def test_dispatcher_invalid(concurrency: int, max_depth: int) -> None:
+    """Test that invalid limits are rejected."""
+    with pytest.raises(ValueError):
+        Dispatcher("test", concurrency=concurrency, max_depth=max_depth)
@@ -0,0 +1,133 @@
+"""Tests for the in-process loopback transport."""
+
+import asyncio
+from typing import List, Match
+
+import gmqtt
+import pytest
+from pydantic import BaseModel
+
+from astoria.common.config.system import MQTTBrokerInfo
+from astoria.common.ipc import ReceivedPayload, decode_message
+from astoria.common.mqtt.loopback import HUB_USER_PROPERTY, LoopbackHub
+from astoria.common.mqtt.wrapper import MQTTWrapper
+
+BROKER_INFO = MQTTBrokerInfo(host="localhost", port=1883)
+
+
+class StubModel(BaseModel):
+    """Test BaseModel."""
+
+    foo: str
+
+
+def _subscriber(wr: MQTTWrapper, topic: str) -> "asyncio.Queue[ReceivedPayload]":
+    received: asyncio.Queue[ReceivedPayload] = asyncio.Queue()
+
+    async def handler(match: Match[str], payload: ReceivedPayload) -> None:
+        await received.put(payload)
+
+    wr.subscribe(topic, handler)
+    return received
+
+
+@pytest.mark.asyncio
+async def test_loopback_delivery() -> None:
+    """Test that messages are delivered between wrappers in the same process."""
+    hub = LoopbackHub()
+    wr_pub = MQTTWrapper("bar", BROKER_INFO, hub=hub)
+    wr_sub = MQTTWrapper("foo", BROKER_INFO, hub=hub)
+    received = _subscriber(wr_sub, "bar/bees")
+    hub.attach(wr_pub)
+    hub.attach(wr_sub)
+
+    wr_pub.publish("bees", StubModel(foo="bar"))
+
+    payload = await asyncio.wait_for(received.get(), 0.1)
+    assert decode_message(StubModel, payload) == StubModel(foo="bar")
+
+    # The message is still sent to the broker, tagged with the hub.
+    message = wr_pub.publish_queue.get_nowait()
+    assert message is not None
+    assert message.properties["user_property"] == hub.user_property
+
+
+@pytest.mark.asyncio
+async def test_loopback_retained_on_attach() -> None:
+    """Test that retained messages are delivered to wrappers that attach later."""
+    hub = LoopbackHub()
+    wr_pub = MQTTWrapper("bar", BROKER_INFO, hub=hub)
+    hub.attach(wr_pub)
+    wr_pub.publish("", StubModel(foo="old"), retain=True)
+    wr_pub.publish("", StubModel(foo="new"), retain=True)
+    wr_pub.publish("bees", StubModel(foo="not retained"))
+
+    wr_sub = MQTTWrapper("foo", BROKER_INFO, hub=hub)
+    received = _subscriber(wr_sub, "bar/#")
+    status = _subscriber(wr_sub, "bar")
+    hub.attach(wr_sub)
+
+    payload = await asyncio.wait_for(status.get(), 0.1)
+    assert decode_message(StubModel, payload) == StubModel(foo="new")
+    assert received.empty()
+
+
+@pytest.mark.asyncio
+async def test_loopback_echo_dropped() -> None:
+    """Test that messages from the broker sent by the same hub are dropped."""
+    hub = LoopbackHub()
+    wr = MQTTWrapper("foo", BROKER_INFO, hub=hub)
+    received = _subscriber(wr, "bar")
+
+    res = await wr.on_message(
+        wr._client,
+        "astoria/bar",
+        StubModel(foo="bar").json().encode(),
+        0,
+        {"user_property": [hub.user_property]},
+    )
+    assert res == gmqtt.constants.PubRecReasonCode.SUCCESS
+
+    # Messages from other hubs are handled as normal.
+    await wr.on_message(
+        wr._client,
+        "astoria/bar",
+        StubModel(foo="baz").json().encode(),
+        0,
+        {"user_property": [(HUB_USER_PROPERTY, "another-hub")]},
+    )
+
+    payload = await asyncio.wait_for(received.get(), 0.1)
+    assert decode_message(StubModel, payload) == StubModel(foo="baz")
+    assert received.empty()
+
+
+def test_loopback_requires_mqtt_v5() -> None:
+    """Test that the hub is not used with MQTT v3.1.1."""
+    broker_info = MQTTBrokerInfo(
+        host="localhost",
+        port=1883,
+        force_protocol_version_3_1=True,
+    )
+    wr = MQTTWrapper("foo", broker_info, hub=LoopbackHub())
+    assert wr._hub is None
+
+
+@pytest.mark.asyncio
+async def test_loopback_not_attached() -> None:
+    """Test that messages are only sent to the broker before attaching."""
+    hub = LoopbackHub()
+    wr = MQTTWrapper("foo", BROKER_INFO, hub=hub)
+    received: List[ReceivedPayload] = []
+
+    async def handler(match: Match[str], payload: ReceivedPayload) -> None:
+        received.append(payload)
+
+    wr.subscribe("foo", handler)
+    wr.publish("", StubModel(foo="bar"))
+    await asyncio.sleep(0)
+
+    assert received == []
+    message = wr.publish_queue.get_nowait()
+    assert message is not None
+    assert "user_property" not in message.properties
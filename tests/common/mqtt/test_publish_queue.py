@@ -0,0 +1,199 @@
+"""Tests for the outbound publish queue."""
+
+import asyncio
+from typing import List
+
+import pytest
+
+from astoria.common.mqtt.publish_queue import (
+    OutboundMessage,
+    PublishPriority,
+    PublishQueue,
+)
+
+
+def _message(
+    topic: str,
+    payload: bytes = b"",
+    *,
+    retain: bool = False,
+    priority: PublishPriority = PublishPriority.NORMAL,
+) -> OutboundMessage:
+    return OutboundMessage(topic, payload, retain=retain, priority=priority)
+
+
+def _drain(queue: PublishQueue) -> List[OutboundMessage]:
+    messages = []
+    message = queue.get_nowait()
+    while message is not None:
+        messages.append(message)
+        message = queue.get_nowait()
+    return messages
+
+
+def test_publish_queue_invalid_high_water_mark() -> None:
+    """Test that the high water mark must be within the queue size."""
+    with pytest.raises(ValueError):
+        PublishQueue(max_size=10, high_water_mark=11)
+
+    with pytest.raises(ValueError):
+        PublishQueue(max_size=10, high_water_mark=0)
+
+
+def test_publish_queue_fifo() -> None:
+    """Test that messages of the same priority are removed in order."""
+    queue = PublishQueue(max_size=10, high_water_mark=10)
+    for i in range(5):
+        assert queue.put_nowait(_message(f"foo/{i}"))
+
+    assert len(queue) == 5
+    assert [m.topic for m in _drain(queue)] == [f"foo/{i}" for i in range(5)]
+    assert len(queue) == 0
+
+
+def test_publish_queue_priority_order() -> None:
+    """Test that normal priority messages are sent before low priority."""
+    queue = PublishQueue(max_size=10, high_water_mark=10)
+    queue.put_nowait(_message("log/1", priority=PublishPriority.LOW))
+    queue.put_nowait(_message("status"))
+    queue.put_nowait(_message("log/2", priority=PublishPriority.LOW))
+
+    assert [m.topic for m in _drain(queue)] == ["status", "log/1", "log/2"]
+
+
+def test_publish_queue_coalesces_retained() -> None:
+    """Test that pending retained messages are replaced by later ones."""
+    queue = PublishQueue(max_size=10, high_water_mark=10)
+    queue.put_nowait(_message("astprocd", b"1", retain=True))
+    queue.put_nowait(_message("other", b"a"))
+    queue.put_nowait(_message("astprocd", b"2", retain=True))
+    queue.put_nowait(_message("astprocd", b"3", retain=True))
+
+    assert len(queue) == 2
+    assert queue.coalesced == 2
+    assert [(m.topic, m.payload) for m in _drain(queue)] == [
+        ("astprocd", b"3"),
+        ("other", b"a"),
+    ]
+
+    # Once sent, a new retained message is queued again.
+    queue.put_nowait(_message("astprocd", b"4", retain=True))
+    assert len(queue) == 1
+
+
+def test_publish_queue_coalesce_raises_priority() -> None:
+    """Test that a coalesced retained message keeps the higher priority."""
+    queue = PublishQueue(max_size=10, high_water_mark=10)
+    queue.put_nowait(_message("metrics", b"1", retain=True, priority=PublishPriority.LOW))
+    queue.put_nowait(_message("log", priority=PublishPriority.LOW))
+    queue.put_nowait(_message("status"))
+    queue.put_nowait(_message("metrics", b"2", retain=True))
+    queue.put_nowait(_message("metrics", b"3", retain=True, priority=PublishPriority.LOW))
+
+    assert len(queue) == 3
+    assert [(m.topic, m.payload, m.priority) for m in _drain(queue)] == [
+        ("status", b"", PublishPriority.NORMAL),
+        ("metrics", b"3", PublishPriority.NORMAL),
+        ("log", b"", PublishPriority.LOW),
+    ]
+
+
+def test_publish_queue_does_not_coalesce_non_retained() -> None:
+    """Test that non-retained messages on the same topic are all sent."""
+    queue = PublishQueue(max_size=10, high_water_mark=10)
+    queue.put_nowait(_message("request/foo", b"1"))
+    queue.put_nowait(_message("request/foo", b"2"))
+    assert len(queue) == 2
+    assert queue.coalesced == 0
+
+
+def test_publish_queue_drops_low_priority_at_high_water_mark() -> None:
+    """Test that low priority messages are dropped above the high water mark."""
+    queue = PublishQueue(max_size=5, high_water_mark=2)
+    assert queue.put_nowait(_message("log/1", priority=PublishPriority.LOW))
+    assert queue.put_nowait(_message("log/2", priority=PublishPriority.LOW))
+    assert not queue.put_nowait(_message("log/3", priority=PublishPriority.LOW))
+    assert queue.put_nowait(_message("status"))
+
+    assert queue.dropped[PublishPriority.LOW] == 1
+    assert queue.dropped[PublishPriority.NORMAL] == 0
+    assert queue.total_dropped == 1
+    assert len(queue) == 3
+
+
+def test_publish_queue_max_size() -> None:
+    """Test that the queue makes room by dropping low priority messages."""
+    queue = PublishQueue(max_size=3, high_water_mark=2)
+    queue.put_nowait(_message("log/1", priority=PublishPriority.LOW))
+    queue.put_nowait(_message("a"))
+    queue.put_nowait(_message("b"))
+
+    # The oldest low priority message is dropped to make room.
+    assert queue.put_nowait(_message("c"))
+    assert queue.dropped[PublishPriority.LOW] == 1
+
+    # With no low priority messages left, the new message is dropped.
+    assert not queue.put_nowait(_message("d"))
+    assert queue.dropped[PublishPriority.NORMAL] == 1
+
+    assert [m.topic for m in _drain(queue)] == ["a", "b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_publish_queue_put_waits_for_high_water_mark() -> None:
+    """Test that async producers wait whilst the queue is above the mark."""
+    queue = PublishQueue(max_size=5, high_water_mark=2)
+    queue.put_nowait(_message("a"))
+    queue.put_nowait(_message("b"))
+
+    put_task = asyncio.ensure_future(queue.put(_message("c")))
+    await asyncio.sleep(0.01)
+    assert not put_task.done()
+
+    assert (await queue.get()).topic == "a"
+    assert await asyncio.wait_for(put_task, 0.1)
+    assert [m.topic for m in _drain(queue)] == ["b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_publish_queue_get_waits_for_message() -> None:
+    """Test that get waits until a message is available."""
+    queue = PublishQueue(max_size=5, high_water_mark=5)
+    get_task = asyncio.ensure_future(queue.get())
+    await asyncio.sleep(0.01)
+    assert not get_task.done()
+
+    queue.put_nowait(_message("a"))
+    message = await asyncio.wait_for(get_task, 0.1)
+    assert message.topic == "a"
+
+
+def test_publish_queue_requeue() -> None:
+    """Test that an unsent message is returned to the front of the queue."""
+    queue = PublishQueue(max_size=10, high_water_mark=5)
+    first = OutboundMessage("astoria/foo", b"1")
+    second = OutboundMessage("astoria/bar", b"2")
+    queue.put_nowait(first)
+    queue.put_nowait(second)
+
+    message = queue.get_nowait()
+    assert message is first
+    assert queue.requeue(message)
+    assert queue.get_nowait() is first
+    assert queue.get_nowait() is second
+
+
+def test_publish_queue_requeue_stale_retained() -> None:
+    """Test that a requeued retained message does not replace a newer one."""
+    queue = PublishQueue(max_size=10, high_water_mark=5)
+    queue.put_nowait(OutboundMessage("astoria/foo", b"old", retain=True))
+
+    old = queue.get_nowait()
+    assert old is not None
+    queue.put_nowait(OutboundMessage("astoria/foo", b"new", retain=True))
+
+    assert not queue.requeue(old)
+    assert len(queue) == 1
+    message = queue.get_nowait()
+    assert message is not None
+    assert message.payload == b"new"
@@ -0,0 +1,122 @@
+"""Tests for the manager request multiplexer."""
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from astoria.common.ipc import RequestResponse
+from astoria.common.mqtt.request_multiplexer import RequestMultiplexer
+
+
+@pytest.mark.asyncio
+async def test_request_multiplexer_resolve() -> None:
+    """Test that responses resolve the matching request."""
+    mux = RequestMultiplexer()
+    uuids = [uuid4() for _ in range(3)]
+    futures = [mux.register(uuid) for uuid in uuids]
+    assert len(mux) == 3
+
+    response = RequestResponse(uuid=uuids[1], success=True)
+    assert mux.resolve(response)
+    assert await mux.wait(uuids[1], futures[1], 0.1) == response
+
+    assert not futures[0].done()
+    assert not futures[2].done()
+    assert uuids[1] not in mux
+    assert len(mux) == 2
+
+
+@pytest.mark.asyncio
+async def test_request_multiplexer_unknown_response() -> None:
+    """Test that unexpected responses are ignored."""
+    mux = RequestMultiplexer()
+    assert not mux.resolve(RequestResponse(uuid=uuid4(), success=True))
+
+
+@pytest.mark.asyncio
+async def test_request_multiplexer_duplicate() -> None:
+    """Test that a UUID cannot be pending twice."""
+    mux = RequestMultiplexer()
+    uuid = uuid4()
+    mux.register(uuid)
+    with pytest.raises(ValueError):
+        mux.register(uuid)
+
+
+@pytest.mark.asyncio
+async def test_request_multiplexer_timeout_cleanup() -> None:
+    """Test that requests are removed when they time out."""
+    mux = RequestMultiplexer()
+    uuid = uuid4()
+    future = mux.register(uuid)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await mux.wait(uuid, future, 0.01)
+
+    assert len(mux) == 0
+    assert not mux.resolve(RequestResponse(uuid=uuid, success=True))
+
+
+@pytest.mark.asyncio
+async def test_request_multiplexer_cancel_cleanup() -> None:
+    """Test that requests are removed when the waiter is cancelled."""
+    mux = RequestMultiplexer()
+    uuid = uuid4()
+    future = mux.register(uuid)
+
+    task = asyncio.ensure_future(mux.wait(uuid, future, 1))
+    await asyncio.sleep(0)
+    task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert len(mux) == 0
+
+
+@pytest.mark.asyncio
+async def test_request_multiplexer_fail_all() -> None:
+    """Test that all pending requests can be failed at once."""
+    mux = RequestMultiplexer()
+    uuid = uuid4()
+    future = mux.register(uuid)
+
+    mux.fail_all(RuntimeError("bees"))
+
+    with pytest.raises(RuntimeError):
+        await mux.wait(uuid, future, 0.1)
+    assert len(mux) == 0
+
+
+@pytest.mark.asyncio
+async def test_request_multiplexer_retries() -> None:
+    """Test that requests are resent with an increasing timeout."""
+    mux = RequestMultiplexer()
+    uuid = uuid4()
+    future = mux.register(uuid)
+    resends = 0
+
+    def resend() -> None:
+        nonlocal resends
+        resends += 1
+
+    with pytest.raises(asyncio.TimeoutError):
+        await mux.wait(uuid, future, 0.01, retries=2, resend=resend)
+
+    assert resends == 2
+    assert len(mux) == 0
+
+
+@pytest.mark.asyncio
+async def test_request_multiplexer_late_response() -> None:
+    """Test that a response to an earlier attempt resolves a retried request."""
+    mux = RequestMultiplexer()
+    uuid = uuid4()
+    future = mux.register(uuid)
+    response = RequestResponse(uuid=uuid, success=True)
+
+    task = asyncio.ensure_future(mux.wait(uuid, future, 0.01, retries=3))
+    await asyncio.sleep(0.015)
+    mux.resolve(response)
+
+    assert await task == response
@@ -112,3 +112,26 @@ def test_topic_match() -> None:
         t = Topic(parts)
         assert t.match(example)
         assert not t.match("u85932q4fds9/3£2####")
+
+
+def test_topic_immutable() -> None:
+    """Test that a topic cannot be modified after construction."""
+    t = Topic(["bees"])
+    with pytest.raises(AttributeError):
+        t.parts = ("wasps",)  # type: ignore[misc]
+
+    with pytest.raises(AttributeError):
+        t.colour = "yellow"
+
+
+def test_topic_parse_interned() -> None:
+    """Test that parsing the same string returns the same instance."""
+    t = Topic.parse("foo/bar/biz")
+    assert Topic.parse("foo/bar/biz") is t
+    assert Topic.parse("foo/bar") is not t
+
+
+def test_topic_regex_cached() -> None:
+    """Test that the regex is only compiled once."""
+    t = Topic(["superfoo", "+", "uberbar"])
+    assert t.regex is t.regex
@@ -0,0 +1,67 @@
+"""Tests for MQTT topic policies."""
+
+import pytest
+from pydantic import ValidationError
+
+from astoria.common.config.system import TopicPolicy
+from astoria.common.mqtt.topic_policy import TopicPolicyTable
+
+
+def test_topic_policy_defaults() -> None:
+    """Test that the log broadcasts default to QoS 0."""
+    table = TopicPolicyTable.with_defaults("astoria", [])
+
+    for topic in ["broadcast/usercode_log", "broadcast/usercode_log_batch"]:
+        policy = table.lookup(f"astoria/{topic}")
+        assert policy is not None
+        assert policy.qos == 0
+
+    assert table.lookup("astoria/astprocd") is None
+    assert table.lookup("astoria/astprocd/request/restart/1234") is None
+
+
+def test_topic_policy_config_overrides_defaults() -> None:
+    """Test that configured policies take precedence over the defaults."""
+    table = TopicPolicyTable.with_defaults(
+        "astoria",
+        [TopicPolicy(topic="broadcast/+", qos=2, message_expiry=10)],
+    )
+
+    policy = table.lookup("astoria/broadcast/usercode_log")
+    assert policy is not None
+    assert policy.qos == 2
+    assert policy.message_expiry == 10
+
+
+def test_topic_policy_first_match_wins() -> None:
+    """Test that the first listed policy wins when several match."""
+    table = TopicPolicyTable(
+        "astoria",
+        [
+            TopicPolicy(topic="astprocd/#", qos=2),
+            TopicPolicy(topic="+/request/#", qos=0, retain=False),
+            TopicPolicy(topic="astprocd/#", qos=0),
+        ],
+    )
+
+    policy = table.lookup("astoria/astprocd/request/restart")
+    assert policy is not None
+    assert policy.qos == 2
+
+    policy = table.lookup("astoria/astmetad/request/mutate")
+    assert policy is not None
+    assert policy.qos == 0
+    assert policy.retain is False
+
+
+@pytest.mark.parametrize("qos", [-1, 3])
+def test_topic_policy_invalid_qos(qos: int) -> None:
+    """Test that invalid QoS levels are rejected."""
+    with pytest.raises(ValidationError):
+        TopicPolicy(topic="bees", qos=qos)
+
+
+def test_topic_policy_invalid_expiry() -> None:
+    """Test that the message expiry must be positive."""
+    with pytest.raises(ValidationError):
+        TopicPolicy(topic="bees", message_expiry=0)
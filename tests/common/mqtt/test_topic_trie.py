@@ -0,0 +1,96 @@
+"""Tests for the MQTT topic trie."""
+
+from typing import Set
+
+import pytest
+
+from astoria.common.mqtt import Topic
+from astoria.common.mqtt.topic_trie import TopicTrie
+
+SUBSCRIPTIONS = [
+    "astoria/+",
+    "astoria/astprocd",
+    "astoria/astprocd/request/+/+",
+    "astoria/broadcast/#",
+    "astoria/#",
+]
+
+MATCH_CASES = [
+    ("astoria/astprocd", {"astoria/+", "astoria/astprocd", "astoria/#"}),
+    ("astoria/astdiskd", {"astoria/+", "astoria/#"}),
+    (
+        "astoria/astprocd/request/restart/1234",
+        {"astoria/astprocd/request/+/+", "astoria/#"},
+    ),
+    (
+        "astoria/broadcast/usercode_log",
+        {"astoria/broadcast/#", "astoria/#"},
+    ),
+    ("astoria/astprocd/request/restart", {"astoria/#"}),
+    ("astoria", set()),
+    ("bees/astprocd", set()),
+]
+
+
+def _build_trie() -> TopicTrie[str]:
+    trie: TopicTrie[str] = TopicTrie()
+    for sub in SUBSCRIPTIONS:
+        trie.insert(Topic.parse(sub), sub)
+    return trie
+
+
+def test_topic_trie_len() -> None:
+    """Test that the trie counts its entries."""
+    trie = _build_trie()
+    assert len(trie) == len(SUBSCRIPTIONS)
+
+    trie.insert(Topic.parse("astoria/+"), "replaced")
+    assert len(trie) == len(SUBSCRIPTIONS)
+
+
+@pytest.mark.parametrize("topic,expected", MATCH_CASES)
+def test_topic_trie_match(topic: str, expected: Set[str]) -> None:
+    """Test that the trie finds every matching subscription."""
+    trie = _build_trie()
+    matches = trie.match(topic)
+    assert {value for _, value in matches} == expected
+    assert len(matches) == len(expected)
+
+
+@pytest.mark.parametrize("topic,expected", MATCH_CASES)
+def test_topic_trie_agrees_with_regex(topic: str, expected: Set[str]) -> None:
+    """Test that the trie gives the same result as matching each topic regex."""
+    trie = _build_trie()
+    by_regex = {sub for sub in SUBSCRIPTIONS if Topic.parse(sub).match(topic)}
+    assert {value for _, value in trie.match(topic)} == by_regex
+
+
+def test_topic_trie_empty_level() -> None:
+    """Test that a single level wildcard does not match an empty level."""
+    trie: TopicTrie[str] = TopicTrie()
+    trie.insert(Topic.parse("foo/+/bar"), "sub")
+    assert trie.match("foo//bar") == []
+    assert len(trie.match("foo/x/bar")) == 1
+
+
+def test_topic_trie_remove() -> None:
+    """Test that entries can be removed from the trie."""
+    trie = _build_trie()
+    trie.remove(Topic.parse("astoria/#"))
+
+    assert len(trie) == len(SUBSCRIPTIONS) - 1
+    assert Topic.parse("astoria/#") not in trie
+    assert Topic.parse("astoria/+") in trie
+    assert {value for _, value in trie.match("astoria/astdiskd")} == {"astoria/+"}
+
+    with pytest.raises(KeyError):
+        trie.remove(Topic.parse("astoria/#"))
+
+    with pytest.raises(KeyError):
+        trie.remove(Topic.parse("bees/hive"))
+
+
+def test_topic_trie_iter() -> None:
+    """Test that we can iterate over the entries of the trie."""
+    trie = _build_trie()
+    assert {str(topic) for topic, _ in trie} == set(SUBSCRIPTIONS)
@@ -0,0 +1,197 @@
+"""Test connecting to the broker over a Unix domain socket."""
+
+import asyncio
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, List, Match, Tuple
+
+import pytest
+from pydantic import BaseModel, ValidationError
+
+from astoria.common.config.system import MQTTBrokerInfo
+from astoria.common.ipc import ReceivedPayload, decode_message
+from astoria.common.mqtt.topic import Topic
+from astoria.common.mqtt.wrapper import MQTTWrapper
+
+CONNECT = 0x1
+CONNACK = 0x2
+PUBLISH = 0x3
+PUBACK = 0x4
+SUBSCRIBE = 0x8
+SUBACK = 0x9
+PINGREQ = 0xC
+PINGRESP = 0xD
+DISCONNECT = 0xE
+
+
+class StubModel(BaseModel):
+    """Test BaseModel."""
+
+    foo: str
+
+
+def _encode_length(length: int) -> bytes:
+    encoded = bytearray()
+    while True:
+        byte, length = length % 128, length // 128
+        encoded.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(encoded)
+
+
+def _decode_length(data: bytes, offset: int) -> Tuple[int, int]:
+    length, multiplier = 0, 1
+    while True:
+        byte = data[offset]
+        offset += 1
+        length += (byte & 0x7F) * multiplier
+        multiplier *= 128
+        if not byte & 0x80:
+            return length, offset
+
+
+def _packet(packet_type: int, body: bytes, flags: int = 0) -> bytes:
+    return bytes([packet_type << 4 | flags]) + _encode_length(len(body)) + body
+
+
+class FakeBroker:
+    """
+    A minimal MQTT v5 broker, for a single client.
+
+    Supports enough of the protocol for the wrapper to connect, subscribe and
+    receive its own messages. Messages are always delivered with the QoS that
+    they were published with.
+    """
+
+    def __init__(self) -> None:
+        self.subscriptions: List[Topic] = []
+        self.connected = asyncio.Event()
+
+    async def handle(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        """Handle a client connection."""
+        try:
+            while True:
+                header = await reader.readexactly(1)
+                length, multiplier = 0, 1
+                while True:
+                    byte = (await reader.readexactly(1))[0]
+                    length += (byte & 0x7F) * multiplier
+                    multiplier *= 128
+                    if not byte & 0x80:
+                        break
+                body = await reader.readexactly(length)
+                if not self._handle_packet(header[0], body, writer):
+                    break
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            pass
+        writer.close()
+
+    def _handle_packet(
+        self,
+        first_byte: int,
+        body: bytes,
+        writer: asyncio.StreamWriter,
+    ) -> bool:
+        packet_type = first_byte >> 4
+        if packet_type == CONNECT:
+            writer.write(_packet(CONNACK, b"\x00\x00\x00"))
+            self.connected.set()
+        elif packet_type == SUBSCRIBE:
+            packet_id = body[:2]
+            properties_length, offset = _decode_length(body, 2)
+            offset += properties_length
+            reason_codes = bytearray()
+            while offset < len(body):
+                topic_length = int.from_bytes(body[offset : offset + 2], "big")
+                topic = body[offset + 2 : offset + 2 + topic_length].decode()
+                qos = body[offset + 2 + topic_length] & 0x03
+                self.subscriptions.append(Topic.parse(topic))
+                reason_codes.append(qos)
+                offset += 3 + topic_length
+            writer.write(_packet(SUBACK, packet_id + b"\x00" + reason_codes))
+        elif packet_type == PUBLISH:
+            qos = (first_byte >> 1) & 0x03
+            topic_length = int.from_bytes(body[:2], "big")
+            topic = body[2 : 2 + topic_length].decode()
+            if qos:
+                packet_id = body[2 + topic_length : 4 + topic_length]
+                writer.write(_packet(PUBACK, packet_id))
+            if any(sub.match(topic) for sub in self.subscriptions):
+                writer.write(_packet(PUBLISH, body, first_byte & 0x0F))
+        elif packet_type == PINGREQ:
+            writer.write(_packet(PINGRESP, b""))
+        elif packet_type == DISCONNECT:
+            return False
+        return True
+
+
+@asynccontextmanager
+async def fake_broker(path: Path) -> AsyncIterator[FakeBroker]:
+    """Run a fake broker listening on a Unix socket."""
+    fake = FakeBroker()
+    server = await asyncio.start_unix_server(fake.handle, path=str(path))
+    try:
+        yield fake
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+def test_socket_path_tls_invalid() -> None:
+    """Test that TLS cannot be enabled over a Unix socket."""
+    with pytest.raises(ValidationError):
+        MQTTBrokerInfo(
+            host="localhost",
+            port=1883,
+            socket_path=Path("/run/mosquitto.sock"),
+            enable_tls=True,
+        )
+
+
+@pytest.mark.asyncio
+async def test_connect_unix_socket(tmp_path: Path) -> None:
+    """Test that the wrapper connects over the socket instead of TCP."""
+    path = tmp_path / "mqtt.sock"
+    # Nothing is listening on the TCP port, so this can only use the socket.
+    broker_info = MQTTBrokerInfo(host="localhost", port=1, socket_path=path)
+    wr = MQTTWrapper("foo", broker_info)
+    loop = asyncio.get_event_loop()
+    create_connection = loop.create_connection
+
+    async with fake_broker(path) as broker:
+        await wr.connect()
+        assert wr.is_connected
+        assert broker.connected.is_set()
+        # TCP connections made by anything else on the loop are unaffected.
+        assert loop.create_connection == create_connection
+
+        await wr.disconnect()
+        assert not wr.is_connected
+
+
+@pytest.mark.asyncio
+async def test_publish_and_receive_unix_socket(tmp_path: Path) -> None:
+    """Test that messages are sent and received over the socket."""
+    path = tmp_path / "mqtt.sock"
+    broker_info = MQTTBrokerInfo(host="localhost", port=1, socket_path=path)
+    received: asyncio.Queue[ReceivedPayload] = asyncio.Queue()
+
+    async def test_handler(match: Match[str], payload: ReceivedPayload) -> None:
+        await received.put(payload)
+
+    wr = MQTTWrapper("foo", broker_info)
+    wr.subscribe("foo/bees/+", test_handler)
+
+    async with fake_broker(path):
+        await wr.connect()
+
+        wr.publish("bees/bar", StubModel(foo="hive"))
+        payload = await asyncio.wait_for(received.get(), 1)
+        assert decode_message(StubModel, payload) == StubModel(foo="hive")
+
+        await wr.disconnect()
@@ -1,16 +1,29 @@
 """Test the MQTT Wrapper class."""
 
 import asyncio
-from typing import Match
+from typing import List, Match, Optional
+from uuid import uuid4
 
 import gmqtt
 import pytest
 from pydantic import BaseModel
 
-from astoria.common.config.system import MQTTBrokerInfo
-from astoria.common.ipc import ManagerMessage
+from astoria.common.config.system import MQTTBrokerInfo, TopicPolicy
+from astoria.common.ipc import (
+    DecodedPayload,
+    LogEventSource,
+    ManagerMessage,
+    ManagerRequest,
+    ReceivedPayload,
+    RequestResponse,
+    UsercodeLogReplayLine,
+    UsercodeLogReplayResponse,
+    decode_message,
+)
+from astoria.common.mqtt import PublishPriority
+from astoria.common.mqtt.codec import MessagePackCodec
 from astoria.common.mqtt.topic import Topic
-from astoria.common.mqtt.wrapper import MQTTWrapper
+from astoria.common.mqtt.wrapper import MQTTWrapper, ReplyTo
 
 BROKER_INFO = MQTTBrokerInfo(
     host="localhost",
@@ -26,7 +39,7 @@ class StubModel(BaseModel):
 
 async def stub_message_handler(
     match: Match[str],
-    payload: str,
+    payload: ReceivedPayload,
 ) -> None:
     """Used in tests as a stub with the right type."""
     pass
@@ -39,11 +52,12 @@ def test_wrapper_init_minimal() -> None:
     assert wr._client_name == "foo"
     assert wr._last_will is None
     assert len(wr._dependencies) == 0
-    assert len(wr._dependency_events) == 0
+    assert len(wr._dependency_gate.dependencies) == 0
     assert wr._no_dependency_event is None
 
-    assert len(wr._topic_handlers) == 1
-    assert wr._topic_handlers[Topic(["astoria", "+"])] == wr._dependency_message_handler
+    assert len(wr._subscriptions) == 1
+    handlers = dict(wr._subscriptions)
+    assert handlers[Topic(["astoria", "+"])][0] == wr._dependency_message_handler
 
     assert wr._client._client_id == "foo"
 
@@ -53,11 +67,11 @@ def test_wrapper_init_dependencies() -> None:
     deps = ["foo", "bar", "bees"]
     wr = MQTTWrapper("foo", BROKER_INFO, dependencies=deps)
 
-    assert len(deps) == len(wr._dependency_events)
+    assert len(deps) == len(wr._dependency_gate.dependencies)
     assert len(deps) == len(wr._dependencies)
 
     for d in deps:
-        assert d in wr._dependency_events
+        assert d in wr._dependency_gate.dependencies
         assert d in wr._dependencies
 
 
@@ -111,13 +125,15 @@ def test_subscribe() -> None:
     """Test that subscribing works as expected."""
     wr = MQTTWrapper("foo", BROKER_INFO)
 
-    assert len(wr._topic_handlers) == 1
-    assert wr._topic_handlers[Topic(["astoria", "+"])] == wr._dependency_message_handler
+    assert len(wr._subscriptions) == 1
+    handlers = dict(wr._subscriptions)
+    assert handlers[Topic(["astoria", "+"])][0] == wr._dependency_message_handler
 
     wr.subscribe("bees/+", stub_message_handler)
-    assert len(wr._topic_handlers) == 2
-    assert wr._topic_handlers[Topic(["astoria", "+"])] == wr._dependency_message_handler
-    assert wr._topic_handlers[Topic(["astoria", "bees", "+"])] == stub_message_handler
+    assert len(wr._subscriptions) == 2
+    handlers = dict(wr._subscriptions)
+    assert handlers[Topic(["astoria", "+"])][0] == wr._dependency_message_handler
+    assert handlers[Topic(["astoria", "bees", "+"])][0] == stub_message_handler
 
 
 @pytest.mark.filterwarnings("ignore")
@@ -139,7 +155,7 @@ async def test_handler_called() -> None:
 
     async def test_handler(
         match: Match[str],
-        payload: str,
+        payload: ReceivedPayload,
     ) -> None:
         assert payload == "hive"
         ev.set()
@@ -170,7 +186,7 @@ async def test_publish_send_and_receive() -> None:
 
     async def test_handler(
         match: Match[str],
-        payload: str,
+        payload: ReceivedPayload,
     ) -> None:
         ev.set()
 
@@ -195,7 +211,7 @@ async def test_publish_send_and_receive_on_self() -> None:
 
     async def test_handler(
         match: Match[str],
-        payload: str,
+        payload: ReceivedPayload,
     ) -> None:
         ev.set()
 
@@ -229,3 +245,433 @@ async def test_publish_bad_topic_error() -> None:
         wr_pub.publish("bees/", StubModel(foo="bar"))
 
     await wr_pub.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_handler_called_with_msgpack_payload() -> None:
+    """Test that msgpack payloads are given to handlers as decoded data."""
+    ev = asyncio.Event()
+
+    async def test_handler(
+        match: Match[str],
+        payload: ReceivedPayload,
+    ) -> None:
+        assert isinstance(payload, DecodedPayload)
+        assert payload.data == {"foo": "bar"}
+        assert decode_message(StubModel, payload) == StubModel(foo="bar")
+        ev.set()
+
+    wr = MQTTWrapper("foo", BROKER_INFO)
+    wr.subscribe("bees/+", test_handler)
+
+    res = await wr.on_message(
+        wr._client,
+        "astoria/bees/bar",
+        MessagePackCodec().encode(StubModel(foo="bar")),
+        0,
+        {"content_type": [MessagePackCodec.content_type]},
+    )
+    assert res == gmqtt.constants.PubRecReasonCode.SUCCESS
+
+    await asyncio.wait_for(ev.wait(), 0.1)
+
+
+@pytest.mark.asyncio
+async def test_unknown_content_type_rejected() -> None:
+    """Test that payloads with an unknown content type are not handled."""
+
+    async def test_handler(
+        match: Match[str],
+        payload: ReceivedPayload,
+    ) -> None:
+        raise AssertionError("Handler should not be called")
+
+    wr = MQTTWrapper("foo", BROKER_INFO)
+    wr.subscribe("bees/+", test_handler)
+
+    res = await wr.on_message(
+        wr._client,
+        "astoria/bees/bar",
+        b"bees",
+        0,
+        {"content_type": ["text/bees"]},
+    )
+    assert res == gmqtt.constants.PubRecReasonCode.PAYLOAD_FORMAT_INVALID
+
+
+def test_publish_queued_until_connected() -> None:
+    """Test that messages are queued whilst the wrapper is not connected."""
+    wr = MQTTWrapper("foo", BROKER_INFO)
+    wr.publish("bees", StubModel(foo="bar"), retain=True)
+    wr.publish("bees", StubModel(foo="baz"), retain=True)
+    wr.publish("log", StubModel(foo="bar"), priority=PublishPriority.LOW)
+
+    assert len(wr.publish_queue) == 2
+    assert wr.publish_queue.coalesced == 1
+
+    message = wr.publish_queue.get_nowait()
+    assert message is not None
+    assert message.topic == "astoria/foo/bees"
+    assert message.payload == StubModel(foo="baz").json().encode()
+
+
+def test_publish_applies_topic_policy() -> None:
+    """Test that topic policies set the QoS, retain flag and expiry."""
+    broker_info = MQTTBrokerInfo(
+        host="localhost",
+        port=1883,
+        topic_policies=[
+            TopicPolicy(topic="foo/bees", qos=2, retain=True, message_expiry=30),
+        ],
+    )
+    wr = MQTTWrapper("foo", broker_info)
+    wr.publish("bees", StubModel(foo="bar"))
+    wr.publish("wasps", StubModel(foo="bar"))
+    wr.publish(
+        "broadcast/usercode_log",
+        StubModel(foo="bar"),
+        auto_prefix_client_name=False,
+    )
+
+    bees = wr.publish_queue.get_nowait()
+    assert bees is not None
+    assert (bees.qos, bees.retain) == (2, True)
+    assert bees.properties["message_expiry_interval"] == 30
+
+    wasps = wr.publish_queue.get_nowait()
+    assert wasps is not None
+    assert (wasps.qos, wasps.retain) == (1, False)
+    assert "message_expiry_interval" not in wasps.properties
+
+    log = wr.publish_queue.get_nowait()
+    assert log is not None
+    assert log.qos == 0
+
+
+def test_request_response_subscriptions() -> None:
+    """Test that clients subscribe to their private reply topic with MQTT v5."""
+    wr = MQTTWrapper("foo", BROKER_INFO, dependencies=["astprocd", "astdiskd"])
+
+    assert wr.response_topic == "astoria/foo/response"
+    assert Topic.parse("astoria/foo/response") in wr._subscriptions
+    assert Topic.parse("astoria/astprocd/request/+/+") not in wr._subscriptions
+
+
+def test_request_response_subscriptions_legacy() -> None:
+    """Test that clients subscribe to all request responses with MQTT v3.1.1."""
+    broker_info = MQTTBrokerInfo(
+        host="localhost",
+        port=1883,
+        force_protocol_version_3_1=True,
+    )
+    wr = MQTTWrapper("foo", broker_info, dependencies=["astprocd", "astdiskd"])
+
+    assert wr.response_topic is None
+    assert Topic.parse("astoria/foo/response") not in wr._subscriptions
+    assert Topic.parse("astoria/astprocd/request/+/+") in wr._subscriptions
+    assert Topic.parse("astoria/astdiskd/request/+/+") in wr._subscriptions
+
+
+@pytest.mark.asyncio
+async def test_manager_request_private_reply() -> None:
+    """Test that a manager request is answered on the private reply topic."""
+    wr = MQTTWrapper("foo", BROKER_INFO, dependencies=["astprocd"])
+    request = ManagerRequest(sender_name="foo")
+
+    task = asyncio.ensure_future(
+        wr.manager_request("astprocd", "restart", request, response_timeout=0.5),
+    )
+    await asyncio.sleep(0)
+
+    message = wr.publish_queue.get_nowait()
+    assert message is not None
+    assert message.topic == "astoria/astprocd/request/restart"
+    assert message.properties["response_topic"] == "astoria/foo/response"
+    assert message.properties["correlation_data"] == request.uuid.bytes
+
+    response = RequestResponse(uuid=request.uuid, success=True)
+    await wr.on_message(
+        wr._client,
+        "astoria/foo/response",
+        response.json().encode(),
+        1,
+        {"correlation_data": [request.uuid.bytes]},
+    )
+
+    assert await task == response
+
+
+@pytest.mark.asyncio
+async def test_manager_request_response_schema() -> None:
+    """Test that the response is converted to the schema for the request."""
+    wr = MQTTWrapper("foo", BROKER_INFO, dependencies=["astprocd"])
+    request = ManagerRequest(sender_name="foo")
+
+    task = asyncio.ensure_future(
+        wr.manager_request(
+            "astprocd",
+            "log_replay",
+            request,
+            response_timeout=0.5,
+            response_schema=UsercodeLogReplayResponse,
+        ),
+    )
+    await asyncio.sleep(0)
+
+    line = UsercodeLogReplayLine(
+        sequence=0,
+        source=LogEventSource.STDOUT,
+        timestamp=0,
+        content="bees\n",
+        pid=42,
+        cursor=7,
+    )
+    response = UsercodeLogReplayResponse(
+        uuid=request.uuid,
+        success=True,
+        lines=[line],
+        next_cursor=8,
+    )
+    await wr.on_message(
+        wr._client,
+        "astoria/foo/response",
+        response.json().encode(),
+        1,
+        {},
+    )
+
+    result = await task
+    assert isinstance(result, UsercodeLogReplayResponse)
+    assert result == response
+
+
+@pytest.mark.asyncio
+async def test_subscribe_request_reply_to() -> None:
+    """Test that request handlers are given the reply destination."""
+    wr = MQTTWrapper("astprocd", BROKER_INFO)
+    received: asyncio.Queue[Optional[ReplyTo]] = asyncio.Queue()
+
+    async def test_handler(
+        match: Match[str],
+        payload: ReceivedPayload,
+        reply_to: Optional[ReplyTo],
+    ) -> None:
+        await received.put(reply_to)
+
+    wr.subscribe_request("astprocd/request/restart", test_handler)
+
+    await wr.on_message(
+        wr._client,
+        "astoria/astprocd/request/restart",
+        b"{}",
+        1,
+        {"response_topic": ["astoria/foo/response"], "correlation_data": [b"bees"]},
+    )
+    reply_to = await asyncio.wait_for(received.get(), 0.1)
+    assert reply_to == ReplyTo("astoria/foo/response", b"bees")
+
+    # Response topics outside of the prefix are not allowed.
+    await wr.on_message(
+        wr._client,
+        "astoria/astprocd/request/restart",
+        b"{}",
+        1,
+        {"response_topic": ["elsewhere/response"]},
+    )
+    assert await asyncio.wait_for(received.get(), 0.1) is None
+
+    # Legacy requests have no reply destination.
+    await wr.on_message(wr._client, "astoria/astprocd/request/restart", b"{}", 1, {})
+    assert await asyncio.wait_for(received.get(), 0.1) is None
+
+
+@pytest.mark.asyncio
+async def test_subscribe_request_concurrency() -> None:
+    """Test that a slow request does not hold up later requests."""
+    wr = MQTTWrapper("astprocd", BROKER_INFO)
+    slow_request = asyncio.Event()
+    handled: List[str] = []
+
+    async def test_handler(
+        match: Match[str],
+        payload: ReceivedPayload,
+        reply_to: Optional[ReplyTo],
+    ) -> None:
+        if payload == "slow":
+            await slow_request.wait()
+        handled.append(str(payload))
+
+    wr.subscribe_request("astprocd/request/kill", test_handler)
+
+    for payload in [b"slow", b"fast"]:
+        await wr.on_message(wr._client, "astoria/astprocd/request/kill", payload, 1, {})
+    await asyncio.sleep(0.01)
+    assert handled == ["fast"]
+
+    slow_request.set()
+    await asyncio.sleep(0.01)
+    assert handled == ["fast", "slow"]
+
+
+def test_publish_response() -> None:
+    """Test that responses are published to the reply topic, or the legacy topic."""
+    wr = MQTTWrapper("astprocd", BROKER_INFO)
+    response = RequestResponse(uuid=uuid4(), success=True)
+
+    wr.publish_response("restart", response, ReplyTo("astoria/foo/response", b"bees"))
+    wr.publish_response("restart", response, None)
+
+    message = wr.publish_queue.get_nowait()
+    assert message is not None
+    assert message.topic == "astoria/foo/response"
+    assert message.properties["correlation_data"] == b"bees"
+
+    message = wr.publish_queue.get_nowait()
+    assert message is not None
+    assert message.topic == f"astoria/astprocd/request/restart/{response.uuid}"
+    assert "correlation_data" not in message.properties
+
+
+@pytest.mark.asyncio
+async def test_manager_request_timeout_cleanup() -> None:
+    """Test that a manager request is forgotten after it times out."""
+    wr = MQTTWrapper("foo", BROKER_INFO, dependencies=["astprocd"])
+
+    with pytest.raises(RuntimeError):
+        await wr.manager_request(
+            "astprocd",
+            "restart",
+            ManagerRequest(sender_name="foo"),
+            response_timeout=0.01,
+        )
+
+    assert len(wr._requests) == 0
+
+
+@pytest.mark.asyncio
+async def test_manager_request_many() -> None:
+    """Test that a batch of requests is sent at once and the responses gathered."""
+    wr = MQTTWrapper("foo", BROKER_INFO, dependencies=["astdiskd"])
+    requests = [ManagerRequest(sender_name="foo") for _ in range(3)]
+
+    task = asyncio.ensure_future(
+        wr.manager_request_many(
+            "astdiskd",
+            "add_static_disk",
+            requests,
+            response_timeout=0.2,
+        ),
+    )
+    await asyncio.sleep(0)
+    assert len(wr.publish_queue) == 3
+
+    # Respond out of order, and never respond to the first request.
+    for request in reversed(requests[1:]):
+        await wr.on_message(
+            wr._client,
+            "astoria/foo/response",
+            RequestResponse(uuid=request.uuid, success=True).json().encode(),
+            1,
+            {},
+        )
+
+    responses = await task
+    assert [r.uuid for r in responses] == [r.uuid for r in requests]
+    assert [r.success for r in responses] == [False, True, True]
+    assert len(wr._requests) == 0
+
+
+@pytest.mark.asyncio
+async def test_disconnect_without_reconnect_halts() -> None:
+    """Test that losing the broker sets the no dependency event by default."""
+    ev = asyncio.Event()
+    wr = MQTTWrapper("foo", BROKER_INFO, no_dependency_event=ev)
+    wr._publish_task = asyncio.ensure_future(asyncio.sleep(0))
+
+    wr.on_disconnect(wr._client, b"")
+    assert ev.is_set()
+
+
+@pytest.mark.asyncio
+async def test_disconnect_with_reconnect() -> None:
+    """Test that losing the broker does not halt the client in reconnect mode."""
+    ev = asyncio.Event()
+    broker_info = MQTTBrokerInfo(host="localhost", port=1883, reconnect=True)
+    wr = MQTTWrapper("foo", broker_info, no_dependency_event=ev)
+    assert wr._client.reconnect_retries == gmqtt.constants.UNLIMITED_RECONNECTS
+
+    wr._publish_task = asyncio.ensure_future(asyncio.sleep(0))
+    wr._connected_event.set()
+
+    wr.on_disconnect(wr._client, b"")
+    assert not ev.is_set()
+    assert not wr._connected_event.is_set()
+
+    # Messages are buffered until the connection returns.
+    wr.publish("", StubModel(foo="bar"), retain=True)
+    wr.publish("", StubModel(foo="baz"), retain=True)
+    assert len(wr.publish_queue) == 1
+
+
+@pytest.mark.asyncio
+async def test_publish_worker_survives_send_error(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that a message that cannot be sent is dropped, and sending continues."""
+    wr = MQTTWrapper("foo", BROKER_INFO)
+    sent: List[str] = []
+
+    def publish(topic: str, payload: bytes, **kwargs: object) -> None:
+        if topic.endswith("bad"):
+            raise ValueError("Bees")
+        sent.append(topic)
+
+    monkeypatch.setattr(wr._client, "publish", publish)
+    monkeypatch.setattr(MQTTWrapper, "is_connected", property(lambda self: True))
+    wr._connected_event.set()
+    task = asyncio.ensure_future(wr._publish_worker())
+
+    wr.publish("bad", StubModel(foo="bar"))
+    wr.publish("good", StubModel(foo="bar"))
+    await asyncio.sleep(0.01)
+
+    assert not task.done()
+    assert sent == ["astoria/foo/good"]
+    assert wr.publish_queue.total_dropped == 1
+    task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_wait_dependencies() -> None:
+    """Test that wait_dependencies returns once dependencies are running."""
+    wr = MQTTWrapper("foo", BROKER_INFO, dependencies=["astdiskd"])
+    task = asyncio.ensure_future(wr.wait_dependencies())
+
+    await wr.on_message(
+        wr._client,
+        "astoria/astdiskd",
+        ManagerMessage(status=ManagerMessage.Status.RUNNING).json().encode(),
+        1,
+        {},
+    )
+
+    await asyncio.wait_for(task, 0.1)
+    assert wr.has_dependencies
+
+
+@pytest.mark.asyncio
+async def test_wait_dependencies_no_dependency_event() -> None:
+    """Test that wait_dependencies returns if the no dependency event is set."""
+    ev = asyncio.Event()
+    wr = MQTTWrapper(
+        "foo",
+        BROKER_INFO,
+        dependencies=["astdiskd"],
+        no_dependency_event=ev,
+    )
+    task = asyncio.ensure_future(wr.wait_dependencies())
+    await asyncio.sleep(0)
+
+    ev.set()
+    await asyncio.wait_for(task, 0.1)
+    assert not wr.has_dependencies
@@ -0,0 +1,5 @@
+"""A valid Python program that prints its pid."""
+
+import os
+
+print(f"pid {os.getpid()}")
@@ -0,0 +1,8 @@
+"""A valid Python program that prints a lot of lines."""
+
+print("Starting")
+for _ in range(5):
+    print("bees")
+for i in range(50):
+    print(i)
+print("Finished")
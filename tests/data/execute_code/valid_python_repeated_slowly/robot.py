@@ -0,0 +1,7 @@
+"""A valid Python program that keeps printing the same line."""
+
+from time import sleep
+
+for _ in range(3):
+    print("bees", flush=True)
+    sleep(0.2)
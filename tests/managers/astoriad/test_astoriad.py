@@ -0,0 +1,57 @@
+"""Test running several managers in astoriad."""
+
+import asyncio
+from typing import List, Optional, cast
+
+import pytest
+
+from astoria.astoriad import run_components
+from astoria.common.components import StateManager
+
+
+class StubComponent:
+    """A component that runs until it is halted, or fails."""
+
+    def __init__(self, name: str, *, error: Optional[Exception] = None) -> None:
+        self.name = name
+        self.error = error
+        self.halted = asyncio.Event()
+
+    async def run(self) -> None:
+        """Run until halted."""
+        if self.error is not None:
+            raise self.error
+        await self.halted.wait()
+
+    def halt(self, *, silent: bool = False) -> None:
+        """Stop the component."""
+        self.halted.set()
+
+
+def _as_managers(components: List[StubComponent]) -> List[StateManager]:  # type: ignore[type-arg]
+    return cast(List[StateManager], components)  # type: ignore[type-arg]
+
+
+@pytest.mark.asyncio
+async def test_run_components_halts_all_when_one_stops() -> None:
+    """Test that the other managers are halted when one of them stops."""
+    components = [StubComponent("astdiskd"), StubComponent("astprocd")]
+    task = asyncio.ensure_future(run_components(_as_managers(components)))
+    await asyncio.sleep(0)
+    assert not task.done()
+
+    components[0].halt()
+    await asyncio.wait_for(task, 0.1)
+    assert all(component.halted.is_set() for component in components)
+
+
+@pytest.mark.asyncio
+async def test_run_components_error() -> None:
+    """Test that an error from a manager is raised once all have stopped."""
+    components = [
+        StubComponent("astdiskd"),
+        StubComponent("astprocd", error=RuntimeError("Bees")),
+    ]
+    with pytest.raises(RuntimeError, match="Bees"):
+        await asyncio.wait_for(run_components(_as_managers(components)), 0.1)
+    assert components[0].halted.is_set()
@@ -0,0 +1,50 @@
+"""Test the archiving of usercode log files."""
+
+import gzip
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from astoria.astprocd.log_archive import archive_log, get_archive_path, list_archives
+
+START_TIME = datetime(2021, 2, 3, 4, 5, 6, tzinfo=timezone.utc)
+
+
+def test_get_archive_path() -> None:
+    """Test that the archive is named after the pid and start time."""
+    path = get_archive_path(Path("/media/usb/log.txt"), 42, START_TIME)
+    assert path == Path("/media/usb/log-42-20210203T040506Z.txt.gz")
+
+
+def test_archive_log(tmp_path: Path) -> None:
+    """Test that a compressed copy of the log is made."""
+    log_path = tmp_path / "log.txt"
+    log_path.write_text("foo\nbar\n")
+
+    archive_log(log_path, 42, START_TIME, keep=5)
+
+    assert log_path.read_text() == "foo\nbar\n"
+    with gzip.open(tmp_path / "log-42-20210203T040506Z.txt.gz", "rt") as fh:
+        assert fh.read() == "foo\nbar\n"
+
+
+def test_archive_log_rotation(tmp_path: Path) -> None:
+    """Test that only the newest archives are kept."""
+    log_path = tmp_path / "log.txt"
+    log_path.write_text("foo\n")
+    (tmp_path / "log-other.txt.gz").touch()
+
+    # Earlier runs can have a larger pid.
+    for i, pid in enumerate([300, 200, 100]):
+        archive_log(log_path, pid, START_TIME + timedelta(minutes=i), keep=2)
+
+    assert [path.name for path in list_archives(tmp_path)] == [
+        "log-200-20210203T040606Z.txt.gz",
+        "log-100-20210203T040706Z.txt.gz",
+    ]
+    assert (tmp_path / "log-other.txt.gz").exists()
+
+
+def test_archive_log_missing(tmp_path: Path) -> None:
+    """Test that a log that cannot be read is not archived."""
+    archive_log(tmp_path / "log.txt", 42, START_TIME, keep=5)
+    assert list_archives(tmp_path) == []
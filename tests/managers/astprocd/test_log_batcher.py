@@ -0,0 +1,74 @@
+"""Test the batching of usercode log lines."""
+
+import asyncio
+from typing import Any, List
+
+import pytest
+
+from astoria.astprocd.log_batcher import LogBatcher
+from astoria.common.ipc import LogEventSource, UsercodeLogBatchBroadcastEvent
+from astoria.common.mqtt import BroadcastHelper
+
+
+class RecordingBroadcastHelper(BroadcastHelper[UsercodeLogBatchBroadcastEvent]):
+    """Broadcast helper that records the events that are sent."""
+
+    def __init__(self) -> None:
+        self._schema = UsercodeLogBatchBroadcastEvent
+        self.sent: List[UsercodeLogBatchBroadcastEvent] = []
+
+    def send(self, **kwargs: Any) -> None:  # type: ignore
+        """Send an event."""
+        self.sent.append(
+            self._schema(
+                event_name=self._schema.name,
+                sender_name="mock",
+                **kwargs,
+            ),
+        )
+
+
+@pytest.mark.asyncio
+async def test_log_batcher_size() -> None:
+    """Test that a batch is sent when it is full."""
+    helper = RecordingBroadcastHelper()
+    batcher = LogBatcher(helper, 42, max_lines=3, max_latency=10)
+
+    for i in range(7):
+        batcher.add(f"line {i}\n", LogEventSource.STDOUT, i)
+
+    assert [len(ev.lines) for ev in helper.sent] == [3, 3]
+    assert [ev.priority for ev in helper.sent] == [0, 3]
+    assert all(ev.pid == 42 for ev in helper.sent)
+
+    batcher.flush()
+    assert [line.sequence for ev in helper.sent for line in ev.lines] == list(range(7))
+    assert helper.sent[-1].lines[0].content == "line 6\n"
+
+
+@pytest.mark.asyncio
+async def test_log_batcher_latency() -> None:
+    """Test that a batch is sent when its first line has waited long enough."""
+    helper = RecordingBroadcastHelper()
+    batcher = LogBatcher(helper, 42, max_lines=64, max_latency=0.01)
+
+    batcher.add("foo\n", LogEventSource.STDOUT, 0)
+    batcher.add("bar\n", LogEventSource.STDERR, 1)
+    assert helper.sent == []
+
+    await asyncio.sleep(0.05)
+    assert len(helper.sent) == 1
+    assert [line.source for line in helper.sent[0].lines] == [
+        LogEventSource.STDOUT,
+        LogEventSource.STDERR,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_log_batcher_flush_empty() -> None:
+    """Test that no event is sent if there are no lines."""
+    helper = RecordingBroadcastHelper()
+    batcher = LogBatcher(helper, 42)
+
+    batcher.flush()
+    assert helper.sent == []
@@ -0,0 +1,84 @@
+"""Test the formatting of usercode log lines."""
+
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+
+from astoria.astprocd.log_format import (
+    LogLineFormatter,
+    compile_initial_log_lines,
+    render_initial_log_lines,
+)
+from astoria.common.config import AstoriaConfig
+from astoria.common.metadata import Metadata
+
+with Path("tests/data/config/valid.toml").open("rb") as fh:
+    CONFIG = AstoriaConfig.load_from_file(fh)
+
+SECOND = 1_000_000_000
+
+
+@pytest.mark.parametrize(
+    ("elapsed_ns", "expected"),
+    [
+        (0, "[0:00:00]"),
+        (1_234_567_891, "[0:00:01.234567]"),
+        (62 * SECOND + 5_000, "[0:01:02.000005]"),
+        (3 * 3600 * SECOND + 59 * SECOND, "[3:00:59]"),
+        (30 * 3600 * SECOND, "[1 day, 6:00:00]"),
+        (-SECOND, "[0:00:00]"),
+    ],
+)
+def test_log_line_formatter_timestamp(elapsed_ns: int, expected: str) -> None:
+    """Test that the elapsed time is rendered."""
+    formatter = LogLineFormatter(start_ns=10 * SECOND)
+    assert formatter.timestamp(10 * SECOND + elapsed_ns) == expected
+
+
+def test_log_line_formatter_matches_timedelta() -> None:
+    """Test that the timestamp matches the format of a timedelta."""
+    formatter = LogLineFormatter(start_ns=0)
+    for elapsed_ns in [
+        1_500_000_000,
+        1_600_000_000,
+        2 * SECOND,
+        2_000_001_000,
+        4000 * SECOND + 1000,
+        50 * 3600 * SECOND + 1000,
+    ]:
+        delta = timedelta(microseconds=elapsed_ns // 1000)
+        assert formatter.timestamp(elapsed_ns) == f"[{delta}]"
+
+
+def test_log_line_formatter_whole_second() -> None:
+    """Test that the microseconds are left out at a whole second, as in a timedelta."""
+    formatter = LogLineFormatter(start_ns=0)
+    assert formatter.format("Hello\n", SECOND - 1000) == "[0:00:00.999999] Hello\n"
+    assert formatter.format("Hello\n", SECOND) == "[0:00:01] Hello\n"
+    assert formatter.format("Hello\n", SECOND + 1000) == "[0:00:01.000001] Hello\n"
+
+
+def test_log_line_formatter_format() -> None:
+    """Test that lines are prefixed with the timestamp."""
+    formatter = LogLineFormatter()
+    line = formatter.format("Hello\n", formatter.start_ns + SECOND // 2)
+    assert line == "[0:00:00.500000] Hello\n"
+
+
+def test_render_initial_log_lines() -> None:
+    """Test that metadata is substituted into the initial log lines."""
+    metadata = Metadata.init(CONFIG)
+    templates = compile_initial_log_lines(
+        ["Zone: $zone", "Arena: ${arena}", "Bad Variable: $beees", "Cost: $$5"],
+    )
+    assert render_initial_log_lines(templates, metadata) == [
+        "Zone: 0",
+        "Arena: A",
+        "Bad Variable: $beees",
+        "Cost: $5",
+    ]
+    # The compiled templates can be rendered again with different metadata.
+    assert render_initial_log_lines(templates, metadata.copy(update={"zone": 2}))[0] == (
+        "Zone: 2"
+    )
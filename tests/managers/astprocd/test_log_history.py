@@ -0,0 +1,59 @@
+"""Test the history of recent usercode log lines."""
+
+from astoria.astprocd.log_history import MAX_REPLAY_PAGE_SIZE, LogHistory
+from astoria.common.ipc import LogEventSource, UsercodeLogLine
+
+
+def _line(sequence: int) -> UsercodeLogLine:
+    return UsercodeLogLine(
+        sequence=sequence,
+        source=LogEventSource.STDOUT,
+        timestamp=0,
+        content=f"line {sequence}\n",
+    )
+
+
+def test_log_history_read_pages() -> None:
+    """Test that lines are read in pages, across code runs."""
+    history = LogHistory(10)
+    for i in range(3):
+        history.add(1, _line(i))
+    for i in range(2):
+        history.add(2, _line(i))
+
+    lines, cursor = history.read(0, 3)
+    assert [(line.pid, line.sequence) for line in lines] == [(1, 0), (1, 1), (1, 2)]
+    assert cursor == 3
+
+    lines, cursor = history.read(cursor, 3)
+    assert [(line.pid, line.sequence) for line in lines] == [(2, 0), (2, 1)]
+    assert [line.cursor for line in lines] == [3, 4]
+    assert cursor == history.next_cursor == 5
+
+    lines, cursor = history.read(cursor, 3)
+    assert lines == []
+    assert cursor == 5
+
+
+def test_log_history_discards_oldest() -> None:
+    """Test that the oldest lines are discarded when the history is full."""
+    history = LogHistory(3)
+    for i in range(5):
+        history.add(1, _line(i))
+    assert len(history) == 3
+
+    # The first lines have been discarded, so the oldest line is returned.
+    lines, cursor = history.read(0, 10)
+    assert [line.cursor for line in lines] == [2, 3, 4]
+    assert cursor == 5
+
+
+def test_log_history_page_size() -> None:
+    """Test that the page size is limited."""
+    history = LogHistory(MAX_REPLAY_PAGE_SIZE * 2)
+    for i in range(MAX_REPLAY_PAGE_SIZE + 1):
+        history.add(1, _line(i))
+
+    lines, cursor = history.read(0, MAX_REPLAY_PAGE_SIZE * 2)
+    assert len(lines) == MAX_REPLAY_PAGE_SIZE
+    assert cursor == MAX_REPLAY_PAGE_SIZE
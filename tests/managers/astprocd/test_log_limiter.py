@@ -0,0 +1,67 @@
+"""Test the rate limiting of broadcast usercode log lines."""
+
+import asyncio
+from typing import List, Tuple
+
+import pytest
+
+from astoria.astprocd.log_limiter import LogRateLimiter, TokenBucket
+from astoria.common.ipc import LogEventSource
+
+
+def test_token_bucket_burst() -> None:
+    """Test that a burst up to the capacity is allowed."""
+    bucket = TokenBucket(0, 3)
+    assert [bucket.take() for _ in range(5)] == [True, True, True, False, False]
+
+
+def test_token_bucket_refill() -> None:
+    """Test that tokens are added at the rate."""
+    bucket = TokenBucket(1000, 1)
+    assert bucket.take()
+    bucket._last -= 0.01
+    assert bucket.take()
+
+
+@pytest.mark.asyncio
+async def test_log_rate_limiter_sources() -> None:
+    """Test that each source has its own limit."""
+    summaries: List[Tuple[LogEventSource, int]] = []
+    limiter = LogRateLimiter(lambda *args: summaries.append(args), rate=0, burst=2)
+
+    assert [limiter.allow(LogEventSource.STDOUT) for _ in range(4)] == [
+        True,
+        True,
+        False,
+        False,
+    ]
+    assert [limiter.allow(LogEventSource.STDERR) for _ in range(3)] == [
+        True,
+        True,
+        False,
+    ]
+
+    limiter.flush()
+    assert summaries == [(LogEventSource.STDOUT, 2), (LogEventSource.STDERR, 1)]
+
+    limiter.flush()
+    assert len(summaries) == 2
+
+
+@pytest.mark.asyncio
+async def test_log_rate_limiter_summary_interval() -> None:
+    """Test that suppressed lines are reported after the summary interval."""
+    summaries: List[Tuple[LogEventSource, int]] = []
+    limiter = LogRateLimiter(
+        lambda *args: summaries.append(args),
+        rate=0,
+        burst=0,
+        summary_interval=0.01,
+    )
+
+    for _ in range(3):
+        limiter.allow(LogEventSource.STDOUT)
+    assert summaries == []
+
+    await asyncio.sleep(0.05)
+    assert summaries == [(LogEventSource.STDOUT, 3)]
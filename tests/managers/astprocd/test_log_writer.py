@@ -0,0 +1,100 @@
+"""Test the buffered writing of usercode log files."""
+
+import time
+from pathlib import Path
+
+import pytest
+
+from astoria.astprocd.log_writer import LogFileWriter, flush_all
+
+
+def _wait_for_content(path: Path, content: str, timeout: float = 1) -> bool:
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if path.read_text() == content:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_log_writer_close(tmp_path: Path) -> None:
+    """Test that the buffer is written when the writer is closed."""
+    path = tmp_path / "log.txt"
+    writer = LogFileWriter(path, flush_interval=60)
+
+    writer.write("foo\n")
+    writer.write("bar\n")
+    writer.close()
+
+    assert path.read_text() == "foo\nbar\n"
+
+
+@pytest.mark.asyncio
+async def test_log_writer_aclose(tmp_path: Path) -> None:
+    """Test that the writer can be closed from the event loop."""
+    path = tmp_path / "log.txt"
+    writer = LogFileWriter(path, flush_interval=60)
+
+    writer.write("foo\n")
+    await writer.aclose()
+
+    assert path.read_text() == "foo\n"
+
+
+def test_log_writer_flush_size(tmp_path: Path) -> None:
+    """Test that the buffer is written when it reaches the flush size."""
+    path = tmp_path / "log.txt"
+    writer = LogFileWriter(path, flush_size=8, flush_interval=60)
+
+    writer.write("foo\n")
+    time.sleep(0.05)
+    assert path.read_text() == ""
+
+    writer.write("bar\n")
+    assert _wait_for_content(path, "foo\nbar\n")
+    writer.close()
+
+
+def test_log_writer_flush_interval(tmp_path: Path) -> None:
+    """Test that the buffer is written when the flush interval has passed."""
+    path = tmp_path / "log.txt"
+    writer = LogFileWriter(path, flush_interval=0.01)
+
+    writer.write("foo\n")
+    assert _wait_for_content(path, "foo\n")
+    writer.close()
+
+
+def test_log_writer_flush_all(tmp_path: Path) -> None:
+    """Test that all open writers can be flushed."""
+    path = tmp_path / "log.txt"
+    writer = LogFileWriter(path, flush_interval=60)
+
+    writer.write("foo\n")
+    flush_all()
+    assert _wait_for_content(path, "foo\n")
+    writer.close()
+
+
+def test_log_writer_dropped_lines(tmp_path: Path) -> None:
+    """Test that lines are dropped when the buffer is full."""
+    path = tmp_path / "log.txt"
+    writer = LogFileWriter(path, flush_size=1024, flush_interval=60, max_buffer=8)
+
+    for line in ["foo\n", "bar\n", "baz\n", "bee\n"]:
+        writer.write(line)
+    assert writer.dropped == 2
+    writer.close()
+
+    assert path.read_text() == (
+        "foo\nbar\n[2 lines were not logged as the disk is too slow]\n"
+    )
+
+
+def test_log_writer_write_after_close(tmp_path: Path) -> None:
+    """Test that data cannot be written after the writer is closed."""
+    writer = LogFileWriter(tmp_path / "log.txt")
+    writer.close()
+
+    with pytest.raises(ValueError):
+        writer.write("foo\n")
@@ -0,0 +1,138 @@
+"""Test the sampling of usercode resource usage."""
+
+import os
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+
+from astoria.astprocd.resource_sampler import (
+    CLOCK_TICKS_PER_SECOND,
+    PAGE_SIZE,
+    ResourceSample,
+    ResourceSampler,
+    sample_process_group,
+)
+from astoria.common.ipc import UsercodeResourceMetrics
+
+
+def make_process(
+    proc_path: Path,
+    pid: int,
+    pgid: int,
+    *,
+    comm: str = "python3",
+    utime: int = 0,
+    stime: int = 0,
+    threads: int = 1,
+    rss_pages: int = 0,
+    io: Optional[str] = None,
+) -> None:
+    """Create the procfs files for a fake process."""
+    fields = ["S", "1", str(pgid), str(pgid)] + ["0"] * 40
+    fields[11] = str(utime)
+    fields[12] = str(stime)
+    fields[17] = str(threads)
+    fields[21] = str(rss_pages)
+
+    proc_dir = proc_path / str(pid)
+    proc_dir.mkdir()
+    (proc_dir / "stat").write_text(f"{pid} ({comm}) {' '.join(fields)}\n")
+    if io is not None:
+        (proc_dir / "io").write_text(io)
+
+
+def test_sample_process_group(tmp_path: Path) -> None:
+    """Test that the processes in the group are summed."""
+    make_process(
+        tmp_path,
+        100,
+        100,
+        utime=CLOCK_TICKS_PER_SECOND,
+        stime=CLOCK_TICKS_PER_SECOND,
+        threads=3,
+        rss_pages=10,
+        io="rchar: 5\nread_bytes: 4096\nwrite_bytes: 8192\n",
+    )
+    make_process(
+        tmp_path,
+        101,
+        100,
+        comm="a) (b",
+        utime=CLOCK_TICKS_PER_SECOND,
+        threads=2,
+    )
+    make_process(tmp_path, 102, 1, utime=100 * CLOCK_TICKS_PER_SECOND, threads=10)
+    (tmp_path / "self").mkdir()
+
+    assert sample_process_group(100, tmp_path) == ResourceSample(
+        processes=2,
+        cpu_time=3.0,
+        rss=10 * PAGE_SIZE,
+        threads=5,
+        read_bytes=4096,
+        write_bytes=8192,
+    )
+
+
+def test_sample_process_group_empty(tmp_path: Path) -> None:
+    """Test that there is no sample when the group has no processes."""
+    make_process(tmp_path, 102, 1)
+    (tmp_path / "103").mkdir()  # The process exited while reading.
+    assert sample_process_group(100, tmp_path) is None
+
+
+@pytest.mark.skipif(not Path("/proc/self/stat").exists(), reason="Requires procfs")
+def test_sample_own_process_group() -> None:
+    """Test sampling the process group of the tests from procfs."""
+    sample = sample_process_group(os.getpgrp())
+    assert sample is not None
+    assert sample.processes >= 1
+    assert sample.threads >= 1
+    assert sample.rss > 0
+
+
+def test_resource_sampler_rollups() -> None:
+    """Test that the rollups and CPU usage are calculated between samples."""
+    sampler = ResourceSampler(100, lambda metrics: None)
+
+    first = sampler.update(ResourceSample(1, 1.0, 4096, 1, 0, 0), 10.0)
+    assert first.samples == 1
+    assert first.cpu_percent.last == 0
+
+    second = sampler.update(ResourceSample(2, 1.5, 8192, 3, 10, 20), 11.0)
+    assert second.samples == 2
+    assert second.processes == 2
+    assert second.cpu_time == 1.5
+    assert second.cpu_percent.last == 50
+    assert second.rss.dict() == {"min": 4096, "max": 8192, "avg": 6144, "last": 8192}
+    assert second.threads.dict() == {"min": 1, "max": 3, "avg": 2, "last": 3}
+    assert (second.read_bytes, second.write_bytes) == (10, 20)
+
+    # The CPU time of exited processes is no longer counted.
+    third = sampler.update(ResourceSample(1, 0.5, 4096, 1, 10, 20), 12.0)
+    assert third.cpu_percent.dict() == {
+        "min": 0,
+        "max": 50,
+        "avg": pytest.approx(50 / 3),
+        "last": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_resource_sampler_run(tmp_path: Path) -> None:
+    """Test that the sampler stops when the process group has gone."""
+    make_process(tmp_path, 100, 100, threads=2)
+    received: List[UsercodeResourceMetrics] = []
+
+    def callback(metrics: UsercodeResourceMetrics) -> None:
+        received.append(metrics)
+        if len(received) == 2:
+            (tmp_path / "100" / "stat").unlink()
+
+    sampler = ResourceSampler(100, callback, interval=0.01, proc_path=tmp_path)
+    await sampler.run()
+
+    assert [metrics.samples for metrics in received] == [1, 2]
+    assert all(metrics.pid == 100 for metrics in received)
+    assert received[-1].threads.last == 2
@@ -0,0 +1,76 @@
+"""Test reading lines of usercode output."""
+
+import asyncio
+from typing import List
+
+import pytest
+
+from astoria.astprocd.stream_reader import LINE_CONTINUATION_MARKER, read_lines
+
+
+async def _read(data: bytes, chunk_size: int = 4, max_line_length: int = 8) -> List[str]:
+    stream = asyncio.StreamReader()
+    stream.feed_data(data)
+    stream.feed_eof()
+    return [
+        line
+        async for line in read_lines(
+            stream,
+            chunk_size=chunk_size,
+            max_line_length=max_line_length,
+        )
+    ]
+
+
+@pytest.mark.asyncio
+async def test_read_lines() -> None:
+    """Test that lines are split across chunks."""
+    assert await _read(b"foo\nbarbaz\n\nbee\n") == ["foo\n", "barbaz\n", "\n", "bee\n"]
+
+
+@pytest.mark.asyncio
+async def test_read_lines_empty() -> None:
+    """Test that an empty stream has no lines."""
+    assert await _read(b"") == []
+
+
+@pytest.mark.asyncio
+async def test_read_lines_unterminated() -> None:
+    """Test that the last line is given a new line."""
+    assert await _read(b"foo\nbar") == ["foo\n", "bar\n"]
+
+
+@pytest.mark.asyncio
+async def test_read_lines_long_line() -> None:
+    """Test that long lines are split with a continuation marker."""
+    assert await _read(b"abcdefghijklmnopqrs\n12345678\n") == [
+        "abcdefgh" + LINE_CONTINUATION_MARKER,
+        "ijklmnop" + LINE_CONTINUATION_MARKER,
+        "qrs\n",
+        "12345678\n",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_read_lines_huge_line() -> None:
+    """Test that a line longer than the asyncio stream limit can be read."""
+    data = b"a" * 200_000
+    lines = await _read(data, chunk_size=65536, max_line_length=16384)
+    assert len(lines) == 13
+    assert "".join(line.replace(LINE_CONTINUATION_MARKER, "") for line in lines) == (
+        "a" * 200_000 + "\n"
+    )
+
+
+@pytest.mark.asyncio
+async def test_read_lines_multibyte() -> None:
+    """Test that characters split between chunks are decoded."""
+    assert await _read("🐝 ünïcödé\n".encode(), chunk_size=1, max_line_length=64) == [
+        "🐝 ünïcödé\n",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_read_lines_invalid_utf8() -> None:
+    """Test that invalid bytes are ignored."""
+    assert await _read(b"foo\xff\nbar\n") == ["foo\n", "bar\n"]
@@ -1,17 +1,30 @@
 """Test the usercode lifecycle code used by astprocd."""
 import asyncio
+import gzip
+import shutil
 from contextlib import AbstractContextManager
+from datetime import datetime
 from pathlib import Path
 from re import compile
+from time import sleep
 from typing import IO, Any, List, Optional, Tuple, Type
 
 import pytest
 
+from astoria.astprocd import usercode_lifecycle
+from astoria.astprocd.log_archive import ARCHIVE_NAME_REGEX, list_archives
+from astoria.astprocd.log_format import compile_initial_log_lines
+from astoria.astprocd.log_history import LogHistory
 from astoria.astprocd.usercode_lifecycle import UsercodeLifecycle
 from astoria.common.code_status import CodeStatus
 from astoria.common.config import AstoriaConfig
 from astoria.common.disks import DiskInfo, DiskType, DiskUUID
-from astoria.common.ipc import UsercodeLogBroadcastEvent
+from astoria.common.ipc import (
+    LogEventSource,
+    UsercodeLogBatchBroadcastEvent,
+    UsercodeLogBroadcastEvent,
+    UsercodeResourceMetrics,
+)
 from astoria.common.metadata import Metadata
 from astoria.common.mqtt.broadcast_helper import BroadcastHelper, T
 
@@ -56,6 +69,12 @@ class MockBroadcastHelper(BroadcastHelper[T]):
         """Get lines in the same format as the file."""
         return "".join(a.content for a in self._sent).splitlines()  # type: ignore
 
+    def get_batched_lines(self) -> List[str]:
+        """Get the lines of batched events in the same format as the file."""
+        return "".join(
+            line.content for a in self._sent for line in a.lines  # type: ignore
+        ).splitlines()
+
     def send(self, **kwargs: Any) -> None:  # type: ignore
         """Send an event."""
         data = self._schema(  # noqa: F841
@@ -94,7 +113,11 @@ class StatusInformTestHelper:
     def __init__(self) -> None:
         self.times_called = 0
         self.log_helper = MockBroadcastHelper.get_helper(UsercodeLogBroadcastEvent)
+        self.log_batch_helper = MockBroadcastHelper.get_helper(
+            UsercodeLogBatchBroadcastEvent,
+        )
         self.called_queue: List[CodeStatus] = []
+        self.metrics: List[UsercodeResourceMetrics] = []
 
     def callback(self, status: CodeStatus) -> None:
         """Mock inform callback."""
@@ -107,6 +130,7 @@ class StatusInformTestHelper:
         mount_path: Optional[Path] = None,
         *,
         config: AstoriaConfig = CONFIG,
+        log_history: Optional[LogHistory] = None,
     ) -> Tuple[UsercodeLifecycle, "StatusInformTestHelper"]:
         """Setup a lifecycle and helper for testing."""
         sith = cls()
@@ -121,6 +145,12 @@ class StatusInformTestHelper:
             log_helper=sith.log_helper,
             config=config,
             metadata=Metadata.init(config),
+            log_batch_helper=sith.log_batch_helper,
+            log_history=log_history,
+            metrics_callback=sith.metrics.append,
+            initial_log_lines=compile_initial_log_lines(
+                config.system.initial_log_lines,
+            ),
         )
         return ucl, sith
 
@@ -201,7 +231,255 @@ async def test_run_with_not_python() -> None:
     assert "This is not a python program" in _strip_timestamp(lines[2])
     assert _strip_timestamp(lines[-1]) == "=== LOG FINISHED ==="
 
+    assert lines == sith.log_batch_helper.get_batched_lines()
+
+
+@pytest.mark.asyncio
+async def test_run_with_legacy_log_events() -> None:
+    """Test that a log event is also sent for each line if legacy events are enabled."""
+    config = CONFIG.copy(
+        update={
+            "astprocd": CONFIG.astprocd.copy(update={"legacy_log_events": True}),
+        },
+    )
+    ucl, sith = StatusInformTestHelper.setup(
+        EXECUTE_CODE_DATA / "not_python",
+        config=config,
+    )
+    await ucl.run_process()
+    await asyncio.sleep(0.05)  # Wait for logger to flush
+
+    log_file = EXECUTE_CODE_DATA / "not_python" / "log.txt"
+    with ReadAndCleanupFile(log_file) as fh:
+        lines = fh.read().splitlines()
+
     assert lines == sith.log_helper.get_lines()
+    assert lines == sith.log_batch_helper.get_batched_lines()
+    # The priority of each event is the sequence number of the line.
+    assert [ev.priority for ev in sith.log_helper._sent] == list(range(len(lines)))
+
+
+@pytest.mark.asyncio
+async def test_run_without_legacy_log_events() -> None:
+    """Test that only batched log events are sent if legacy events are disabled."""
+    config = CONFIG.copy(
+        update={
+            "astprocd": CONFIG.astprocd.copy(update={"legacy_log_events": False}),
+        },
+    )
+    ucl, sith = StatusInformTestHelper.setup(
+        EXECUTE_CODE_DATA / "not_python",
+        config=config,
+    )
+    await ucl.run_process()
+    await asyncio.sleep(0.05)  # Wait for logger to flush
+
+    log_file = EXECUTE_CODE_DATA / "not_python" / "log.txt"
+    with ReadAndCleanupFile(log_file) as fh:
+        lines = fh.read().splitlines()
+
+    assert sith.log_helper.get_lines() == []
+    assert lines == sith.log_batch_helper.get_batched_lines()
+
+
+@pytest.mark.asyncio
+async def test_run_log_sequence() -> None:
+    """Test that lines from all sources share a single sequence."""
+    ucl, sith = StatusInformTestHelper.setup(EXECUTE_CODE_DATA / "syntax_error")
+    await ucl.run_process()
+
+    lines = [line for ev in sith.log_batch_helper._sent for line in ev.lines]
+    assert {line.source for line in lines} == {
+        LogEventSource.ASTORIA,
+        LogEventSource.STDERR,
+    }
+    assert [line.sequence for line in lines] == list(range(len(lines)))
+
+    timestamps = [line.timestamp for line in lines]
+    assert timestamps == sorted(timestamps)
+
+
+@pytest.mark.asyncio
+async def test_run_resource_metrics() -> None:
+    """Test that the resource usage of the code is sampled while it runs."""
+    config = CONFIG.copy(
+        update={
+            "astprocd": CONFIG.astprocd.copy(
+                update={"resource_sample_interval": 0.1},
+            ),
+        },
+    )
+    ucl, sith = StatusInformTestHelper.setup(
+        EXECUTE_CODE_DATA / "valid_python_long",
+        config=config,
+    )
+    asyncio.ensure_future(ucl.run_process())
+    await asyncio.sleep(1)
+    pid = ucl.pid
+    await ucl.kill_process()
+
+    assert len(sith.metrics) >= 2
+    assert [metrics.samples for metrics in sith.metrics] == list(
+        range(1, len(sith.metrics) + 1),
+    )
+    assert all(metrics.pid == pid for metrics in sith.metrics)
+    assert sith.metrics[-1].processes == 1
+    assert sith.metrics[-1].rss.min > 0
+
+    # Sampling stops once the code has exited.
+    sample_count = len(sith.metrics)
+    await asyncio.sleep(0.2)
+    assert len(sith.metrics) == sample_count
+
+
+@pytest.mark.asyncio
+async def test_run_collapses_repeated_lines() -> None:
+    """Test that consecutive identical lines are collapsed."""
+    ucl, sith = StatusInformTestHelper.setup(EXECUTE_CODE_DATA / "valid_python_repeated")
+    await ucl.run_process()
+
+    log_file = EXECUTE_CODE_DATA / "valid_python_repeated" / "log.txt"
+    with ReadAndCleanupFile(log_file) as fh:
+        lines = fh.read().splitlines()
+
+    assert [_strip_timestamp(line) for line in lines] == [
+        "=== LOG STARTED ===",
+        "Starting",
+        "bees",
+        "[last line repeated 4 times]",
+        *(str(i) for i in range(50)),
+        "Finished",
+        "=== LOG FINISHED ===",
+    ]
+    assert lines == sith.log_batch_helper.get_batched_lines()
+
+
+@pytest.mark.asyncio
+async def test_run_reports_repeated_lines_after_interval(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that a line that keeps repeating is reported without waiting for another."""
+    monkeypatch.setattr(usercode_lifecycle, "LOG_SUMMARY_INTERVAL", 0.05)
+    ucl, sith = StatusInformTestHelper.setup(
+        EXECUTE_CODE_DATA / "valid_python_repeated_slowly",
+    )
+    await ucl.run_process()
+
+    log_file = EXECUTE_CODE_DATA / "valid_python_repeated_slowly" / "log.txt"
+    with ReadAndCleanupFile(log_file) as fh:
+        lines = fh.read().splitlines()
+
+    assert [_strip_timestamp(line) for line in lines] == [
+        "=== LOG STARTED ===",
+        "bees",
+        "[last line repeated 1 times]",
+        "[last line repeated 1 times]",
+        "=== LOG FINISHED ===",
+    ]
+    assert lines == sith.log_batch_helper.get_batched_lines()
+
+
+@pytest.mark.asyncio
+async def test_run_rate_limits_broadcasts() -> None:
+    """Test that lines over the rate limit are only written to the log file."""
+    config = CONFIG.copy(
+        update={
+            "astprocd": CONFIG.astprocd.copy(
+                update={"log_rate_limit": 1, "log_rate_burst": 10},
+            ),
+        },
+    )
+    ucl, sith = StatusInformTestHelper.setup(
+        EXECUTE_CODE_DATA / "valid_python_repeated",
+        config=config,
+    )
+    await ucl.run_process()
+
+    log_file = EXECUTE_CODE_DATA / "valid_python_repeated" / "log.txt"
+    with ReadAndCleanupFile(log_file) as fh:
+        lines = fh.read().splitlines()
+    assert len(lines) == 57
+
+    broadcast = [
+        _strip_timestamp(line) for line in sith.log_batch_helper.get_batched_lines()
+    ]
+    assert broadcast[:3] == ["=== LOG STARTED ===", "Starting", "bees"]
+    assert broadcast[-1] == "=== LOG FINISHED ==="
+
+    # The summary is also written to the log file.
+    summary = compile(r"^\[(\d+) lines of stdout were not broadcast, see log.txt\]$")
+    match = summary.match(broadcast[-2])
+    assert match is not None
+    assert _strip_timestamp(lines[-2]) == broadcast[-2]
+    # Every line of output is either broadcast or counted in the summary.
+    assert len(broadcast) - 3 + int(match.group(1)) == 54
+
+
+@pytest.mark.asyncio
+async def test_run_log_history_and_archive(tmp_path: Path) -> None:
+    """Test that the log is kept for replay, and archived after the run."""
+    mount_path = tmp_path / "usb"
+    shutil.copytree(
+        EXECUTE_CODE_DATA / "not_python",
+        mount_path,
+        ignore=shutil.ignore_patterns("log*"),
+    )
+    history = LogHistory()
+    ucl, sith = StatusInformTestHelper.setup(mount_path, log_history=history)
+    await ucl.run_process()
+
+    lines = (mount_path / "log.txt").read_text().splitlines()
+    replayed, _ = history.read(0, 100)
+    assert [line.content.rstrip("\n") for line in replayed] == lines
+    assert {line.pid for line in replayed} == {sith.log_batch_helper._sent[0].pid}
+
+    archives = list_archives(mount_path)
+    assert len(archives) == 1
+    with gzip.open(archives[0], "rt") as fh:
+        assert fh.read().splitlines() == lines
+
+
+@pytest.mark.asyncio
+async def test_restart_waits_for_log_archive(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that a restart does not truncate the log before it is archived."""
+    archive_log = usercode_lifecycle.archive_log
+
+    def slow_archive_log(
+        log_path: Path,
+        pid: int,
+        start_time: datetime,
+        *,
+        keep: int,
+    ) -> None:
+        sleep(0.2)
+        archive_log(log_path, pid, start_time, keep=keep)
+
+    # The exit is reported before the log has been archived.
+    monkeypatch.setattr(usercode_lifecycle, "LOG_CLOSE_TIMEOUT", 0)
+    monkeypatch.setattr(usercode_lifecycle, "archive_log", slow_archive_log)
+
+    mount_path = tmp_path / "usb"
+    shutil.copytree(
+        EXECUTE_CODE_DATA / "valid_python_pid",
+        mount_path,
+        ignore=shutil.ignore_patterns("log*"),
+    )
+    ucl, _ = StatusInformTestHelper.setup(mount_path)
+    await ucl.run_process()
+    await ucl.run_process()
+    assert ucl._logger_task is not None
+    await ucl._logger_task
+
+    archives = list_archives(mount_path)
+    assert len(archives) == 2
+    for archive in archives:
+        match = ARCHIVE_NAME_REGEX.match(archive.name)
+        assert match is not None
+        with gzip.open(archive, "rt") as fh:
+            assert f"pid {match.group(1)}" in fh.read()
 
 
 @pytest.mark.asyncio
@@ -231,7 +509,7 @@ async def test_run_with_syntax_error() -> None:
     assert "SyntaxError" in _strip_timestamp(lines[4])
     assert _strip_timestamp(lines[-1]) == "=== LOG FINISHED ==="
 
-    assert lines == sith.log_helper.get_lines()
+    assert lines == sith.log_batch_helper.get_batched_lines()
 
 
 @pytest.mark.asyncio
@@ -260,7 +538,7 @@ async def test_run_with_valid_python_wait_finish() -> None:
     assert _strip_timestamp(lines[1]) == "Hello World"
     assert _strip_timestamp(lines[-1]) == "=== LOG FINISHED ==="
 
-    assert lines == sith.log_helper.get_lines()
+    assert lines == sith.log_batch_helper.get_batched_lines()
 
 
 @pytest.mark.asyncio
@@ -290,7 +568,7 @@ async def test_run_with_valid_python_other_entrypoint() -> None:
     assert _strip_timestamp(lines[1]) == "World Hello"
     assert _strip_timestamp(lines[-1]) == "=== LOG FINISHED ==="
 
-    assert lines == sith.log_helper.get_lines()
+    assert lines == sith.log_batch_helper.get_batched_lines()
 
 
 @pytest.mark.asyncio
@@ -328,7 +606,7 @@ async def test_run_with_valid_python_additional_log_lines() -> None:
     assert _strip_timestamp(lines[5]) == "Hello World"
     assert _strip_timestamp(lines[-1]) == "=== LOG FINISHED ==="
 
-    assert lines == sith.log_helper.get_lines()
+    assert lines == sith.log_batch_helper.get_batched_lines()
 
 
 @pytest.mark.asyncio
@@ -400,7 +678,7 @@ async def test_run_with_valid_python_wait_kill() -> None:
     assert _strip_timestamp(lines[-1]) == "=== LOG FINISHED ==="
     assert len(lines) == 5  # Check the code didn't run for the entire length
 
-    assert lines == sith.log_helper.get_lines()
+    assert lines == sith.log_batch_helper.get_batched_lines()
 
 
 @pytest.mark.asyncio
@@ -439,7 +717,7 @@ async def test_run_with_valid_python_wait_kill_ignore_sigint() -> None:
     assert _strip_timestamp(lines[-1]) == "=== LOG FINISHED ==="
     assert len(lines) == 5  # Check the code didn't run for the entire length
 
-    assert lines == sith.log_helper.get_lines()
+    assert lines == sith.log_batch_helper.get_batched_lines()
 
 
 @pytest.mark.asyncio
@@ -8,7 +8,7 @@ import pytest
 
 from astoria.common.config.system import AstoriaConfig
 from astoria.common.disks import DiskInfo, DiskType, DiskUUID
-from astoria.common.ipc import DiskManagerMessage
+from astoria.common.ipc import DiskManagerMessage, StatusPatch
 from astoria.common.mixins import DiskHandlerMixin
 
 with Path("tests/data/config/valid.toml").open("rb") as fh:
@@ -171,3 +171,35 @@ async def test_disk_handler_mixin_bad_json() -> None:
     """Test that we don't crash on bad JSON."""
     st = StubHelper()
     await st.dispatch("}bees?{")
+
+
+@pytest.mark.asyncio
+async def test_disk_handler_mixin_patch() -> None:
+    """Test that disks added by a status patch are inserted."""
+    st = StubHelper()
+    await st.dispatch(get_disk_manager_message(["foo"]))
+
+    patch = StatusPatch(sequence=1, patch={"sequence": 1, "disks": {"bar": "."}})
+    await st.handle_astdiskd_patch_message(get_match(), patch.json())
+    await asyncio.sleep(0.01)
+
+    assert st.times_disk_inserted == 2
+    assert st._cur_disks == get_disk_info_list(["foo", "bar"])
+
+    # The status message with the same sequence number is not handled again.
+    message = get_disk_manager_message(["foo", "bar"])
+    await st.dispatch(message.replace('"sequence": 0', '"sequence": 1'))
+    assert st.times_disk_inserted == 2
+
+
+@pytest.mark.asyncio
+async def test_disk_handler_mixin_patch_unrelated() -> None:
+    """Test that a patch which does not change the disks is ignored."""
+    st = StubHelper()
+    await st.dispatch(get_disk_manager_message(["foo"]))
+
+    patch = StatusPatch(sequence=1, patch={"sequence": 1, "status": "RUNNING"})
+    await st.handle_astdiskd_patch_message(get_match(), patch.json())
+    await asyncio.sleep(0.01)
+
+    assert st.times_disk_inserted == 1